@@ -18,7 +18,6 @@ buildPythonApplication (
 
     propagatedBuildInputs = [
       setuptools
-      cbor2
     ];
 
   }
@@ -20,11 +20,14 @@
 """A very simple archiving server for Hoardy-Web."""
 
 import argparse as _argparse
+import concurrent.futures as _cf
 import gzip as _gzip
 import io as _io
 import json as _json
 import os as _os
 import re as _re
+import socketserver as _socketserver
+import struct as _struct
 import sys as _sys
 import threading as _threading
 import time as _time
@@ -33,7 +36,11 @@ import urllib.parse as _up
 import wsgiref.simple_server as _wsgiss
 import wsgiref.validate as _wsgival
 
-_cbor2 = None
+try:
+    import fcntl as _fcntl
+except ImportError:
+    _fcntl = None  # type: ignore
+
 __prog__ = "hoardy-web-sas"
 
 try:
@@ -47,10 +54,306 @@ mypid = str(_os.getpid())
 bucket_re = _re.compile(r"[\w -]+")
 
 
+class CBORAbridger:
+    """Produce a `repr`-like representation of CBOR data without decoding it, with
+    long strings abridged to their sizes, so that printing a dump would not
+    require copying its bodies around."""
+
+    def __init__(self, data: bytes, limit: int = 128) -> None:
+        self.data = data
+        self.limit = limit
+        self.pos = 0
+        self.res: _t.List[str] = []
+
+    def header(self) -> _t.Tuple[int, int, _t.Optional[int]]:
+        data = self.data
+        b = data[self.pos]
+        self.pos += 1
+        major, info = b >> 5, b & 31
+        if info < 24:
+            return major, info, info
+        if info == 31:
+            # indefinite length
+            return major, info, None
+        if info > 27:
+            raise ValueError("invalid additional information")
+        size = 1 << (info - 24)
+        if self.pos + size > len(data):
+            raise ValueError("unexpected end of data")
+        arg = int.from_bytes(data[self.pos : self.pos + size], "big")
+        self.pos += size
+        return major, info, arg
+
+    def string(self, major: int, size: int) -> None:
+        start = self.pos
+        end = start + size
+        if end > len(self.data):
+            raise ValueError("unexpected end of data")
+        self.pos = end
+        if size > self.limit:
+            self.res.append(f"<{size} {'bytes' if major == 2 else 'text bytes'}>")
+        elif major == 2:
+            self.res.append(repr(self.data[start:end]))
+        else:
+            self.res.append(repr(self.data[start:end].decode("utf-8", "replace")))
+
+    def item(self) -> bool:
+        """Abridge the next item. Returns `False` on a `break`."""
+        major, info, arg = self.header()
+        if arg is None and major not in (2, 3, 4, 5, 7):
+            raise ValueError("unexpected indefinite length")
+        res = self.res
+        if major == 0:
+            res.append(str(arg))
+        elif major == 1:
+            assert arg is not None
+            res.append(str(-1 - arg))
+        elif major in (2, 3):
+            if arg is not None:
+                self.string(major, arg)
+                return True
+            # a sequence of chunks
+            size = 0
+            while True:
+                cmajor, _, carg = self.header()
+                if cmajor == 7:
+                    break
+                if cmajor != major or carg is None or self.pos + carg > len(self.data):
+                    raise ValueError("invalid chunk")
+                self.pos += carg
+                size += carg
+            res.append(f"<{size} {'bytes' if major == 2 else 'text bytes'}>")
+        elif major in (4, 5):
+            res.append("[" if major == 4 else "{")
+            n = 0
+            while arg is None or n < arg:
+                mark = len(res)
+                if n > 0:
+                    res.append(", ")
+                if not self.item():
+                    del res[mark:]
+                    break
+                if major == 5:
+                    res.append(": ")
+                    self.item()
+                n += 1
+            res.append("]" if major == 4 else "}")
+        elif major == 6:
+            # ignore tags
+            return self.item()
+        elif info == 20:
+            res.append("False")
+        elif info == 21:
+            res.append("True")
+        elif info in (22, 23):
+            res.append("None")
+        elif info == 25:
+            assert arg is not None
+            res.append(repr(_struct.unpack("!e", arg.to_bytes(2, "big"))[0]))
+        elif info == 26:
+            assert arg is not None
+            res.append(repr(_struct.unpack("!f", arg.to_bytes(4, "big"))[0]))
+        elif info == 27:
+            assert arg is not None
+            res.append(repr(_struct.unpack("!d", arg.to_bytes(8, "big"))[0]))
+        elif info == 31:
+            return False
+        else:
+            res.append(f"simple({arg})")
+        return True
+
+    def abridge(self) -> str:
+        try:
+            self.item()
+        except (IndexError, ValueError, RecursionError) as exc:
+            self.res.append(f"<invalid CBOR: {exc}>")
+        return "".join(self.res)
+
+
+def gzip_maybe(data: bytes, compresslevel: int) -> bytes:
+    """gzip given data, if it gzips."""
+    with _io.BytesIO() as gz_outf:
+        with _gzip.GzipFile(
+            fileobj=gz_outf, filename="", mtime=0, mode="wb", compresslevel=compresslevel
+        ) as gz_inf:
+            gz_inf.write(data)
+        compressed_data = gz_outf.getvalue()
+
+    if len(compressed_data) < len(data):
+        return compressed_data
+    return data
+
+
+# path, data offset, data size, number of failed attempts
+SpoolEntry = _t.Tuple[str, int, int, int]
+
+
+class Spool:
+    """A write-ahead spool file: a sequence of entries, each of which is a header
+    followed by a path and some data.
+
+    New entries are appended with a single `write`.  Entries that fail to be
+    done with get retried after some later entry is done with successfully.
+    Entries that fail `max_attempts` times get moved to a separate spool file
+    with `failed_suffix` appended to its path.  When all of the appended
+    entries are successfully done with or moved, the file gets truncated.
+    Entries left in it by a previous run, which was killed before that could
+    happen, can be found with `load`.
+    """
+
+    magic = b"HWS2"
+    # magic, path size, data size
+    header = _struct.Struct("!4sIQ")
+    # headers of all known versions, by magic; "HWS1" had 32-bit data sizes
+    headers = {b"HWS1": _struct.Struct("!4sII"), magic: header}
+    max_attempts = 3
+    failed_suffix = ".failed"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = _threading.Lock()
+        self.pending = 0
+        # entries which failed to be done with, to be retried later
+        self.failed: _t.List[SpoolEntry] = []
+        # pylint: disable=consider-using-with
+        self.fobj = open(path, "ab", buffering=0)
+        if _fcntl is not None:
+            try:
+                _fcntl.flock(self.fobj.fileno(), _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+            except OSError as exc:
+                self.fobj.close()
+                raise OSError(f"`{path}` is being used by another process") from exc
+        self.size = _os.fstat(self.fobj.fileno()).st_size
+
+    def load(self) -> _t.List[SpoolEntry]:
+        """Find all complete entries and drop the incomplete one, if any. Only
+        headers and paths get read, use `read` to get the data."""
+        res = []
+        pos = 0
+        with open(self.path, "rb") as f:
+            while pos + 4 <= self.size:
+                f.seek(pos)
+                header = self.headers.get(f.read(4), None)
+                if header is None or pos + header.size > self.size:
+                    break
+                f.seek(pos)
+                _magic, psize, dsize = header.unpack(f.read(header.size))
+                start = pos + header.size
+                end = start + psize + dsize
+                if end > self.size:
+                    break
+                res.append((f.read(psize).decode("utf-8"), start + psize, dsize, 0))
+                pos = end
+
+        if pos < self.size:
+            _sys.stderr.write(f"warning: dropping an incomplete entry from `{self.path}`\n")
+            _sys.stderr.flush()
+            self.fobj.truncate(pos)
+            self.size = pos
+        self.pending = len(res)
+        return res
+
+    def read(self, entry: SpoolEntry) -> bytes:
+        """Read the data of a given entry."""
+        _path, offset, size, _attempts = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+        if len(data) != size:
+            raise OSError(f"`{self.path}` was truncated")
+        return data
+
+    def append(self, path: str, data: bytes) -> SpoolEntry:
+        bpath = path.encode("utf-8")
+        entry = self.header.pack(self.magic, len(bpath), len(data)) + bpath + data
+        with self.lock:
+            try:
+                done = 0
+                while done < len(entry):
+                    done += self.fobj.write(entry[done:])
+            except BaseException:
+                # do not leave partial entries behind
+                self.fobj.truncate(self.size)
+                raise
+            offset = self.size + self.header.size + len(bpath)
+            self.size += len(entry)
+            self.pending += 1
+        return path, offset, len(data), 0
+
+    def done(self, entry: SpoolEntry, ok: bool) -> _t.List[SpoolEntry]:
+        """Mark an entry as done with, successfully or not. Returns previously
+        failed entries that should be retried now, which become pending again."""
+        if not ok:
+            path, offset, size, attempts = entry
+            entry = (path, offset, size, attempts + 1)
+            if entry[3] >= self.max_attempts and self.set_aside(entry):
+                ok = True
+
+        with self.lock:
+            self.pending -= 1
+            if not ok:
+                # keep everything, to be retried later
+                self.failed.append(entry)
+                return []
+            if self.pending == 0 and len(self.failed) > 0:
+                # whatever made them fail might have been fixed by now
+                res = self.failed
+                self.failed = []
+                self.pending = len(res)
+                return res
+            if self.pending == 0 and self.size > 0:
+                self.fobj.truncate(0)
+                self.size = 0
+            return []
+
+    def set_aside(self, entry: SpoolEntry) -> bool:
+        """Move an entry to the spool file of failed entries. Returns `True` on success."""
+        path = entry[0]
+        failed_path = self.path + self.failed_suffix
+        try:
+            bpath = path.encode("utf-8")
+            data = self.read(entry)
+            with open(failed_path, "ab") as f:
+                start = f.tell()
+                try:
+                    f.write(self.header.pack(self.magic, len(bpath), len(data)) + bpath + data)
+                except BaseException:
+                    # do not leave partial entries behind
+                    f.truncate(start)
+                    raise
+        except Exception as exc:
+            _sys.stderr.write(f"error: failed to move `{path}` to `{failed_path}`: {exc}\n")
+            _sys.stderr.flush()
+            return False
+        _sys.stderr.write(
+            f"error: `{path}` failed to be dumped {entry[3]} times, moved it to `{failed_path}`; to retry, append that file to `{self.path}` while the server is not running\n"
+        )
+        _sys.stderr.flush()
+        return True
+
+    def close(self) -> None:
+        self.fobj.close()
+
+
+class ThreadingWSGIServer(_socketserver.ThreadingMixIn, _wsgiss.WSGIServer):
+    """`WSGIServer` that handles each connection in a separate thread.
+
+    On `server_close`, it waits for all of them to finish.
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+
 class HTTPDumpServer(_threading.Thread):
     """HTTP server that accepts HTTP dumps as POST data, tries to compresses them
     with gzip, and saves them in a given directory.
 
+    Each connection is handled in a separate thread, while compression is done
+    by a pool of `--jobs` worker threads, so that bursts of dumps would not
+    queue up behind each other.  Unless `--no-spool` is set, dumps are appended
+    to a write-ahead `Spool` and acknowledged before they get compressed.
+
     This runs in a separate thread so that KeyboardInterrupt and such
     would not interrupt a dump in the middle.
     """
@@ -58,7 +361,10 @@ class HTTPDumpServer(_threading.Thread):
     def __init__(self, cargs: _argparse.Namespace, *args: _t.Any, **kwargs: _t.Any) -> None:
         super().__init__(*args, **kwargs)
         self.httpd = _wsgiss.make_server(
-            cargs.host, cargs.port, _wsgival.validator(self.handle_request)
+            cargs.host,
+            cargs.port,
+            _wsgival.validator(self.handle_request),
+            server_class=ThreadingWSGIServer,
         )
         self.cargs = cargs
         self.server_info_json = _json.dumps(
@@ -67,8 +373,22 @@ class HTTPDumpServer(_threading.Thread):
                 "dump_wrr": "/pwebarc/dump",
             }
         ).encode("utf-8")
+        self.pool = _cf.ThreadPoolExecutor(max_workers=cargs.jobs)
+        self.lock = _threading.Lock()
         self.epoch = 0
         self.num = 0
+
+        self.spool: _t.Optional[Spool] = None
+        if cargs.spool:
+            _os.makedirs(cargs.root, exist_ok=True)
+            try:
+                self.spool = Spool(_os.path.join(cargs.root, "hoardy-web-sas.spool"))
+            except OSError as exc:
+                self.httpd.server_close()
+                raise SystemExit(f"error: {exc}") from exc
+            for entry in self.spool.load():
+                self.place_spooled(entry)
+
         print(f"Working as an archiving server at http://{cargs.host}:{cargs.port}/")
 
     def run(self) -> None:
@@ -76,6 +396,67 @@ class HTTPDumpServer(_threading.Thread):
 
     def stop(self) -> None:
         self.httpd.shutdown()
+        # wait for unfinished dumps
+        self.httpd.server_close()
+        self.pool.shutdown()
+        if self.spool is not None:
+            self.spool.close()
+
+    def print(self, *args: str) -> None:
+        with self.lock:
+            print(*args, flush=True)
+
+    def place(self, rel_path: str, data: bytes) -> None:
+        """Compress `data`, if needed, and write it to `rel_path` under `--archive-to`."""
+        cargs = self.cargs
+        path = _os.path.join(cargs.root, rel_path)
+        if _os.path.exists(path):
+            # it was dumped before the previous run stopped
+            return
+
+        if cargs.compress:
+            data = gzip_maybe(data, cargs.compress_level)
+
+        _os.makedirs(_os.path.dirname(path), exist_ok=True)
+
+        tmp_path = path + ".part"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        except Exception:
+            try:
+                _os.unlink(tmp_path)
+            except Exception:
+                pass
+            raise
+
+        _os.rename(tmp_path, path)
+        self.print("dumped", path)
+
+    def place_spooled(self, entry: SpoolEntry, data: _t.Optional[bytes] = None) -> None:
+        """`place` a spooled entry, and then retry previously failed ones, if it
+        was placed successfully."""
+        spool = self.spool
+        assert spool is not None
+        todo = [(entry, data)]
+        while len(todo) > 0:
+            entry, data = todo.pop()
+            rel_path = entry[0]
+            ok = False
+            try:
+                if data is None:
+                    data = spool.read(entry)
+                self.place(rel_path, data)
+                ok = True
+            except Exception as exc:
+                _sys.stderr.write(
+                    f"error: failed to dump `{rel_path}`, keeping it in the spool: {exc}\n"
+                )
+                _sys.stderr.flush()
+            finally:
+                data = None
+                retry = spool.done(entry, ok)
+            todo += [(e, None) for e in retry]
 
     def handle_request(self, env: _t.Any, start_response: _t.Any) -> _t.Iterator[bytes]:
         def end_with(explanation: str, more: bytes) -> _t.Iterator[bytes]:
@@ -129,58 +510,35 @@ class HTTPDumpServer(_threading.Thread):
                     todo -= len(res)
                 data = cborf.getvalue()
 
-            if _cbor2 is not None:
-                rparsed = repr(_cbor2.loads(data))
+            if not cargs.no_print:
+                rparsed = CBORAbridger(data).abridge()
                 if len(rparsed) < 3000:
-                    print("parsed", rparsed)
+                    self.print("parsed", rparsed)
                 else:
-                    print("parsed", rparsed[:1500])
-                    print("...")
-                    print(rparsed[-1500:])
+                    self.print("parsed", rparsed[:1500] + "\n...\n" + rparsed[-1500:])
                 del rparsed
 
-            if cargs.compress:
-                # gzip it, if it gzips
-                with _io.BytesIO() as gz_outf:
-                    with _gzip.GzipFile(
-                        fileobj=gz_outf, filename="", mtime=0, mode="wb", compresslevel=9
-                    ) as gz_inf:
-                        gz_inf.write(data)
-                    compressed_data = gz_outf.getvalue()
-
-                if len(compressed_data) < len(data):
-                    data = compressed_data
-                del compressed_data
-
             # write it out to a file in {cargs.root}/<bucket>/<year>/<month>/<day>/<epoch>_<number>.wrr
 
-            # because time.time() gives a float
-            epoch = _time.time_ns() // 1000000000
-            # number reqres sequentially within the same second
-            if self.epoch != epoch:
-                self.num = 0
-            else:
-                self.num += 1
-            self.epoch = epoch
+            with self.lock:
+                # because time.time() gives a float
+                epoch = _time.time_ns() // 1000000000
+                # number reqres sequentially within the same second
+                if self.epoch != epoch:
+                    self.num = 0
+                else:
+                    self.num += 1
+                self.epoch = epoch
+                num = self.num
 
             dd = list(map(lambda x: format(x, "02"), _time.gmtime(epoch)[0:3]))
-            directory = _os.path.join(cargs.root, bucket, *dd)
-            path = _os.path.join(directory, f"{str(epoch)}_{mypid}_{str(self.num)}.wrr")
-            _os.makedirs(directory, exist_ok=True)
-
-            tmp_path = path + ".part"
-            try:
-                with open(tmp_path, "wb") as f:
-                    f.write(data)
-            except Exception:
-                try:
-                    _os.unlink(tmp_path)
-                except Exception:
-                    pass
-                raise
+            rel_path = _os.path.join(bucket, *dd, f"{str(epoch)}_{mypid}_{str(num)}.wrr")
 
-            _os.rename(tmp_path, path)
-            print("dumped", path)
+            if self.spool is not None:
+                entry = self.spool.append(rel_path, data)
+                self.pool.submit(self.place_spooled, entry, data)
+            else:
+                self.pool.submit(self.place, rel_path, data).result()
 
             yield from end_with("200 OK", b"")
         else:
@@ -188,8 +546,6 @@ class HTTPDumpServer(_threading.Thread):
 
 
 def main() -> None:
-    global _cbor2
-
     # fmt: off
     parser = _argparse.ArgumentParser(prog=__prog__,
         description="""A simple archiving server for the `Hoardy-Web` Web Extension browser add-on: listen on given `--host` and `--port` via `HTTP`, dump each `POST`ed `WRR` dump to `<--archive-to>/<bucket>/<year>/<month>/<day>/<epoch>_<number>.wrr`.""",
@@ -215,6 +571,20 @@ def main() -> None:
         help="dump new archivals to disk without compression",
     )
     parser.set_defaults(compress=True)
+    grp = parser.add_mutually_exclusive_group()
+    grp.add_argument("--spool", dest="spool", action="store_const", const=True,
+        help="append new archivals to `<--archive-to>/hoardy-web-sas.spool` write-ahead spool file and respond immediately, then compress and dump them in the background; archivals left in the spool when the server stops abnormally will get dumped when it is started again; archivals that fail to be dumped 3 times get moved to `<--archive-to>/hoardy-web-sas.spool.failed`; default",
+    )
+    grp.add_argument("--no-spool", dest="spool", action="store_const", const=False,
+        help="compress and dump new archivals before responding",
+    )
+    parser.set_defaults(spool=True)
+    parser.add_argument("--compress-level", metavar="INT", type=int, default=9,
+        help="`gzip` compression level to use, from `1` (fastest) to `9` (smallest); default: `%(default)s`",
+    )
+    parser.add_argument("-j", "--jobs", metavar="INT", type=int, default=_os.cpu_count() or 1,
+        help="number of worker threads to use for compressing new archivals; default: the number of CPUs",
+    )
 
     parser.add_argument("--default-bucket", "--default-profile", metavar="NAME", default="default", type=str,
         help="default bucket to use when no `profile` query parameter is supplied by the extension; default: `%(default)s`",
@@ -224,7 +594,7 @@ def main() -> None:
     )
 
     parser.add_argument("--no-print", "--no-print-cbors", action="store_true",
-        help="don't print parsed representations of newly archived CBORs to stdout even if `cbor2` module is available",
+        help="don't print abridged representations of newly archived CBORs to stdout",
     )
     # fmt: on
 
@@ -236,19 +606,12 @@ def main() -> None:
         print(parser.format_help())
         _sys.exit(0)
 
-    cargs.root = _os.path.expanduser(cargs.root)
+    if not 1 <= cargs.compress_level <= 9:
+        parser.error("`--compress-level` must be between `1` and `9`")
+    if cargs.jobs < 1:
+        parser.error("`--jobs` must be positive")
 
-    if not cargs.no_print:
-        try:
-            import cbor2 as cbor2_
-        except ImportError:
-            _sys.stderr.write(
-                "warning: `cbor2` module is not available, forcing `--no-print` option\n"
-            )
-            _sys.stderr.flush()
-        else:
-            _cbor2 = cbor2_
-            del cbor2_
+    cargs.root = _os.path.expanduser(cargs.root)
 
     t = HTTPDumpServer(cargs)
     t.start()
@@ -0,0 +1,410 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""`main()`."""
+
+import dataclasses as _dc
+import json as _json
+import os as _os
+import platform as _platform
+import signal as _signal
+import socket as _socket
+import statistics as _statistics
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+import time as _time
+import typing as _t
+import urllib.parse as _up
+import urllib.request as _ur
+
+from gettext import gettext
+
+from kisstdlib import *
+from kisstdlib import argparse_ext as argparse
+from kisstdlib.io import *
+
+from .generate import *
+
+__prog__ = "python3 -m bench"
+
+BenchResult = dict[str, _t.Any]
+
+
+def hoardy_web_version() -> str:
+    with open(
+        _os.path.join(_os.path.dirname(__file__), "..", "VERSION"), "r", encoding="utf-8"
+    ) as f:
+        return f.read().strip()
+
+
+def hoardy_web_cmd(*args: str) -> list[str]:
+    return [_sys.executable, "-m", "hoardy_web", "--profile-json"] + list(args)
+
+
+def parse_profile(stderr_data: bytes) -> dict[str, _t.Any] | None:
+    """Get the `--profile-json` output from `stderr` data."""
+    for line in reversed(stderr_data.splitlines()):
+        if line.startswith(b'{"wall_ns":'):
+            return _t.cast(dict[str, _t.Any], _json.loads(line))
+    return None
+
+
+def run_timed(args: list[str]) -> tuple[float, dict[str, _t.Any] | None]:
+    start = _time.monotonic()
+    with yes_signals():
+        proc = _subprocess.run(args, stdin=_subprocess.DEVNULL, stdout=_subprocess.DEVNULL, stderr=_subprocess.PIPE, check=False)  # fmt: skip
+    elapsed = _time.monotonic() - start
+    if proc.returncode != 0:
+        raise Failure(
+            "`%s` failed with exit code %d:\n%s",
+            " ".join(args),
+            proc.returncode,
+            proc.stderr.decode("utf-8", "replace"),
+        )
+    return elapsed, parse_profile(proc.stderr)
+
+
+def summarize(
+    name: str, runs: list[tuple[float, dict[str, _t.Any] | None]], items: int
+) -> BenchResult:
+    times = [t for t, _ in runs]
+    best = min(times)
+    res: BenchResult = {
+        "name": name,
+        "runs_s": times,
+        "best_s": best,
+        "median_s": _statistics.median(times),
+        "items": items,
+        "items_per_s": items / best if best > 0 else None,
+    }
+    # keep the profile of the best run
+    for t, profile in runs:
+        if t == best and profile is not None:
+            res["profile"] = profile
+            break
+    return res
+
+
+def bench_command(
+    cargs: _t.Any,
+    name: str,
+    items: int,
+    make_args: _t.Callable[[str], list[str]],
+    prepare: _t.Callable[[str], None] | None = None,
+) -> BenchResult:
+    """Run a `hoardy-web` sub-command `--repeat` times, each time in a fresh
+    temporary directory."""
+    runs = []
+    for _ in range(cargs.repeat):
+        with _tempfile.TemporaryDirectory(prefix="hoardy_web_bench_") as tmp:
+            if prepare is not None:
+                prepare(tmp)
+            runs.append(run_timed(make_args(tmp)))
+    return summarize(name, runs, items)
+
+
+def first_file(path: str) -> str:
+    for root, dirs, files in _os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            return _os.path.join(root, name)
+    raise Failure("no files under `%s`", path)
+
+
+def bench_startup(cargs: _t.Any, input_path: str) -> BenchResult:
+    """Measure the startup time of short-lived `hoardy-web` invocations, like the
+    ones done by `hoardy-web-xdg-open`, by running `find` on a single file
+    `--startup-runs` times."""
+    args = hoardy_web_cmd("find", first_file(input_path))
+    runs = []
+    for _ in range(cargs.repeat):
+        elapsed = 0.0
+        profile = None
+        for _ in range(cargs.startup_runs):
+            t, profile = run_timed(args)
+            elapsed += t
+        runs.append((elapsed, profile))
+    return summarize("startup", runs, cargs.startup_runs)
+
+
+def get_free_port() -> int:
+    with _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return _t.cast(int, sock.getsockname()[1])
+
+
+def stop_serve(proc: _subprocess.Popen[bytes]) -> bytes:
+    """Stop `serve` gently, so that it would print its `--profile-json` output.
+    `serve` delays `SIGINT`s received while it is busy, so repeat it a few times
+    before giving up."""
+    for _ in range(10):
+        proc.send_signal(_signal.SIGINT)
+        try:
+            _, stderr_data = proc.communicate(timeout=1)
+        except _subprocess.TimeoutExpired:
+            continue
+        return stderr_data
+    proc.kill()
+    _, stderr_data = proc.communicate()
+    return stderr_data
+
+
+def bench_serve(cargs: _t.Any, input_path: str, urls: list[str]) -> BenchResult:
+    """Measure `serve` replay throughput."""
+    if len(urls) == 0:
+        raise Failure("no pages to replay")
+
+    requests = [urls[i % len(urls)] for i in range(cargs.serve_requests)]
+
+    runs = []
+    for _ in range(cargs.repeat):
+        port = get_free_port()
+        base = f"http://127.0.0.1:{port}"
+        args = hoardy_web_cmd("serve", "--quiet", "--port", str(port), input_path)
+        # children inherit our signal mask, and `serve` needs a `SIGINT` to exit
+        with yes_signals(), _subprocess.Popen(args, stdin=_subprocess.DEVNULL, stdout=_subprocess.DEVNULL, stderr=_subprocess.PIPE) as proc:  # fmt: skip
+            try:
+                deadline = _time.monotonic() + cargs.serve_timeout
+                while True:
+                    try:
+                        with _ur.urlopen(base + "/hoardy-web/server-info") as resp:
+                            resp.read()
+                        break
+                    except OSError:
+                        if proc.poll() is not None or _time.monotonic() > deadline:
+                            raise Failure(
+                                "`serve` failed to start"
+                            )  # pylint: disable=raise-missing-from
+                        _time.sleep(0.05)
+
+                start = _time.monotonic()
+                for url in requests:
+                    try:
+                        with _ur.urlopen(base + "/web/+inf/" + _up.quote(url, safe=":/")) as resp:
+                            resp.read()
+                    except _ur.HTTPError as exc:
+                        # we count `404`s too, they still exercise the index
+                        exc.read()
+                elapsed = _time.monotonic() - start
+            finally:
+                stderr_data = stop_serve(proc)
+        runs.append((elapsed, parse_profile(stderr_data)))
+
+    return summarize("serve", runs, len(requests))
+
+
+def get_spec(cargs: _t.Any) -> ArchiveSpec:
+    return ArchiveSpec(**{f.name: getattr(cargs, f.name) for f in _dc.fields(ArchiveSpec)})
+
+
+def cmd_generate(cargs: _t.Any) -> None:
+    spec = get_spec(cargs)
+    urls = generate(spec, _os.path.expanduser(cargs.destination))
+    stderr.write_str_ln(gettext("generated %d files with %d pages") % (spec.files, len(urls)))
+
+
+def cmd_run(cargs: _t.Any) -> None:
+    spec = get_spec(cargs)
+    only = set(cargs.only) if cargs.only else None
+
+    def enabled(name: str) -> bool:
+        return only is None or name in only
+
+    with _tempfile.TemporaryDirectory(prefix="hoardy_web_bench_input_") as input_path:
+        start = _time.monotonic()
+        urls = generate(spec, input_path)
+        generate_s = _time.monotonic() - start
+
+        items = spec.files * max(1, spec.bundle)
+        results: list[BenchResult] = []
+
+        def report(res: BenchResult) -> None:
+            results.append(res)
+            if cargs.verbose:
+                stderr.write_str_ln(f"{res['name']}: best {res['best_s']:.3f}s, median {res['median_s']:.3f}s")  # fmt: skip
+
+        if enabled("startup"):
+            report(bench_startup(cargs, input_path))
+
+        if enabled("find"):
+            report(
+                bench_command(cargs, "find", items, lambda tmp: hoardy_web_cmd("find", input_path))
+            )
+
+        if enabled("stream"):
+            report(bench_command(cargs, "stream", items, lambda tmp: hoardy_web_cmd("stream", "--format=json", "-e", "net_url", "-e", "stime", "-e", "status", input_path)))  # fmt: skip
+
+        if spec.bundle <= 1:
+            # `--symlink` needs separate `WRR` files as inputs
+            def organize_args(tmp: str) -> list[str]:
+                return hoardy_web_cmd("organize", "--symlink", "--latest", "--to", _os.path.join(tmp, "out"), input_path)  # fmt: skip
+
+            def organize_prepare(tmp: str) -> None:
+                _subprocess.run(organize_args(tmp), stdin=_subprocess.DEVNULL, stdout=_subprocess.DEVNULL, stderr=_subprocess.DEVNULL, check=True)  # fmt: skip
+
+            if enabled("organize"):
+                report(bench_command(cargs, "organize", items, organize_args))
+            if enabled("organize-rerun"):
+                report(bench_command(cargs, "organize-rerun", items, organize_args, organize_prepare))  # fmt: skip
+        elif enabled("import"):
+            report(bench_command(cargs, "import", items, lambda tmp: hoardy_web_cmd("import", "bundle", "--to", _os.path.join(tmp, "out"), input_path)))  # fmt: skip
+
+        if enabled("mirror"):
+            report(bench_command(cargs, "mirror", items, lambda tmp: hoardy_web_cmd("mirror", "--to", _os.path.join(tmp, "out"), input_path)))  # fmt: skip
+
+        if enabled("serve"):
+            report(bench_serve(cargs, input_path, urls))
+
+    result = {
+        "version": 1,
+        "hoardy_web_version": hoardy_web_version(),
+        "python": _platform.python_version(),
+        "platform": _platform.platform(),
+        "cpus": _os.cpu_count(),
+        "spec": _dc.asdict(spec),
+        "generate_s": generate_s,
+        "repeat": cargs.repeat,
+        "results": results,
+    }
+    data = _json.dumps(result, indent=2 if cargs.pretty else None)
+    if cargs.output is not None:
+        with open(_os.path.expanduser(cargs.output), "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        stdout.write_str_ln(data)
+
+
+benchmarks = [
+    "startup",
+    "find",
+    "stream",
+    "organize",
+    "organize-rerun",
+    "import",
+    "mirror",
+    "serve",
+]
+
+
+def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
+    _: _t.Callable[[str], str] = gettext
+
+    # fmt: off
+    parser = argparse.BetterArgumentParser(
+        prog=__prog__,
+        description=_("Generate synthetic `WRR` archives and benchmark `hoardy-web` sub-commands on them.")
+        + "\n\n"
+        + _("Generated archives are deterministic: the same options always produce byte-identical inputs."),
+    )
+
+    subparsers = parser.add_subparsers(title="subcommands")
+
+    def add_spec(cmd: _t.Any) -> None:
+        agrp = cmd.add_argument_group("synthetic archive parameters")
+        defaults = ArchiveSpec()
+        helps = {
+            "files": _("number of generated files"),
+            "bundle": _("number of reqres per file; `1` generates separate `.wrr` files, larger values generate `.wrrb` bundles"),
+            "hosts": _("number of distinct hostnames"),
+            "host_skew": _("exponent of the Zipf distribution of reqres between hostnames; `0` means uniform"),
+            "pages": _("number of distinct page URLs per hostname"),
+            "stylesheets": _("number of distinct stylesheet URLs per hostname"),
+            "images": _("number of distinct image URLs per hostname"),
+            "links": _("number of jump links per page"),
+            "requisites": _("number of requisite resource references (stylesheets and images) per page"),
+            "css_rules": _("number of rules per stylesheet, each referencing an image"),
+            "text_size": _("approximate size of page text, in bytes"),
+            "duplicates": _("probability of a reqres being a later re-visit of an already generated URL"),
+            "duplicates_same": _("probability of such a re-visit having exactly the same content"),
+            "seed": _("random seed"),
+        }
+        for f in _dc.fields(ArchiveSpec):
+            value = getattr(defaults, f.name)
+            agrp.add_argument(f"--{f.name.replace('_', '-')}", dest=f.name, type=type(value), default=value,
+                help=helps[f.name] + _("; default: `%(default)s`"),
+            )
+
+    cmd = subparsers.add_parser("generate",
+        help=_("generate a synthetic archive"),
+        description=_("Generate a synthetic archive into `DESTINATION`."),
+    )
+    add_spec(cmd)
+    cmd.add_argument("destination", metavar="DESTINATION", type=str, help=_("destination directory"))
+    cmd.set_defaults(func=cmd_generate)
+
+    cmd = subparsers.add_parser("run",
+        help=_("generate a synthetic archive into a temporary directory and benchmark `hoardy-web` on it"),
+        description=_("""Generate a synthetic archive into a temporary directory, run `hoardy-web` sub-commands on it, and print the results as `JSON`.
+
+Each sub-command runs as a separate process with `--profile-json` set, so each result also includes the per-stage profile of its fastest run.
+
+Available benchmarks:
+
+- `startup`: `hoardy-web find` on a single input file, repeated `--startup-runs` times, in invocations per second;
+- `find`: `hoardy-web find`;
+- `stream`: `hoardy-web stream --format=json` of a few cheap expressions;
+- `organize`: `hoardy-web organize --symlink --latest` into an empty directory; only with `--bundle 1`;
+- `organize-rerun`: same, but into a directory where that same command was already run; only with `--bundle 1`;
+- `import`: `hoardy-web import bundle`; only with `--bundle` larger than `1`;
+- `mirror`: `hoardy-web mirror` of everything;
+- `serve`: `hoardy-web serve` replay throughput, in requests per second, for `--serve-requests` sequential requests to generated pages.
+"""),
+    )
+    add_spec(cmd)
+    cmd.add_argument("-v", "--verbose", action="store_true",
+        help=_("print a short summary of each result to `stderr` as soon as it is available"),
+    )
+    cmd.add_argument("--only", metavar="NAME", action="append", choices=benchmarks,
+        help=_("run only the given benchmark; can be specified multiple times"),
+    )
+    cmd.add_argument("--repeat", metavar="INT", type=int, default=3,
+        help=_("run each benchmark this many times and report the best and the median times; default: `%(default)s`"),
+    )
+    cmd.add_argument("--startup-runs", metavar="INT", type=int, default=20,
+        help=_("number of invocations to make when benchmarking `startup`; default: `%(default)s`"),
+    )
+    cmd.add_argument("--serve-requests", metavar="INT", type=int, default=500,
+        help=_("number of replay requests to make when benchmarking `serve`; default: `%(default)s`"),
+    )
+    cmd.add_argument("--serve-timeout", metavar="SECONDS", type=float, default=600,
+        help=_("maximum time to wait for `serve` to start; default: `%(default)s`"),
+    )
+    cmd.add_argument("--pretty", action="store_true",
+        help=_("indent the `JSON` output"),
+    )
+    cmd.add_argument("-o", "--output", metavar="PATH", type=str,
+        help=_("write the `JSON` output to this file instead of `stdout`"),
+    )
+    cmd.set_defaults(func=cmd_run)
+    # fmt: on
+
+    return parser
+
+
+def main() -> None:
+    setup_result = setup_kisstdlib(__prog__, do_setup_delay_signals=False)
+    run_kisstdlib_main(
+        setup_result,
+        argparse.make_argparser_and_run,
+        make_argparser,
+        lambda cargs: cargs.func(cargs),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Generating synthetic `WRR` archives."""
+
+import dataclasses as _dc
+import os as _os
+import random as _random
+
+from kisstdlib.compression import gzip_maybe
+from kisstdlib.fs import atomic_write
+from kisstdlib.time import Timestamp
+
+from hoardy_web.wrr import Reqres, parse_url, trivial_Reqres, wrr_dumps
+
+
+@_dc.dataclass
+class ArchiveSpec:
+    """Parameters of a synthetic archive.
+
+    Generation is deterministic: the same `ArchiveSpec` always produces
+    byte-identical archives.
+    """
+
+    # number of generated files
+    files: int = 1000
+    # number of reqres per file; `1` produces `.wrr` files, larger values produce `.wrrb` bundles
+    bundle: int = 1
+    # number of distinct hostnames and the exponent of Zipf distribution of reqres between them
+    hosts: int = 8
+    host_skew: float = 1.0
+    # number of pages, stylesheets, and images per host
+    pages: int = 256
+    stylesheets: int = 4
+    images: int = 64
+    # number of jump links and requisite references per page
+    links: int = 16
+    requisites: int = 8
+    # number of rules per stylesheet, each of which references an image
+    css_rules: int = 32
+    # approximate size of page text, in bytes
+    text_size: int = 4096
+    # probability of a reqres being a later re-visit of an already generated URL
+    duplicates: float = 0.1
+    # probability of such a re-visit having exactly the same content
+    duplicates_same: float = 0.5
+    seed: int = 0
+
+
+words = [
+    "archive", "browser", "capture", "data", "document", "example", "hoardy", "index",
+    "link", "mirror", "network", "offline", "page", "private", "replay", "request",
+    "response", "scrub", "site", "static", "visit", "web", "wrr", "zip",
+]  # fmt: skip
+
+
+class Generator:
+    def __init__(self, spec: ArchiveSpec) -> None:
+        self.spec = spec
+        self.rng = _random.Random(spec.seed)
+        self.hostnames = [f"host{i}.example.org" for i in range(max(1, spec.hosts))]
+        self.host_weights = [1 / (i + 1) ** spec.host_skew for i in range(len(self.hostnames))]
+        self.stime = Timestamp(1700000000)
+        self.generated: list[tuple[str, str, bytes]] = []
+        self.page_urls: list[str] = []
+
+    def text(self, size: int) -> str:
+        rng = self.rng
+        res: list[str] = []
+        length = 0
+        while length < size:
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(4, 16)))
+            res.append(sentence.capitalize() + ".")
+            length += len(sentence) + 2
+        return " ".join(res)
+
+    def page_url(self, hostname: str) -> str:
+        return f"https://{hostname}/page/{self.rng.randrange(self.spec.pages)}.html"
+
+    def stylesheet_url(self, hostname: str) -> str:
+        return f"https://{hostname}/static/style{self.rng.randrange(max(1, self.spec.stylesheets))}.css"
+
+    def image_url(self, hostname: str) -> str:
+        return f"https://{hostname}/media/image{self.rng.randrange(max(1, self.spec.images))}.png"
+
+    def page(self, hostname: str) -> bytes:
+        spec = self.spec
+        rng = self.rng
+        head = [f"<title>{self.text(32)}</title>"]
+        body = []
+        for _ in range(spec.requisites):
+            if rng.random() < 0.25:
+                head.append(f'<link rel="stylesheet" href="{self.stylesheet_url(hostname)}">')
+            else:
+                body.append(f'<img src="{self.image_url(hostname)}" alt="{rng.choice(words)}">')
+        for _ in range(spec.links):
+            other = hostname if rng.random() < 0.9 else rng.choice(self.hostnames)
+            body.append(f'<p>{self.text(spec.text_size // max(1, spec.links))} <a href="{self.page_url(other)}">{rng.choice(words)}</a></p>')  # fmt: skip
+        body.append(f'<script src="https://{hostname}/static/script.js"></script>')
+        return (
+            "<!DOCTYPE html>\n<html><head>"
+            + "".join(head)
+            + "</head><body>\n"
+            + "\n".join(body)
+            + "\n</body></html>\n"
+        ).encode("utf-8")
+
+    def stylesheet(self, hostname: str) -> bytes:
+        rules = []
+        for i in range(self.spec.css_rules):
+            rules.append(
+                f".c{i} {{ color: #{self.rng.randrange(0x1000000):06x}; background: url({self.image_url(hostname)}) }}"
+            )
+        return ("\n".join(rules) + "\n").encode("utf-8")
+
+    def image(self) -> bytes:
+        return b"\x89PNG\r\n\x1a\n" + self.rng.randbytes(self.rng.randint(256, 4096))
+
+    def next_reqres(self) -> Reqres:
+        spec = self.spec
+        rng = self.rng
+        self.stime = Timestamp(self.stime + 1)
+
+        if len(self.generated) > 0 and rng.random() < spec.duplicates:
+            url, ct, data = rng.choice(self.generated)
+            if rng.random() >= spec.duplicates_same:
+                hostname = parse_url(url).hostname
+                if ct == "text/html":
+                    data = self.page(hostname)
+                elif ct == "text/css":
+                    data = self.stylesheet(hostname)
+                else:
+                    data = self.image()
+        else:
+            hostname = rng.choices(self.hostnames, self.host_weights)[0]
+            kind = rng.random()
+            if kind < 0.6:
+                url, ct, data = self.page_url(hostname), "text/html", self.page(hostname)
+                self.page_urls.append(url)
+            elif kind < 0.7:
+                url, ct, data = self.stylesheet_url(hostname), "text/css", self.stylesheet(hostname)
+            else:
+                url, ct, data = self.image_url(hostname), "image/png", self.image()
+            self.generated.append((url, ct, data))
+
+        return trivial_Reqres(parse_url(url), ct, self.stime, self.stime, self.stime, data=data)
+
+
+def generate(spec: ArchiveSpec, destination: str) -> list[str]:
+    """Generate a synthetic archive into `destination` and return the list of
+    URLs of generated pages."""
+    gen = Generator(spec)
+    for n in range(spec.files):
+        if spec.bundle <= 1:
+            reqres = gen.next_reqres()
+            path = _os.path.join(destination, reqres.request.url.hostname, f"{n:08}.wrr")
+            data = wrr_dumps(reqres)
+        else:
+            path = _os.path.join(destination, "bundles", f"{n:08}.wrrb")
+            data = gzip_maybe(
+                b"".join(wrr_dumps(gen.next_reqres(), False) for _ in range(spec.bundle))
+            )
+        atomic_write(data, path, sync=False)
+    return sorted(set(gen.page_urls))
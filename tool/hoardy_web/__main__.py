@@ -20,6 +20,8 @@
 import collections as _c
 import dataclasses as _dc
 import errno as _errno
+import fcntl as _fcntl
+import gzip as _gzip
 import hashlib as _hashlib
 import io as _io
 import json as _json
@@ -28,10 +30,12 @@ import os as _os
 import re as _re
 import shutil as _shutil
 import signal as _signal
+import socket as _socket
 import stat as _stat
 import subprocess as _subprocess
 import sys as _sys
 import tempfile as _tempfile
+import threading as _threading
 import typing as _t
 import urllib.parse as _up
 
@@ -46,6 +50,11 @@ from kisstdlib.sorted import SortedList, SortedIndex, nearer_to_than
 from .filter import *
 from .wrr import *
 from .output import *
+from .warc import *
+from .har import *
+from .client import *
+from .spool import *
+from .index import *
 
 __prog__ = "hoardy-web"
 
@@ -195,6 +204,10 @@ def compile_expr(expr: str) -> tuple[str, LinstFunc]:
     return (expr, linst_compile(expr, ReqresExpr_lookup))
 
 
+def compile_exprs(exprs: list[tuple[str, LinstFunc]]) -> LinstDAG:
+    return linst_compile_dag([expr for expr, _func in exprs], ReqresExpr_lookup)
+
+
 def elaborate_output(kind: str, aliases: dict[str, str], value: str) -> str:
     try:
         return aliases[value]
@@ -251,13 +264,16 @@ def load_map_orderly(
             return
         seen_paths.add(abs_dir_or_file_path)
 
-    for path, _, _ in iter_subtree(
-        dir_or_file_path,
-        include_files=with_extension_not_in([".part", b".part"]),
-        include_directories=False,
-        order=order,
-        follow_symlinks=follow_symlinks,
-        handle_error=None if errors == "fail" else _logging.error,
+    for path, _, _ in prof.wrap_iter(
+        "walk",
+        iter_subtree(
+            dir_or_file_path,
+            include_files=with_extension_not_in([".part", b".part"]),
+            include_directories=False,
+            order=order,
+            follow_symlinks=follow_symlinks,
+            handle_error=None if errors == "fail" else _logging.error,
+        ),
     ):
         raise_first_delayed_signal()
 
@@ -304,7 +320,9 @@ def map_wrr_paths(
             raise_first_delayed_signal()
 
             rrexpr.sniff = cargs.sniff
-            if not filters_allow(rrexpr):
+            with prof.stage("filters"):
+                allowed = filters_allow(rrexpr)
+            if not allowed:
                 continue
             emit_func(rrexpr)
 
@@ -319,14 +337,20 @@ def dispatch_rrexprs_load() -> LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.An
 
     class Mutable:
         not_warned: bool = True
+        # `mitmproxy` is slow to import, so we only try importing it when we need it
+        mitmproxy_loadf: LoadFFunc[_t.Any, _t.Iterator[ReqresExpr[_t.Any]]] | None = None
+        mitmproxy_tried: bool = False
 
-    have_mitmproxy = False
-    try:
-        from .mitmproxy import rrexprs_mitmproxy_loadf
-    except ImportError as exc:
-        import_failed.append(("mitmproxy", get_traceback(exc)))
-    else:
-        have_mitmproxy = True
+    def get_mitmproxy_loadf() -> LoadFFunc[_t.Any, _t.Iterator[ReqresExpr[_t.Any]]] | None:
+        if not Mutable.mitmproxy_tried:
+            Mutable.mitmproxy_tried = True
+            try:
+                from .mitmproxy import rrexprs_mitmproxy_loadf
+            except ImportError as exc:
+                import_failed.append(("mitmproxy", get_traceback(exc)))
+            else:
+                Mutable.mitmproxy_loadf = rrexprs_mitmproxy_loadf
+        return Mutable.mitmproxy_loadf
 
     is_wrr: IncludeFilesFunc[_t.AnyStr] = with_extension_in([".wrr", b".wrr"])
     is_wrrb: IncludeFilesFunc[_t.AnyStr] = with_extension_in([".wrrb", b".wrrb"])
@@ -352,12 +376,14 @@ def dispatch_rrexprs_load() -> LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.An
                 return
             except Exception as exc:
                 warn(path, "wrrb", exc)
-        elif have_mitmproxy:
-            try:
-                yield from rrexprs_mitmproxy_loadf(path)
-                return
-            except Exception as exc:
-                warn(path, "mitmproxy", exc)
+        else:
+            mitmproxy_loadf = get_mitmproxy_loadf()
+            if mitmproxy_loadf is not None:
+                try:
+                    yield from mitmproxy_loadf(path)
+                    return
+                except Exception as exc:
+                    warn(path, "mitmproxy", exc)
 
         if Mutable.not_warned:
             Mutable.not_warned = False
@@ -406,16 +432,19 @@ def cmd_pprint(cargs: _t.Any) -> None:
     filters_warn()
 
 
-def print_exprs(
-    rrexpr: ReqresExpr[_t.Any],
-    exprs: list[tuple[str, LinstFunc]],
+def print_values(
+    exprs: list[str],
+    values: _t.Iterable[_t.Any],
     separator: bytes,
     fobj: MinimalIOWriter,
+    flush: bool = False,
 ) -> None:
+    """Print `values` of `exprs`. When `values` is an iterator, this will only
+    consume `len(exprs)` elements of it."""
     not_first = False
-    for expr, func in exprs:
+    for expr, value in zip(exprs, values):
         try:
-            data = get_bytes(rrexpr.eval_func(func))
+            data = get_bytes(value)
         except CatastrophicFailure as exc:
             raise exc.elaborate("while evaluating `%s`", expr)
 
@@ -424,6 +453,107 @@ def print_exprs(
         not_first = True
 
         fobj.write_bytes(data)
+        if flush:
+            fobj.flush()
+
+
+def print_exprs(
+    rrexpr: ReqresExpr[_t.Any],
+    exprs: LinstDAG,
+    separator: bytes,
+    fobj: MinimalIOWriter,
+) -> None:
+    print_values(exprs.exprs, rrexpr.eval_dag(exprs), separator, fobj)
+
+
+def get_exprs_bytes(rrexpr: ReqresExpr[_t.Any], exprs: LinstDAG) -> list[bytes]:
+    """Like `print_exprs`, but return `bytes` of all values instead.
+
+    Since `bytes` values, like `response.body`, are returned as-is, this
+    does not copy anything.
+    """
+    res = []
+    for expr, value in zip(exprs.exprs, rrexpr.eval_dag(exprs)):
+        try:
+            res.append(get_bytes(value))
+        except CatastrophicFailure as exc:
+            raise exc.elaborate("while evaluating `%s`", expr)
+    return res
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Check if an `If-None-Match` `header` matches an `etag`, using the weak
+    comparison, as RFC9110 requires."""
+    if header is None:
+        return False
+    header = header.strip()
+    if header == "*":
+        return True
+    for value in header.split(","):
+        value = value.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+        if value == etag:
+            return True
+    return False
+
+
+def join_values_bytes(datas: list[bytes], separator: bytes) -> bytes:
+    if len(datas) == 1:
+        # skip the copy
+        return datas[0]
+    return separator.join(datas)
+
+
+def len_values_bytes(datas: list[bytes], separator: bytes) -> int:
+    return sum(map(len, datas)) + len(separator) * max(0, len(datas) - 1)
+
+
+values_chunk_size = 65536
+
+
+def iter_values_bytes(
+    datas: list[bytes], separator: bytes, start: int = 0, end: int | None = None
+) -> _t.Iterator[bytes]:
+    """Produce the `[start:end]` slice of the result of `join_values_bytes` as
+    a sequence of chunks of at most `values_chunk_size` bytes each, without
+    copying the whole thing."""
+    pos = 0
+    not_first = False
+    for data in datas:
+        for piece in [separator, data] if not_first else [data]:
+            plen = len(piece)
+            ppos, pos = pos, pos + plen
+            if plen == 0 or pos <= start:
+                continue
+            if end is not None and ppos >= end:
+                return
+
+            pstart = max(0, start - ppos)
+            pend = plen if end is None else min(plen, end - ppos)
+            if pstart == 0 and pend == plen and plen <= values_chunk_size:
+                yield piece
+                continue
+
+            view = memoryview(piece)
+            for cpos in range(pstart, pend, values_chunk_size):
+                yield bytes(view[cpos : min(pend, cpos + values_chunk_size)])
+        not_first = True
+
+
+def test_iter_values_bytes() -> None:
+    big = bytes(range(256)) * (values_chunk_size // 100)
+    for datas in [[], [b""], [b"a"], [b"a", b"", b"b"], [big], [b"a", big, big, b"b"]]:
+        for separator in [b"", b" ", b"\n\n"]:
+            expected = join_values_bytes(datas, separator)
+            chunks = list(iter_values_bytes(datas, separator))
+            assert all(len(c) <= values_chunk_size for c in chunks)
+            assert b"".join(chunks) == expected
+            assert len_values_bytes(datas, separator) == len(expected)
+
+            for start, end in [(0, 0), (0, 1), (1, 3), (2, 100000), (70000, None), (0, None)]:
+                sliced = b"".join(iter_values_bytes(datas, separator, start, end))
+                assert sliced == expected[start:end]
 
 
 default_expr_values = {
@@ -451,18 +581,26 @@ def cmd_get(cargs: _t.Any) -> None:
     if len(cargs.mexprs) == 0:
         cargs.mexprs = {stdout: [compile_expr(default_expr("get", cargs.default_expr))]}
 
+    outputs = list(cargs.mexprs.items())
+    exprs = compile_exprs([expr for _fobj, fexprs in outputs for expr in fexprs])
+
     exp_path = _os.path.expanduser(cargs.path)
     rrexpr = rrexpr_wrr_loadf(exp_path)
     rrexpr.sniff = cargs.sniff
 
-    for fobj, exprs in cargs.mexprs.items():
-        print_exprs(rrexpr, exprs, cargs.separator, fobj)
-        fobj.flush()
+    # print each value as soon as it is evaluated
+    values = rrexpr.iter_dag(exprs)
+    pos = 0
+    for fobj, fexprs in outputs:
+        end = pos + len(fexprs)
+        print_values(exprs.exprs[pos:end], values, cargs.separator, fobj, True)
+        pos = end
 
 
 def cmd_run(cargs: _t.Any) -> None:
     if len(cargs.exprs) == 0:
         cargs.exprs = [compile_expr(default_expr("run", cargs.default_expr))]
+    exprs = compile_exprs(cargs.exprs)
 
     if cargs.num_args < 1:
         raise Failure("`run` sub-command requires at least one PATH")
@@ -487,7 +625,7 @@ def cmd_run(cargs: _t.Any) -> None:
             tmp_paths.append(tmp_path)
 
             with TIOWrappedWriter(_os.fdopen(fileno, "wb")) as f:
-                print_exprs(rrexpr, cargs.exprs, cargs.separator, f)
+                print_exprs(rrexpr, exprs, cargs.separator, f)
 
         with _subprocess.Popen([cargs.command] + args + tmp_paths) as proc:
             _sys.exit(proc.wait())
@@ -506,32 +644,213 @@ def get_StreamEncoder(cargs: _t.Any) -> StreamEncoder:
         stream = JSONStreamEncoder(stdout, cargs.abridged)
     elif cargs.format == "raw":
         stream = RawStreamEncoder(stdout, cargs.abridged, cargs.terminator)
+    elif cargs.format == "cbor-columns":
+        stream = CBORColumnsStreamEncoder(stdout, cargs.abridged, cargs.batch_size)
+    elif cargs.format == "arrow":
+        stream = ArrowStreamEncoder(stdout, cargs.abridged, cargs.batch_size)
     else:
         assert False
     return stream
 
 
+# set by `map_parallel` before forking worker processes
+_parallel_job: _t.Any = None
+
+JobArg = _t.TypeVar("JobArg")
+JobResult = _t.TypeVar("JobResult")
+
+
+def get_log_counts() -> tuple[int, int]:
+    """Get numbers of warnings and errors logged so far."""
+    for handler in _logging.getLogger().handlers:
+        if isinstance(handler, LogCounter):
+            return handler.warnings, handler.errors
+    return 0, 0
+
+
+def add_log_counts(warnings: int, errors: int) -> None:
+    for handler in _logging.getLogger().handlers:
+        if isinstance(handler, LogCounter):
+            handler.warnings += warnings
+            handler.errors += errors
+            return
+
+
+def run_parallel_job(
+    job: _t.Callable[[JobArg], JobResult], arg: JobArg
+) -> tuple[JobResult, tuple[int, int]]:
+    """Run `job` on `arg` and also return the numbers of warnings and errors
+    it logged. This runs in a worker process."""
+    before_warnings, before_errors = get_log_counts()
+    res = job(arg)
+    warnings, errors = get_log_counts()
+    return res, (warnings - before_warnings, errors - before_errors)
+
+
+def map_parallel(
+    cargs: _t.Any,
+    job_state: _t.Any,
+    job: _t.Callable[[JobArg], JobResult],
+    handle: _t.Callable[[JobResult], None],
+    feed: _t.Callable[[_t.Callable[[JobArg], None]], None],
+    max_memory: int | None = None,
+) -> None:
+    """Call `feed` with a `submit` function which runs `job` on its argument
+    in one of `cargs.jobs` worker processes, with `_parallel_job` set to
+    `job_state`, and then `handle` the results in submission order.
+
+    With `max_memory` set, `submit` will also wait for results while
+    `mem.consumption` is above it, unless there are fewer than `cargs.jobs`
+    jobs in flight.
+    """
+    global _parallel_job
+
+    import concurrent.futures as _cf
+    import multiprocessing as _mp
+
+    try:
+        mp_context = _mp.get_context("fork")
+    except ValueError as exc:
+        raise Failure("`--jobs` is not supported on this platform") from exc
+
+    _parallel_job = job_state
+    pending: _c.deque[_cf.Future[tuple[JobResult, tuple[int, int]]]] = _c.deque()
+
+    def handle_first() -> None:
+        res, counts = pending.popleft().result()
+        # so that the exit code and the final counts would be the same as with `--jobs 1`
+        add_log_counts(*counts)
+        handle(res)
+
+    with _cf.ProcessPoolExecutor(cargs.jobs, mp_context=mp_context) as pool:
+        try:
+
+            def submit(arg: JobArg) -> None:
+                pending.append(pool.submit(run_parallel_job, job, arg))
+                while (
+                    len(pending) >= 4 * cargs.jobs
+                    or len(pending) > 0
+                    and pending[0].done()
+                    or max_memory is not None
+                    and len(pending) >= cargs.jobs
+                    and mem.consumption > max_memory
+                ):
+                    handle_first()
+
+            feed(submit)
+
+            while len(pending) > 0:
+                raise_first_delayed_signal()
+                handle_first()
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+        finally:
+            _parallel_job = None
+
+
+def map_paths_parallel(
+    cargs: _t.Any,
+    paths: list[_t.AnyStr],
+    job_state: _t.Any,
+    job: _t.Callable[[_t.AnyStr], JobResult],
+    handle: _t.Callable[[JobResult], None],
+) -> None:
+    """Walk `paths` like `map_wrr_paths` does, but `map_parallel` `job` over
+    the files."""
+
+    def feed(submit: _t.Callable[[_t.AnyStr], None]) -> None:
+        for exp_path in paths:
+            load_map_orderly(identity, submit, exp_path, order=cargs.walk_fs, errors=cargs.errors)  # fmt: skip
+
+    map_parallel(cargs, job_state, job, handle, feed)
+
+
+StreamJob = tuple[
+    _t.Any,
+    LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    _t.Callable[[ReqresExpr[_t.Any]], bool],
+    LinstDAG,
+    StreamEncoder,
+]
+# records, `diff_condition_usages`, an error message
+StreamJobResult = tuple[list[_t.Any], list[tuple[int, int]], str | None]
+
+
+def stream_job(path: str) -> StreamJobResult:
+    """Load, filter, evaluate, and (when possible) encode all reqres stored at
+    a given `path`. This runs in a worker process."""
+    assert _parallel_job is not None
+    cargs, loadf, filters_allow, exprs, stream = _t.cast(StreamJob[_t.Any], _parallel_job)
+
+    records: list[_t.Any] = []
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        values = rrexpr.eval_dag(exprs)
+        if stream.encodes_records:
+            records.append(stream.encode(exprs.exprs, values))
+        else:
+            records.append(values)
+
+    before = get_condition_usages()
+    error: str | None = None
+    try:
+        map_wrr_paths(cargs, loadf, filters_allow, emit, [path])
+    except CatastrophicFailure as exc:
+        # these are not necessarily picklable
+        error = exc.get_message(gettext)
+    return records, diff_condition_usages(get_condition_usages(), before), error
+
+
+def stream_parallel(
+    cargs: _t.Any,
+    loadf: LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    filters_allow: _t.Callable[[ReqresExpr[_t.Any]], bool],
+    exprs: LinstDAG,
+    stream: StreamEncoder,
+) -> None:
+    """Like `map_wrr_paths` with `cmd_stream`'s `emit`, but with per-file work
+    done by `cargs.jobs` worker processes, with results being written in
+    order."""
+
+    def write(result: StreamJobResult) -> None:
+        records, usages, error = result
+        add_condition_usages(usages)
+        if stream.encodes_records:
+            for data in records:
+                stream.emit_encoded(data)
+        else:
+            for values in records:
+                stream.emit("", exprs.exprs, values)
+        if error is not None:
+            raise CatastrophicFailure("%s", error)
+
+    map_paths_parallel(
+        cargs, cargs.paths, (cargs, loadf, filters_allow, exprs, stream), stream_job, write
+    )
+
+
 def cmd_stream(cargs: _t.Any) -> None:
     if len(cargs.exprs) == 0:
         cargs.exprs = [compile_expr(default_expr("stream", cargs.default_expr))]
+    exprs = compile_exprs(cargs.exprs)
 
     stream = get_StreamEncoder(cargs)
 
     def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
-        values: list[_t.Any] = []
-        for expr, func in cargs.exprs:
-            try:
-                values.append(rrexpr.eval_func(func))
-            except CatastrophicFailure as exc:
-                raise exc.elaborate("while evaluating `%s`", expr)
-        stream.emit(rrexpr.source.show_source(), cargs.exprs, values)
+        values = rrexpr.eval_dag(exprs)
+        stream.emit(rrexpr.source.show_source(), exprs.exprs, values)
 
     _num, filters_allow, filters_warn = compile_filters(cargs)
 
     handle_paths(cargs)
+    loadf = mk_rrexprs_load(cargs)
     stream.start()
     try:
-        map_wrr_paths(cargs, mk_rrexprs_load(cargs), filters_allow, emit, cargs.paths)
+        if cargs.jobs > 1:
+            stream_parallel(cargs, loadf, filters_allow, exprs, stream)
+        else:
+            map_wrr_paths(cargs, loadf, filters_allow, emit, cargs.paths)
     finally:
         stream.finish()
 
@@ -1453,16 +1772,28 @@ class DeferredOperation(_t.Generic[DeferredSourceType, _t.AnyStr]):
         destination: _t.AnyStr,
         overwrite: bool,
         allow_updates: bool,
+        existing: bool = False,
     ) -> None:
         self.source = source
         self.destination = destination
         self.overwrite = overwrite
         self.allow_updates = allow_updates
         self.updated = False
+        # the `source` the `destination` had when this operation was created,
+        # if `existing` is set
+        self.existing: DeferredSourceType | None = source if existing else None
 
     def approx_size(self) -> int:
         return 48
 
+    @property
+    def may_overwrite(self) -> bool:
+        """Can `run` overwrite `destination`? Updates are only allowed to
+        overwrite `destination`s that existed when this operation was created,
+        so that a file created by another process after that, e.g. after a
+        `DirectorySnapshot` reported it as missing, would not get overwritten."""
+        return self.overwrite or self.allow_updates and self.existing is not None
+
     def switch_source(self, new_source: DeferredSourceType, force: bool = False) -> bool:
         """Switch source of this operation.
 
@@ -1473,7 +1804,7 @@ class DeferredOperation(_t.Generic[DeferredSourceType, _t.AnyStr]):
             if (
                 not new_source.replaces(old_source)
                 or new_source.same_as(old_source)
-                or new_source.get_bytes() == old_source.get_bytes()
+                or new_source.get_digest() == old_source.get_digest()
             ):
                 return True
 
@@ -1506,11 +1837,297 @@ class DeferredFileWrite(
         return super().approx_size() + len(self.destination)
 
     def run(self, sync: DeferredSync[_t.AnyStr] | bool = True) -> None:
-        data = self.source.get_bytes()
-        if self.updated and file_data_equals(self.destination, data):
-            # nothing to do
+        existing = self.existing
+        if self.updated and existing is not None:
+            if existing.get_digest() == self.source.get_digest():
+                # nothing to do
+                return
+            data = self.source.get_bytes()
+        else:
+            data = self.source.get_bytes()
+            if self.updated and file_data_equals(self.destination, data):
+                # nothing to do
+                return
+        try:
+            with prof.stage("atomic_write"):
+                atomic_write(data, self.destination, self.may_overwrite, sync=sync)
+        except FileExistsError as exc:
+            raise Failure("`%s` already exists", self.destination) from exc
+
+
+class DirectorySnapshot(_t.Generic[_t.AnyStr]):
+    """A snapshot of the contents of directories, built lazily by
+    `os.scandir`ing each directory on the first `lookup` into it, which can then
+    be used in place of `lstat` calls when checking if files exist.
+
+    `forget` must be called on each path the snapshotting process itself
+    changes.
+
+    Other processes can change directories after they were scanned, so
+    lookups can return outdated data, e.g. a file created after a scan will be
+    reported as missing, and plans made using such answers will be outdated
+    too.  Paths reported as existing always get re-checked with real syscalls,
+    while `DeferredOperation`s writing to paths reported as missing never
+    overwrite them, not even with `--latest`, see `may_overwrite`.  So, a file
+    created by another process after a scan will make the corresponding write
+    fail with an error and will be left as it is.
+    """
+
+    def __init__(self) -> None:
+        # for each directory, for each of its files, whether it's a symlink,
+        # with `None` meaning "unknown"; `None` for directories that do not exist
+        self.dirs: _c.OrderedDict[_t.AnyStr, dict[_t.AnyStr, bool | None] | None] = _c.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.dirs)
+
+    def _scan(self, dir_path: _t.AnyStr) -> dict[_t.AnyStr, bool | None] | None:
+        entries: dict[_t.AnyStr, bool | None] = {}
+        size = 64 + len(dir_path)
+        with prof.stage("scandir"):
+            try:
+                with _os.scandir(dir_path) as it:
+                    for entry in it:
+                        entries[entry.name] = entry.is_symlink()
+                        size += 16 + len(entry.name)
+            except (FileNotFoundError, NotADirectoryError):
+                mem.consumption += size
+                return None
+        mem.consumption += size
+        return entries
+
+    def lookup(self, path: _t.AnyStr) -> tuple[bool, bool] | None:
+        """Check if `path` exists and is a symlink. Returns `None` when this
+        is unknown."""
+        dir_path, name = _os.path.split(path)
+        try:
+            entries = self.dirs[dir_path]
+        except KeyError:
+            try:
+                entries = self._scan(dir_path)
+            except OSError:
+                return None
+            self.dirs[dir_path] = entries
+        else:
+            self.dirs.move_to_end(dir_path)
+
+        if entries is None:
+            return False, False
+        try:
+            symlink = entries[name]
+        except KeyError:
+            return False, False
+        if symlink is None:
+            return None
+        return True, symlink
+
+    def forget(self, path: _t.AnyStr) -> None:
+        """Mark `path` as unknown, in case it's in the snapshot."""
+        dir_path, name = _os.path.split(path)
+        try:
+            entries = self.dirs[dir_path]
+        except KeyError:
+            return
+        if entries is None:
+            self.dirs[dir_path] = entries = {}
+        if name not in entries:
+            mem.consumption += 16 + len(name)
+        entries[name] = None
+
+    def pop(self) -> None:
+        """Forget the least recently used directory."""
+        dir_path, entries = self.dirs.popitem(False)
+        size = 64 + len(dir_path)
+        if entries is not None:
+            size += sum(map(lambda name: 16 + len(name), entries.keys()))
+        mem.consumption -= size
+
+
+@_dc.dataclass(slots=True)
+class DestinationProbe(_t.Generic[_t.AnyStr]):
+    """The state of a destination path of `make_deferred_emit`, see
+    `probe_destination`."""
+
+    exists: bool
+    symlink: bool
+    # `stat` of the destination, `None` if it does not exist, if it's a
+    # broken symlink, or if it's a `source_symlink`
+    stat: _os.stat_result | None
+    # `realpath` of the destination
+    in_path: _t.AnyStr
+    # is it a symlink pointing exactly to the given `source_path`
+    source_symlink: bool = False
+    # source and values of the `ReqresExpr` stored at `in_path`, see `prefetch`
+    old: tuple[FileSource, dict[str, _t.Any]] | None = None
+
+    def load(self, sniff: SniffContentType) -> ReqresExpr[FileSource]:
+        """Load the `ReqresExpr` stored at `in_path`."""
+        old = self.old
+        if old is None:
+            assert self.stat is not None
+            rrexpr = rrexpr_wrr_loadf(self.in_path, self.stat)
+        else:
+            source, values = old
+            # `reqres` will be loaded lazily, if ever needed
+            rrexpr = ReqresExpr(source, None)
+            rrexpr.values = values
+            rrexpr.unload(False)
+        rrexpr.sniff = sniff
+        return rrexpr
+
+    def prefetch(self, sniff: SniffContentType) -> None:
+        """`load` the `ReqresExpr` stored at `in_path` and remember everything
+        `make_deferred_emit` needs from it, so that `load` would not need to
+        parse it again."""
+        if self.stat is None or self.old is not None:
+            return
+        rrexpr = self.load(sniff)
+        _ = rrexpr.stime
+        self.old = (rrexpr.source, rrexpr.values)
+
+    def adopt(self, other: "DestinationProbe[_t.AnyStr]") -> None:
+        """Reuse `other.prefetch`ed data, if `other` describes the same file."""
+        old = other.old
+        st = self.stat
+        if old is None or st is None or self.in_path != other.in_path:
             return
-        atomic_write(data, self.destination, self.overwrite or self.allow_updates, sync=sync)
+        source = old[0]
+        if (source.st_dev, source.st_ino, source.st_mtime_ns) == (
+            st.st_dev,
+            st.st_ino,
+            st.st_mtime_ns,
+        ):
+            self.old = old
+
+
+def probe_destination(
+    abs_out_path: _t.AnyStr,
+    source_path: str | bytes | None = None,
+    snapshot: DirectorySnapshot[_t.AnyStr] | None = None,
+) -> DestinationProbe[_t.AnyStr]:
+    """Probe the destination, using `snapshot` to skip system calls when
+    possible.
+
+    `source_path`, when set, must be a canonical absolute path, i.e. a result
+    of `realpath`.
+    """
+
+    known = snapshot.lookup(abs_out_path) if snapshot is not None else None
+    if known is None:
+        try:
+            out_lstat = _os.lstat(abs_out_path)
+        except FileNotFoundError:
+            return DestinationProbe(False, False, None, abs_out_path)
+        except OSError as exc:
+            handle_ENAMETOOLONG(exc, abs_out_path)
+            raise
+        exists, symlink = True, _stat.S_ISLNK(out_lstat.st_mode)
+    else:
+        exists, symlink = known
+        if not exists:
+            return DestinationProbe(False, False, None, abs_out_path)
+        if not symlink:
+            # we still need its `stat`
+            return probe_destination(abs_out_path, source_path)
+
+    if not symlink:
+        return DestinationProbe(True, False, out_lstat, abs_out_path)
+
+    if source_path is not None:
+        try:
+            target = _os.readlink(abs_out_path)
+        except OSError:
+            if known is not None:
+                # the snapshot is stale
+                return probe_destination(abs_out_path, source_path)
+            raise
+        if target == source_path:
+            # `realpath` of this is `source_path` itself
+            return DestinationProbe(True, True, None, abs_out_path, True)
+
+    try:
+        # check symlink target is reachable
+        out_stat = _os.stat(abs_out_path)
+    except FileNotFoundError:
+        # a broken symlink
+        return DestinationProbe(True, True, None, abs_out_path)
+    return DestinationProbe(True, True, out_stat, _os.path.realpath(abs_out_path))
+
+
+def test_DirectorySnapshot() -> None:
+    with _tempfile.TemporaryDirectory() as tmp:
+        tmp = _os.path.realpath(tmp)
+        source_path = _os.path.join(tmp, "source")
+        with open(source_path, "wb") as f:
+            f.write(b"source")
+        link_path = _os.path.join(tmp, "link")
+        _os.symlink(source_path, link_path)
+        new_path = _os.path.join(tmp, "new")
+
+        snapshot: DirectorySnapshot[str] = DirectorySnapshot()
+        try:
+            assert snapshot.lookup(source_path) == (True, False)
+            assert snapshot.lookup(link_path) == (True, True)
+            assert snapshot.lookup(new_path) == (False, False)
+            assert snapshot.lookup(_os.path.join(tmp, "missing", "file")) == (False, False)
+
+            # `source_symlink` shortcut, with and without `snapshot`
+            for snap in [None, snapshot]:
+                probe = probe_destination(link_path, source_path, snap)
+                assert probe.exists and probe.symlink and probe.source_symlink
+                assert probe.stat is None
+                probe = probe_destination(link_path, new_path, snap)
+                assert probe.exists and probe.symlink and not probe.source_symlink
+                assert probe.stat is not None and probe.in_path == source_path
+
+            # another process creates a file after the scan
+            with open(new_path, "wb") as f:
+                f.write(b"other")
+            assert snapshot.lookup(new_path) == (False, False)
+            probe = probe_destination(new_path, None, snapshot)
+            assert not probe.exists
+
+            # even with `--latest`, a write planned using that answer must fail
+            rrexpr = ReqresExpr(UnknownSource(), trivial_Reqres(parse_url("https://example.org/")))
+            write = DeferredFileWrite(rrexpr, new_path, False, True, False)
+            assert not write.may_overwrite
+            try:
+                write.run(False)
+            except Failure:
+                pass
+            else:
+                assert False
+            with open(new_path, "rb") as f:
+                assert f.read() == b"other"
+
+            # while a write planned using a real answer must succeed
+            old = ReqresExpr(UnknownSource(), trivial_Reqres(parse_url("https://example.org/old")))
+            write = DeferredFileWrite(old, new_path, False, True, True)
+            assert write.may_overwrite
+            write.source = rrexpr
+            write.updated = True
+            write.run(False)
+            with open(new_path, "rb") as f:
+                assert f.read() == rrexpr.get_bytes()
+
+            snapshot.forget(new_path)
+            assert snapshot.lookup(new_path) is None
+            assert probe_destination(new_path, None, snapshot).exists
+        finally:
+            while len(snapshot) > 0:
+                snapshot.pop()
+
+
+def join_out_path(destination: _t.AnyStr, out_path: _t.AnyStr) -> _t.AnyStr:
+    """Join `destination` with an `--output` value and make the result absolute."""
+    if isinstance(destination, str):
+        return _os.path.abspath(_os.path.join(destination, out_path))
+    return _os.path.abspath(_os.path.join(destination, _os.fsencode(out_path)))
+
+
+PrefetchedEmitFunc = _t.Callable[
+    [ReqresExpr[DeferredSourceType], _t.AnyStr, DestinationProbe[_t.AnyStr] | None], None
+]
 
 
 def make_deferred_emit(
@@ -1519,13 +2136,24 @@ def make_deferred_emit(
     output_format: _t.AnyStr,
     actioning: str,
     defer: _t.Callable[
-        [ReqresExpr[DeferredSourceType], _t.AnyStr, bool, bool],
+        [ReqresExpr[DeferredSourceType], _t.AnyStr, bool, bool, bool],
         DeferredOperation[ReqresExpr[DeferredSourceType], _t.AnyStr],
     ],
     allow_updates: bool,
     moving: bool = False,
     symlinking: bool = False,
-) -> tuple[_t.Callable[[ReqresExpr[DeferredSourceType]], None], _t.Callable[[], None]]:
+) -> tuple[
+    _t.Callable[[ReqresExpr[DeferredSourceType]], None],
+    PrefetchedEmitFunc[DeferredSourceType, _t.AnyStr],
+    _t.Callable[[], None],
+]:
+    """Returns `emit`, `emit_prefetched`, and `finish` functions.
+
+    `emit_prefetched(rrexpr, def_out_path, prefetched)` is `emit` which takes
+    a pre-computed value of `output_format` for `rrexpr` with `num` set to `0`
+    and an optional `DestinationProbe` of the corresponding destination with
+    `prefetch`ed data. See `organize_parallel`.
+    """
     terminator: bytes | None = cargs.terminator if cargs.dry_run is not None else None
 
     # for each `--output` value, how many times it was seen
@@ -1535,6 +2163,11 @@ def make_deferred_emit(
     # to minimize the number of calls to `stat`.
     rrexpr_cache: _c.OrderedDict[_t.AnyStr, ReqresExpr[DeferredSourceType]] = _c.OrderedDict()
 
+    # Snapshot of the destination directories, this exists to minimize the
+    # number of calls to `lstat` even further, since most destination paths
+    # usually do not exist.
+    snapshot: DirectorySnapshot[_t.AnyStr] = DirectorySnapshot()
+
     # Deferred IO operations (aka "intents") that are yet to be executed,
     # indexed by filesystem paths. This is used both as a queue and as an
     # LRU-cache so that, e.g. repeated updates to the same output file would be
@@ -1596,6 +2229,9 @@ def make_deferred_emit(
 
             try:
                 if not cargs.dry_run:
+                    snapshot.forget(abs_out_path)
+                    if moving and isinstance(rrexpr.source, FileSource):
+                        snapshot.forget(_t.cast(_t.AnyStr, rrexpr.source.path))
                     intent.run(sync)
             except Failure as exc:
                 if cargs.errors == "ignore":
@@ -1654,7 +2290,8 @@ def make_deferred_emit(
             num_deferred -= 1
 
         # fsync everything
-        sync.flush()
+        with prof.stage("fsync"):
+            sync.flush()
 
         # report to stdout
         if terminator is not None and done_files is not None:
@@ -1663,7 +2300,8 @@ def make_deferred_emit(
                 stdout.write_bytes(terminator)
 
             stdout.flush()
-            fsync_maybe(stdout.fobj.fileno())
+            with prof.stage("fsync"):
+                fsync_maybe(stdout.fobj.fileno())
 
         # flush rrexpr_cache
         while num_cached > 0 and (num_cached > max_cached or mem.consumption > max_memory):
@@ -1671,6 +2309,10 @@ def make_deferred_emit(
             num_cached -= 1
             mem.consumption -= len(abs_out_path)
 
+        # flush snapshot
+        while len(snapshot) > 0 and mem.consumption > max_memory:
+            snapshot.pop()
+
     def finish_updates() -> None:
         """Flush all of the queue."""
         flush_updates(True)
@@ -1680,6 +2322,7 @@ def make_deferred_emit(
         prev_rrexpr: ReqresExpr[DeferredSourceType] | None,
         new_rrexpr: ReqresExpr[DeferredSourceType],
         abs_out_path: _t.AnyStr,
+        prefetched: DestinationProbe[_t.AnyStr] | None,
     ) -> tuple[
         bool,
         ReqresExpr[DeferredSourceType] | None,
@@ -1693,67 +2336,78 @@ def make_deferred_emit(
 
         old_rrexpr: ReqresExpr[_t.Any]
         if prev_rrexpr is None:
-            try:
-                out_lstat = _os.lstat(abs_out_path)
-            except FileNotFoundError:
+            # always re-check, since `prefetched` could be stale
+            probe = probe_destination(
+                abs_out_path,
+                new_source.path if isinstance(new_source, FileSource) else None,
+                snapshot,
+            )
+            if prefetched is not None:
+                probe.adopt(prefetched)
+
+            if not probe.exists:
                 # target does not exist
-                return True, new_rrexpr, defer(new_rrexpr, abs_out_path, False, allow_updates)
-            except OSError as exc:
-                handle_ENAMETOOLONG(exc, abs_out_path)
-                raise
+                return (
+                    True,
+                    new_rrexpr,
+                    defer(new_rrexpr, abs_out_path, False, allow_updates, False),
+                )
 
-            if _stat.S_ISLNK(out_lstat.st_mode):
+            if probe.symlink:
                 # abs_out_path is a symlink
-                try:
-                    # check symlink target is reachable
-                    out_stat = _os.stat(abs_out_path)
-                except FileNotFoundError:
+                if probe.stat is None and not probe.source_symlink:
                     # target is a broken symlink
                     return (
                         True,
                         new_rrexpr,
-                        defer(new_rrexpr, abs_out_path, True, allow_updates),
+                        defer(new_rrexpr, abs_out_path, True, allow_updates, False),
                     )
 
                 if not allow_updates and not symlinking:
                     raise Failure("destination exists and is a symlink" + not_allowed)
 
-                # get symlink target and use it as abs_out_path, thus
-                # (SETSRC) below will re-create the original source
-                abs_in_path = _os.path.realpath(abs_out_path)
+                # probe.in_path is the symlink target, thus (SETSRC) below
+                # will re-create the original source
 
                 if isinstance(new_source, FileSource) and new_source.path == abs_out_path:
                     # similarly to the above
                     return True, prev_rrexpr, None
+
+                if probe.source_symlink:
+                    # (SETSRC) would re-create the original source, which
+                    # would then be the `same_as` `new_source`, thus
+                    # this is a noop too
+                    return True, new_rrexpr, None
             elif not allow_updates and symlinking:
                 raise Failure("destination exists and is not a symlink" + not_allowed)
-            else:
-                out_stat = out_lstat
-                abs_in_path = abs_out_path
 
             # (SETSRC)
-            old_rrexpr = rrexpr_wrr_loadf(abs_in_path, out_stat)
-            old_rrexpr.sniff = cargs.sniff
+            old_rrexpr = probe.load(cargs.sniff)
         else:
             old_rrexpr = prev_rrexpr
 
-        intent = defer(old_rrexpr, abs_out_path, False, allow_updates)
+        # `old_rrexpr` is what `abs_out_path` has on disk at the moment
+        intent = defer(old_rrexpr, abs_out_path, False, allow_updates, True)
         permitted = intent.switch_source(new_rrexpr, moving)
         return permitted, intent.source, (intent if intent.source is not old_rrexpr else None)
 
     def emit(new_rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        new_rrexpr.values["num"] = 0
+        emit_prefetched(new_rrexpr, output_format % new_rrexpr, None)
+
+    def emit_prefetched(
+        new_rrexpr: ReqresExpr[DeferredSourceType],
+        def_out_path: _t.AnyStr,
+        prefetched: DestinationProbe[_t.AnyStr] | None,
+    ) -> None:
         raise_first_delayed_signal()
 
-        new_rrexpr.values["num"] = 0
-        def_out_path = output_format % new_rrexpr
-        prev_rel_out_path = None
+        prev_abs_out_path = None
         while True:
-            new_rrexpr.values["num"] = seen_counter.count(def_out_path)
-            if isinstance(destination, str):
-                rel_out_path = _os.path.join(destination, output_format % new_rrexpr)
-            else:
-                rel_out_path = _os.path.join(destination, _os.fsencode(output_format % new_rrexpr))
-            abs_out_path: _t.AnyStr = _os.path.abspath(rel_out_path)
+            num = new_rrexpr.values["num"] = seen_counter.count(def_out_path)
+            abs_out_path: _t.AnyStr = join_out_path(
+                destination, def_out_path if num == 0 else output_format % new_rrexpr
+            )
 
             old_rrexpr: ReqresExpr[DeferredSourceType] | None
             old_rrexpr = rrexpr_cache.pop(abs_out_path, None)
@@ -1766,7 +2420,7 @@ def make_deferred_emit(
             if intent is None:
                 try:
                     permitted, updated_rrexpr, intent = load_defer(
-                        old_rrexpr, new_rrexpr, abs_out_path
+                        old_rrexpr, new_rrexpr, abs_out_path, prefetched
                     )
                 except Failure as exc:
                     raise exc.elaborate(
@@ -1793,13 +2447,13 @@ def make_deferred_emit(
                 mem.consumption += len(abs_out_path)
 
             if not permitted:
-                if prev_rel_out_path == rel_out_path:
+                if prev_abs_out_path == abs_out_path:
                     raise Failure("destination already exists" + variance_help).elaborate(
                         f"while {actioning} `%s` -> `%s`",
                         new_rrexpr.show_source(),
                         fsdecode(abs_out_path),
                     )
-                prev_rel_out_path = rel_out_path
+                prev_abs_out_path = abs_out_path
                 continue
 
             if intent is None:
@@ -1813,12 +2467,16 @@ def make_deferred_emit(
         if not cargs.lazy:
             flush_updates(False)
 
-    return emit, finish_updates
+    return emit, emit_prefetched, finish_updates
 
 
 def make_organize_emit(
     cargs: _t.Any, destination: _t.AnyStr, output_format: _t.AnyStr, allow_updates: bool
-) -> tuple[_t.Callable[[ReqresExpr[DeferredSourceType]], None], _t.Callable[[], None]]:
+) -> tuple[
+    _t.Callable[[ReqresExpr[DeferredSourceType]], None],
+    PrefetchedEmitFunc[DeferredSourceType, _t.AnyStr],
+    _t.Callable[[], None],
+]:
     action_op: _t.Any
     action = cargs.action
     if allow_updates:
@@ -1877,7 +2535,7 @@ def make_organize_emit(
                     not new_source.replaces(old_source)
                     or new_source.same_as(old_source)
                     or check_data
-                    and new_rrexpr.get_bytes() == old_rrexpr.get_bytes()
+                    and new_rrexpr.get_digest() == old_rrexpr.get_digest()
                 ):
                     # noop
                     return True
@@ -1904,12 +2562,8 @@ def make_organize_emit(
 
             try:
                 if isinstance(source, FileSource):
-                    action_op(
-                        source.path,
-                        self.destination,
-                        self.overwrite or self.allow_updates,
-                        sync=sync,
-                    )
+                    with prof.stage("atomic_write"):
+                        action_op(source.path, self.destination, self.may_overwrite, sync=sync)
                 elif copying:
                     # fallback to DeferredFileWrite in this case
                     super().run(sync)  # type: ignore
@@ -1937,6 +2591,138 @@ def make_organize_emit(
     )
 
 
+OrganizeJob = tuple[
+    _t.Any,
+    LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    _t.Callable[[ReqresExpr[_t.Any]], bool],
+    _t.AnyStr,
+    _t.AnyStr,
+]
+# for each reqres: its source, its `Reqres` if it can't be cheaply re-loaded
+# from that source, its values, its `--output` value with `num` set to `0`,
+# and a prefetched `DestinationProbe` of the latter
+OrganizePlan = tuple[
+    DeferredSource, Reqres | None, dict[str, _t.Any], _t.AnyStr, DestinationProbe[_t.AnyStr] | None
+]
+# the path, plans, `diff_condition_usages`, an error message
+OrganizeJobResult = tuple[
+    _t.AnyStr, list[OrganizePlan[_t.AnyStr]], list[tuple[int, int]], str | None
+]
+
+
+def organize_job(path: _t.AnyStr) -> OrganizeJobResult[_t.AnyStr]:
+    """Load and filter all reqres stored at a given `path`, compute their
+    `--output` values, and `prefetch` their destinations. This runs in a
+    worker process."""
+    assert _parallel_job is not None
+    cargs, loadf, filters_allow, destination, output_format = _t.cast(
+        OrganizeJob[_t.AnyStr], _parallel_job
+    )
+
+    plans: list[OrganizePlan[_t.AnyStr]] = []
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        rrexpr.values["num"] = 0
+        def_out_path = output_format % rrexpr
+        abs_out_path = join_out_path(destination, def_out_path)
+
+        source = rrexpr.source
+        prefetched: DestinationProbe[_t.AnyStr] | None = None
+        if not isinstance(source, FileSource) or source.path != abs_out_path:
+            try:
+                prefetched = probe_destination(
+                    abs_out_path, source.path if isinstance(source, FileSource) else None
+                )
+                prefetched.prefetch(cargs.sniff)
+            except Exception:
+                # the coordinator will re-do this and report the error
+                prefetched = None
+
+        # `make_organize_emit` might need it
+        _ = rrexpr.stime
+        reqres = rrexpr.reqres if not isinstance(source, FileSource) else None
+        rrexpr.unload(False)
+        plans.append((source, reqres, rrexpr.values, def_out_path, prefetched))
+
+    before = get_condition_usages()
+    error: str | None = None
+    try:
+        map_wrr_paths(cargs, loadf, filters_allow, emit, [path])
+    except CatastrophicFailure as exc:
+        # these are not necessarily picklable
+        error = exc.get_message(gettext)
+    return path, plans, diff_condition_usages(get_condition_usages(), before), error
+
+
+def organize_parallel(
+    cargs: _t.Any,
+    loadf: LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    filters_allow: _t.Callable[[ReqresExpr[_t.Any]], bool],
+    destination: _t.AnyStr,
+    output_format: _t.AnyStr,
+    emit_prefetched: PrefetchedEmitFunc[_t.Any, _t.AnyStr],
+    paths: list[_t.AnyStr],
+) -> None:
+    """Like `map_wrr_paths` with `emit` of `make_organize_emit`, but with
+    loading, filtering, `--output` computation, and loading of existing
+    destination files done by `cargs.jobs` worker processes.
+
+    Meanwhile, this process remains the only one that allocates `num`s, makes
+    decisions, and runs deferred IO actions, with all of these happening in
+    the same order as with `map_wrr_paths`, thus producing the same results.
+    """
+
+    def handle(result: OrganizeJobResult[_t.AnyStr]) -> None:
+        path, plans, usages, error = result
+        add_condition_usages(usages)
+        try:
+            for source, reqres, values, def_out_path, prefetched in plans:
+                rrexpr = ReqresExpr(source, reqres)
+                rrexpr.values = values
+                rrexpr.sniff = cargs.sniff
+                rrexpr.unload(False)
+                emit_prefetched(rrexpr, def_out_path, prefetched)
+        except Failure as exc:
+            # similarly to `load_map_orderly`
+            if cargs.errors != "ignore":
+                exc.elaborate("while processing `%s`", path)
+                if cargs.errors == "fail":
+                    # raise CatastrophicFailure so that `load_map_orderly` of
+                    # `map_paths_parallel` wouldn't try handling it
+                    raise CatastrophicFailure(exc) from exc
+                _logging.error("%s", exc.get_message(gettext))
+        if error is not None:
+            raise CatastrophicFailure("%s", error)
+
+    job_state = (cargs, loadf, filters_allow, destination, output_format)
+    map_paths_parallel(cargs, paths, job_state, organize_job, handle)
+
+
+def organize_paths(
+    cargs: _t.Any,
+    loadf: LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    filters_allow: _t.Callable[[ReqresExpr[_t.Any]], bool],
+    destination: _t.AnyStr,
+    output_format: _t.AnyStr,
+    allow_updates: bool,
+    paths: list[_t.AnyStr],
+) -> None:
+    emit: EmitFunc[ReqresExpr[_t.Any]]
+    emit_prefetched: PrefetchedEmitFunc[_t.Any, _t.AnyStr]
+    emit, emit_prefetched, finish = make_organize_emit(
+        cargs, destination, output_format, allow_updates
+    )
+    try:
+        if cargs.jobs > 1:
+            organize_parallel(
+                cargs, loadf, filters_allow, destination, output_format, emit_prefetched, paths
+            )
+        else:
+            map_wrr_paths(cargs, loadf, filters_allow, emit, paths)
+    finally:
+        finish()
+
+
 def cmd_organize(cargs: _t.Any) -> None:
     if cargs.walk_paths == "unset":
         cargs.walk_paths = WalkOrder.REVERSE if cargs.allow_updates else WalkOrder.NONE
@@ -1948,16 +2734,17 @@ def cmd_organize(cargs: _t.Any) -> None:
 
     rrexprs_load = mk_rrexprs_load(cargs)
     handle_paths(cargs)
-    emit: EmitFunc[ReqresExpr[FileSource]]
     if cargs.destination is not None:
         # destination is set explicitly
-        emit, finish = make_organize_emit(
-            cargs, _os.path.expanduser(cargs.destination), output_format, cargs.allow_updates
+        organize_paths(
+            cargs,
+            rrexprs_load,
+            filters_allow,
+            _os.path.expanduser(cargs.destination),
+            output_format,
+            cargs.allow_updates,
+            cargs.paths,
         )
-        try:
-            map_wrr_paths(cargs, rrexprs_load, filters_allow, emit, cargs.paths)
-        finally:
-            finish()
     else:
         if cargs.allow_updates:
             raise Failure("`--latest` without `--to` is not allowed")
@@ -1973,18 +2760,201 @@ def cmd_organize(cargs: _t.Any) -> None:
                 raise Failure("`%s` is not a directory but no `--to` is specified", exp_path)
 
         for exp_path in cargs.paths:
-            emit, finish = make_organize_emit(cargs, exp_path, output_format, False)
-            try:
-                map_wrr_paths(cargs, rrexprs_load, filters_allow, emit, [exp_path])
-            finally:
-                finish()
+            organize_paths(
+                cargs, rrexprs_load, filters_allow, exp_path, output_format, False, [exp_path]
+            )
 
     filters_warn()
 
 
+ImportJob = tuple[
+    _t.Any,
+    _t.Callable[[bytes], Reqres | None],
+    _t.Callable[[ReqresExpr[_t.Any]], bool],
+    _t.AnyStr,
+    _t.AnyStr,
+]
+# for each record: `None` if it has no reqres, `False` if its reqres was
+# filtered out, otherwise, its `WRR` dump, its `get_digest`, its values, its
+# `--output` value with `num` set to `0`, and a prefetched `DestinationProbe` of
+# the latter
+ImportPlan = (
+    None
+    | _t.Literal[False]
+    | tuple[bytes, bytes, dict[str, _t.Any], _t.AnyStr, DestinationProbe[_t.AnyStr] | None]
+)
+# plans, `diff_condition_usages`, an error message
+ImportJobResult = tuple[list[ImportPlan[_t.AnyStr]], list[tuple[int, int]], str | None]
+
+# approximate size of a chunk of records `import_parallel` sends to a worker process
+import_chunk_size = 1024 * 1024
+
+
+def import_job(chunk: tuple[list[bytes], str | None]) -> ImportJobResult[_t.AnyStr]:
+    """Parse, filter, and `WRR`-encode a chunk of records of an input file,
+    compute `--output` values of the results, and `prefetch` their
+    destinations. This runs in a worker process."""
+    assert _parallel_job is not None
+    cargs, loads, filters_allow, destination, output_format = _t.cast(
+        ImportJob[_t.AnyStr], _parallel_job
+    )
+
+    records, error = chunk
+    plans: list[ImportPlan[_t.AnyStr]] = []
+
+    before = get_condition_usages()
+    try:
+        for data in records:
+            reqres = loads(data)
+            if reqres is None:
+                plans.append(None)
+                continue
+
+            rrexpr = ReqresExpr(UnknownSource(), reqres, cargs.sniff)
+            with prof.stage("filters"):
+                allowed = filters_allow(rrexpr)
+            if not allowed:
+                plans.append(False)
+                continue
+
+            rrexpr.values["num"] = 0
+            def_out_path = output_format % rrexpr
+            prefetched: DestinationProbe[_t.AnyStr] | None
+            try:
+                prefetched = probe_destination(join_out_path(destination, def_out_path))
+                prefetched.prefetch(cargs.sniff)
+            except Exception:
+                # the coordinator will re-do this and report the error
+                prefetched = None
+
+            encoded = rrexpr.encode()
+            rrexpr.unload(False)
+            plans.append((encoded, rrexpr.get_digest(), rrexpr.values, def_out_path, prefetched))
+    except Failure as exc:
+        # these are not necessarily picklable
+        error = exc.get_message(gettext)
+    return plans, diff_condition_usages(get_condition_usages(), before), error
+
+
+def import_parallel(
+    cargs: _t.Any,
+    split: _t.Callable[[_io.BufferedReader], _t.Iterator[bytes]],
+    loads: _t.Callable[[bytes], Reqres | None],
+    filters_allow: _t.Callable[[ReqresExpr[_t.Any]], bool],
+    destination: _t.AnyStr,
+    output_format: _t.AnyStr,
+    emit_prefetched: PrefetchedEmitFunc[_t.Any, _t.AnyStr],
+    paths: list[_t.AnyStr],
+) -> None:
+    """Like `map_wrr_paths` with `emit` of `make_deferred_emit`, but with
+    input files being `split` into chunks of raw records by this process, and
+    then parsing, filtering, `WRR`-encoding, `--output` computation, and
+    loading of existing destination files being done by `cargs.jobs` worker
+    processes. Similarly to `organize_parallel`, the results will be the same
+    as those of `map_wrr_paths`.
+
+    Chunks in flight are accounted for in `mem.consumption`, and this process
+    only keeps `WRR` dumps of deferred reqres, thus `--max-memory` still
+    applies.
+    """
+
+    @_dc.dataclass
+    class InputFile:
+        path: str | bytes
+        source: FileSource | None = None
+        num: int = 0
+        failed: bool = False
+
+    # for each chunk in flight, its `InputFile` and its size
+    chunks: _c.deque[tuple[InputFile, int]] = _c.deque()
+
+    def handle(result: ImportJobResult[_t.AnyStr]) -> None:
+        plans, usages, error = result
+        ifile, size = chunks.popleft()
+        mem.consumption -= size
+        add_condition_usages(usages)
+        if ifile.failed:
+            return
+
+        try:
+            for plan in plans:
+                if plan is None:
+                    continue
+                num = ifile.num
+                ifile.num += 1
+                if plan is False:
+                    continue
+
+                encoded, digest, values, def_out_path, prefetched = plan
+                assert ifile.source is not None
+                source = StreamElementSource(ifile.source, num)
+                rrexpr = ReqresExpr(source, None, cargs.sniff, _digest=digest, _encoded=encoded)
+                rrexpr.values = values
+                rrexpr.unload(False)
+                emit_prefetched(rrexpr, def_out_path, prefetched)
+
+            if error is not None:
+                raise Failure("%s", error)
+        except Failure as exc:
+            ifile.failed = True
+            # similarly to `load_map_orderly`
+            if cargs.errors != "ignore":
+                exc.elaborate("while processing `%s`", ifile.path)
+                if cargs.errors == "fail":
+                    # raise CatastrophicFailure so that `load_map_orderly` of
+                    # `feed` below wouldn't try handling it
+                    raise CatastrophicFailure(exc) from exc
+                _logging.error("%s", exc.get_message(gettext))
+
+    def feed(submit: _t.Callable[[tuple[list[bytes], str | None]], None]) -> None:
+        def load(abs_path: _t.AnyStr) -> None:
+            ifile = InputFile(abs_path)
+            records: list[bytes] = []
+            size = 0
+            error: str | None = None
+
+            def submit_chunk() -> None:
+                nonlocal records, size
+                chunks.append((ifile, size))
+                mem.consumption += size
+                # errors are reported via workers so that they would be
+                # reported in order
+                submit((records, error))
+                records = []
+                size = 0
+
+            try:
+                with open(abs_path, "rb") as f:
+                    ifile.source = make_FileSource(abs_path, _os.fstat(f.fileno()))
+                    for data in split(f):
+                        records.append(data)
+                        size += len(data)
+                        if size >= import_chunk_size:
+                            submit_chunk()
+                            if ifile.failed:
+                                return
+            except OSError:
+                error = Failure("failed to open `%s`", abs_path).get_message(gettext)
+            except Failure as exc:
+                error = exc.get_message(gettext)
+
+            if len(records) > 0 or error is not None:
+                submit_chunk()
+
+        for exp_path in paths:
+            load_map_orderly(load, identity, exp_path, order=cargs.walk_fs, errors=cargs.errors)
+
+    job_state = (cargs, loads, filters_allow, destination, output_format)
+    map_parallel(
+        cargs, job_state, import_job, handle, feed, max_memory=cargs.max_memory * 1024 * 1024
+    )
+
+
 def cmd_import_generic(
     cargs: _t.Any,
     rrexprs_loadf: _t.Callable[[str | bytes], _t.Iterator[ReqresExpr[DeferredSourceType]]],
+    split: _t.Callable[[_io.BufferedReader], _t.Iterator[bytes]],
+    loads: _t.Callable[[bytes], Reqres | None],
 ) -> None:
     output_format = elaborate_output("--output", output_alias, cargs.output) + ".wrr"
 
@@ -1992,7 +2962,7 @@ def cmd_import_generic(
 
     handle_paths(cargs)
     emit: EmitFunc[ReqresExpr[DeferredSourceType]]
-    emit, finish = make_deferred_emit(
+    emit, emit_prefetched, finish = make_deferred_emit(
         cargs,
         cargs.destination,
         output_format,
@@ -2001,7 +2971,19 @@ def cmd_import_generic(
         cargs.allow_updates,
     )
     try:
-        map_wrr_paths(cargs, rrexprs_loadf, filters_allow, emit, cargs.paths)
+        if cargs.jobs > 1:
+            import_parallel(
+                cargs,
+                split,
+                loads,
+                filters_allow,
+                cargs.destination,
+                output_format,
+                emit_prefetched,
+                cargs.paths,
+            )
+        else:
+            map_wrr_paths(cargs, rrexprs_loadf, filters_allow, emit, cargs.paths)
     finally:
         finish()
 
@@ -2009,13 +2991,190 @@ def cmd_import_generic(
 
 
 def cmd_import_bundle(cargs: _t.Any) -> None:
-    cmd_import_generic(cargs, rrexprs_wrr_bundle_loadf)
+    cmd_import_generic(cargs, rrexprs_wrr_bundle_loadf, wrr_bundle_split, wrr_loads_cbor)
 
 
 def cmd_import_mitmproxy(cargs: _t.Any) -> None:
-    from .mitmproxy import rrexprs_mitmproxy_loadf
+    from .mitmproxy import rrexprs_mitmproxy_loadf, mitmproxy_split_fileobj, mitmproxy_loads_flow
+
+    cmd_import_generic(
+        cargs, rrexprs_mitmproxy_loadf, mitmproxy_split_fileobj, mitmproxy_loads_flow
+    )
+
+
+def cmd_import_warc(cargs: _t.Any) -> None:
+    cmd_import_generic(cargs, rrexprs_warc_loadf, warc_split_fileobj, warc_loads)
+
+
+def cmd_import_har(cargs: _t.Any) -> None:
+    cmd_import_generic(cargs, rrexprs_har_loadf, har_split_fileobj, har_loads)
+
+
+def test_cmd_import_parallel() -> None:
+    def run(*argv: str) -> int:
+        old_argv = _sys.argv
+        _sys.argv = [__prog__] + list(argv)
+        try:
+            main()
+        except SystemExit as exc:
+            return exc.code if isinstance(exc.code, int) else 0
+        finally:
+            _sys.argv = old_argv
+        return 0
 
-    cmd_import_generic(cargs, rrexprs_mitmproxy_loadf)
+    def tree(path: str) -> list[str]:
+        res = []
+        for root, _dirs, files in _os.walk(path):
+            for name in files:
+                res.append(_os.path.relpath(_os.path.join(root, name), path))
+        return sorted(res)
+
+    inputs: list[tuple[str, bytes, bytes]] = []
+
+    reqreses = [trivial_Reqres(parse_url(f"https://example.org/{i}")) for i in range(3)]
+    bundle = b"".join(wrr_dumps(reqres, False) for reqres in reqreses)
+    # a well-formed `CBOR` item that is not a reqres
+    inputs.append(("bundle", bundle, bundle + b"\x01"))
+
+    try:
+        from mitmproxy.io import tnetstring
+        from mitmproxy.test import tflow
+    except ImportError:
+        pass
+    else:
+        flows = b"".join(tnetstring.dumps(tflow.tflow(resp=True).get_state()) for _ in range(3))
+        # a well-formed `tnetstring` that is not a flow
+        inputs.append(("mitmproxy", flows, flows + b"5:hello,"))
+
+    with _tempfile.TemporaryDirectory() as tmp:
+        for kind, good, bad in inputs:
+            good_path = _os.path.join(tmp, f"good.{kind}")
+            with open(good_path, "wb") as f:
+                f.write(good)
+            bad_path = _os.path.join(tmp, f"bad.{kind}")
+            with open(bad_path, "wb") as f:
+                f.write(bad)
+
+            outputs = []
+            for jobs in ["1", "2"]:
+                out = _os.path.join(tmp, f"{kind}.{jobs}")
+                # errors in workers must be reported, and the following inputs
+                # must still be processed
+                args = ["--jobs", jobs, "--errors", "skip", "-t", out, bad_path, good_path]
+                code = run("import", kind, *args)
+                assert code == 1
+                outputs.append(tree(out))
+            assert outputs[0] == outputs[1]
+            # the valid records of `bad`, followed by all of `good`
+            assert len(outputs[0]) == 6
+
+
+# `gzip` members of `WARC` records of a reqres, and, when it has a response, its
+# `CDXJ` key and those `CDXJ` fields which do not depend on where the members get
+# written
+WARCExportItem = tuple[list[bytes], str | None, dict[str, str] | None]
+
+
+def export_warc_item(rrexpr: ReqresExpr[DeferredSourceType]) -> WARCExportItem:
+    reqres = rrexpr.reqres
+    records, digest = warc_reqres_records(reqres)
+    members = [warc_gzip_record(record) for record in records]
+    response = reqres.response
+    if response is None or digest is None:
+        return members, None, None
+    key = rrexpr["surt"] + " " + response.started_at.format("%Y%m%d%H%M%S", utc=True)
+    fields = {
+        "url": rrexpr["net_url"],
+        "mime": rrexpr.eval_expr("response_mime") or "unk",
+        "status": str(response.code),
+        "digest": digest,
+    }
+    return members, key, fields
+
+
+ExportWARCJob = tuple[
+    _t.Any,
+    LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    _t.Callable[[ReqresExpr[_t.Any]], bool],
+]
+# items, `diff_condition_usages`, an error message
+ExportWARCJobResult = tuple[list[WARCExportItem], list[tuple[int, int]], str | None]
+
+
+def export_warc_job(path: str) -> ExportWARCJobResult:
+    """Load, filter, `WARC`-encode, and compress all reqres stored at a given `path`.
+    This runs in a worker process."""
+    assert _parallel_job is not None
+    cargs, loadf, filters_allow = _t.cast(ExportWARCJob[_t.Any], _parallel_job)
+
+    items: list[WARCExportItem] = []
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        items.append(export_warc_item(rrexpr))
+
+    before = get_condition_usages()
+    error: str | None = None
+    try:
+        map_wrr_paths(cargs, loadf, filters_allow, emit, [path])
+    except CatastrophicFailure as exc:
+        # these are not necessarily picklable
+        error = exc.get_message(gettext)
+    return items, diff_condition_usages(get_condition_usages(), before), error
+
+
+def cmd_export_warc(cargs: _t.Any) -> None:
+    if cargs.max_size <= 0:
+        raise CatastrophicFailure("`--max-size` must be positive")
+
+    _num, filters_allow, filters_warn = compile_filters(cargs)
+
+    destination = cargs.destination
+    index_path = _os.path.join(destination, cargs.prefix + ".cdxj")
+    if cargs.cdxj and _os.path.lexists(index_path):
+        raise Failure("destination already exists: `%s`", index_path)
+    _os.makedirs(destination, exist_ok=True)
+
+    handle_paths(cargs)
+    loadf = mk_rrexprs_load(cargs)
+
+    writer = WARCWriter(destination, cargs.prefix, cargs.max_size * 1024 * 1024)
+    index: list[str] = []
+
+    def write(item: WARCExportItem) -> None:
+        members, key, fields = item
+        filename, offset = writer.write(members)
+        if key is not None and fields is not None:
+            # the response record always goes first
+            fields["length"] = str(len(members[0]))
+            fields["offset"] = str(offset)
+            fields["filename"] = filename
+            index.append(key + " " + _json.dumps(fields, ensure_ascii=False))
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        write(export_warc_item(rrexpr))
+
+    def write_result(result: ExportWARCJobResult) -> None:
+        items, usages, error = result
+        add_condition_usages(usages)
+        for item in items:
+            write(item)
+        if error is not None:
+            raise CatastrophicFailure("%s", error)
+
+    try:
+        if cargs.jobs > 1:
+            job_state = (cargs, loadf, filters_allow)
+            map_paths_parallel(cargs, cargs.paths, job_state, export_warc_job, write_result)
+        else:
+            map_wrr_paths(cargs, loadf, filters_allow, emit, cargs.paths)
+    finally:
+        writer.close()
+
+    if cargs.cdxj:
+        index.sort()
+        atomic_write("".join(line + "\n" for line in index).encode("utf-8"), index_path)
+
+    filters_warn()
 
 
 def path_to_url(x: str) -> str:
@@ -2025,21 +3184,532 @@ def path_to_url(x: str) -> str:
 definitive_response_codes = frozenset([200, 204, 300, 404, 410])
 redirect_response_codes = frozenset([301, 302, 303, 307, 308])
 
-IndexedReqres = tuple[Timestamp, ReqresExpr[_t.Any]]
+
+@_dc.dataclass(slots=True)
+class IndexedInfo:
+    """Parts of an indexed `Reqres` used for choosing between and following index
+    entries. Computed at indexing time, so that doing those things would not
+    need to re-load the `Reqres` from disk."""
+
+    method: str
+    complete: bool
+    code: int | None
+    # `net_url` and `ParsedURL` of the target of a redirect
+    location: tuple[URLType, ParsedURL] | None
+
+
+def get_indexed_info(net_url: URLType, reqres: Reqres) -> IndexedInfo:
+    response = reqres.response
+    if response is None:
+        return IndexedInfo(reqres.request.method, False, None, None)
+
+    code = response.code
+    location: tuple[URLType, ParsedURL] | None = None
+    if code in redirect_response_codes:
+        value = get_header_value(response.headers, "location", None)
+        if value is not None:
+            try:
+                lpurl = parse_url(_up.urljoin(net_url, value))
+            except ValueError:
+                pass
+            else:
+                location = lpurl.net_url, lpurl
+    return IndexedInfo(reqres.request.method, response.complete, code, location)
+
+
+IndexedReqres = tuple[Timestamp, ReqresExpr[_t.Any], IndexedInfo]
+
+
+def indexed_stime(indexed: IndexedReqres) -> Timestamp:
+    return indexed[0]
 
 
 def complete_response(indexed: IndexedReqres) -> bool:
-    response = indexed[1].reqres.response
-    return response is not None and response.complete
+    return indexed[2].complete
 
 
 def normal_document(indexed: IndexedReqres) -> bool:
-    return complete_response(indexed) and indexed[1].reqres.request.method in ["GET", "DOM"]
+    info = indexed[2]
+    return info.complete and info.method in ["GET", "DOM"]
+
+
+ResolvedKey = tuple[URLType, Timestamp | None, _t.Callable[[IndexedReqres], bool]]
+Resolved = tuple[URLType, ParsedURL | None, IndexedReqres | None]
+
+
+def indexed_fields(net_url: URLType, rrexpr: ReqresExpr[_t.Any]) -> dict[str, _t.Any]:
+    """Describe an `IndexedReqres` for an `IndexFile` line."""
+    source = rrexpr.source
+    num: int | None = None
+    if isinstance(source, StreamElementSource):
+        num = source.num
+        source = source.stream_source
+        if not isinstance(source, FileSource) or not fsdecode(source.path).endswith(".wrrb"):
+            raise Failure("only reqres stored in `WRR` files and bundles can be indexed")
+    elif not isinstance(source, FileSource):
+        raise Failure("only reqres stored in `WRR` files and bundles can be indexed")
+
+    info = get_indexed_info(net_url, rrexpr.reqres)
+    fields: dict[str, _t.Any] = {
+        "url": net_url,
+        "method": info.method,
+        "status": info.code,
+        "complete": info.complete,
+    }
+    if info.location is not None:
+        lpurl = info.location[1]
+        fields["location"] = lpurl.net_url + lpurl.ofm + lpurl.fragment
+    fields["path"] = _os.path.abspath(fsdecode(source.path))
+    fields["mtime"] = source.st_mtime_ns
+    if num is not None:
+        fields["num"] = num
+    return fields
+
+
+def indexed_line(rrexpr: ReqresExpr[_t.Any]) -> bytes:
+    net_url = rrexpr.net_url
+    return index_line(parse_url(net_url).surt, rrexpr.stime, indexed_fields(net_url, rrexpr))
+
+
+def indexed_of_fields(
+    stime: Timestamp, fields: dict[str, _t.Any], sniff: SniffContentType
+) -> IndexedReqres:
+    """Inverse of `indexed_fields`."""
+    try:
+        source: DeferredSource = FileSource(fields["path"], fields["mtime"], 0, 0)
+        num = fields.get("num", None)
+        if num is not None:
+            source = SeekableStreamElementSource(source, num, (num,), wrr_bundle_load_nth)
+        location: tuple[URLType, ParsedURL] | None = None
+        lurl = fields.get("location", None)
+        if lurl is not None:
+            lpurl = parse_url(lurl)
+            location = lpurl.net_url, lpurl
+        info = IndexedInfo(fields["method"], fields["complete"], fields["status"], location)
+    except (KeyError, URLParsingError) as exc:
+        raise IndexParsingFailure("malformed index fields `%s`", fields) from exc
+    rrexpr = ReqresExpr(source, None)
+    rrexpr.sniff = sniff
+    return stime, rrexpr, info
+
+
+class ReqresIndex(SortedIndex[URLType, Timestamp, IndexedReqres]):
+    """`SortedIndex` of `IndexedReqres` by `net_url` which can also follow
+    redirects.
+
+    Results of `resolve` are remembered until the next `insert`.
+    `generation` counts successful `insert`s.
+
+    With `base` set, entries of each `net_url` get loaded from it on first
+    access.  With `max_memory` also set, least recently accessed `net_url`s
+    which were not `insert`ed into get forgotten when `mem.consumption` grows
+    larger than that.
+    """
+
+    def __init__(
+        self,
+        ideal: Timestamp | None = None,
+        base: IndexFile | None = None,
+        sniff: SniffContentType = SniffContentType.NONE,
+        max_memory: int | None = None,
+    ) -> None:
+        super().__init__(key_key=identity, value_key=indexed_stime, ideal=ideal)
+        self.generation = 0
+        self.resolved: dict[ResolvedKey, Resolved] = {}
+        self.resolved_size = 0
+
+        self.base = base
+        self.sniff = sniff
+        self.max_memory = max_memory
+        # `net_url`s loaded from `base`, in order of access, with the numbers of
+        # their loaded entries
+        self.faulted: _c.OrderedDict[URLType, int] = _c.OrderedDict()
+        self.faulted_size = 0
+        # `net_url`s loaded from `base` which can not be forgotten
+        self.kept: set[URLType] = set()
+
+    @property
+    def total(self) -> int:
+        """The number of indexed entries, including not yet loaded ones."""
+        if self.base is None:
+            return self.size
+        return self.size - self.faulted_size + len(self.base)
+
+    def __getitem__(self, key: URLType) -> SortedList[IndexedReqres]:
+        if self.base is not None:
+            self.fault(key)
+        return super().__getitem__(key)
+
+    def get(self, key: URLType, default: _t.Any = None) -> _t.Any:
+        if self.base is not None:
+            self.fault(key)
+        return super().get(key, default)
+
+    def fault(self, key: URLType) -> None:
+        """Load entries of `key` from `base`, unless they are loaded already."""
+        assert self.base is not None
+        faulted = self.faulted
+        if key in faulted:
+            faulted.move_to_end(key)
+            return
+        if key in self.kept:
+            return
+
+        # `SortedIndex.insert` calls `get`
+        faulted[key] = 0
+        size = self.size
+        try:
+            surt = parse_url(key).surt
+        except URLParsingError:
+            pass
+        else:
+            sniff = self.sniff
+            for _key, stime, fields in self.base.lookup(surt):
+                if fields.get("url", None) == key:
+                    SortedIndex.insert(self, key, indexed_of_fields(stime, fields, sniff))
+        num = faulted[key] = self.size - size
+        self.faulted_size += num
+
+        max_memory = self.max_memory
+        if max_memory is not None and mem.consumption > max_memory:
+            self.forget_resolved()
+            while len(faulted) > 1 and mem.consumption > max_memory:
+                okey, onum = faulted.popitem(last=False)
+                self.faulted_size -= onum
+                self.size -= onum
+                if onum > 0:
+                    del self[okey]
+
+    def forget_resolved(self) -> None:
+        if len(self.resolved) > 0:
+            self.resolved.clear()
+            mem.consumption -= self.resolved_size
+            self.resolved_size = 0
+
+    def insert(self, key: URLType, value: IndexedReqres) -> bool:
+        if self.base is not None:
+            self.fault(key)
+            num = self.faulted.pop(key, None)
+            if num is not None:
+                self.kept.add(key)
+            # when `base` was generated from the same inputs, replace the
+            # equivalent version loaded from it instead of duplicating it
+            iobjs = super().get(key, None) if num is not None else None
+            if iobjs is not None:
+                stime = value[0]
+                pos = iobjs.bisect_key_left(stime)
+                if pos < len(iobjs) and iobjs[pos][0] == stime:
+                    del iobjs[pos]
+                    self.size -= 1
+                    if len(iobjs) == 0:
+                        del self[key]
+        res = super().insert(key, value)
+        if res:
+            self.generation += 1
+            self.forget_resolved()
+        return res
+
+    def insert_rrexpr(self, rrexpr: ReqresExpr[_t.Any]) -> IndexedReqres | None:
+        """Index a `ReqresExpr` by its `net_url` and `stime`.
+
+        Returns the new `IndexedReqres`, or `None` if the index already
+        has a better version.
+        """
+        net_url = rrexpr.net_url
+        indexed = (rrexpr.stime, rrexpr, get_indexed_info(net_url, rrexpr.reqres))
+        if self.insert(net_url, indexed):
+            return indexed
+        return None
+
+    def resolved_get(
+        self,
+        net_url: URLType,
+        ideal: Timestamp,
+        predicate: _t.Callable[[IndexedReqres], bool],
+    ) -> tuple[ResolvedKey, Resolved | None]:
+        # when `net_url` has at most one version, `ideal` does not matter,
+        # unless it gets redirected to something that has more
+        resolved = self.resolved
+        iobjs = self.get(net_url, None)
+        if iobjs is None or len(iobjs) <= 1:
+            key: ResolvedKey = (net_url, None, predicate)
+            res = resolved.get(key, None)
+            if res is not None:
+                return key, res
+        key = (net_url, ideal, predicate)
+        return key, resolved.get(key, None)
+
+    def resolve(
+        self,
+        net_url: URLType,
+        ideal: Timestamp,
+        predicate: _t.Callable[[IndexedReqres], bool],
+    ) -> Resolved:
+        """Find the version of `net_url` nearest to `ideal` satisfying
+        `predicate`, following redirects.
+
+        Returns the final `net_url`, its `ParsedURL` (or `None` when no
+        redirects were followed), and the found `IndexedReqres` (or `None`
+        when `net_url` is unavailable or redirects in a cycle).
+
+        Results are remembered for all `URL`s of the followed chain.  Those
+        of `URL`s that have a single version, and redirect only to such
+        `URL`s, are remembered independently of `ideal`, so that requisites
+        shared between many documents would get resolved only once.
+        """
+        _key, cres = self.resolved_get(net_url, ideal, predicate)
+        if cres is not None:
+            prof.count("index_resolve_hits")
+            return cres
+        prof.count("index_resolve_misses")
+
+        chain = [net_url]
+        # does the tail of the chain depend on `ideal`?
+        timed = False
+        purl: ParsedURL | None = None
+        uobj: IndexedReqres | None = None
+        again = True
+        while again:
+            again = False
+            for nobj in self.iter_nearest(net_url, ideal, predicate):
+                location = nobj[2].location
+                if location is None:
+                    if nobj[2].code in redirect_response_codes:
+                        # a broken redirect, try other versions
+                        continue
+                    uobj = nobj
+                    break
+
+                # reset and redirect
+                net_url, purl = location
+                if net_url in chain:
+                    # a cycle, give up
+                    break
+
+                ukey, ures = self.resolved_get(net_url, ideal, predicate)
+                if ures is None:
+                    chain.append(net_url)
+                    # try again
+                    again = True
+                else:
+                    # the rest of the chain is already known
+                    timed = ukey[1] is not None
+                    cnet_url, cpurl, uobj = ures
+                    if cpurl is not None:
+                        net_url, purl = cnet_url, cpurl
+                break
+
+        # remember the result for all `URL`s of the chain, from the end
+        resolved = self.resolved
+        for curl in reversed(chain):
+            iobjs = self.get(curl, None)
+            timed = timed or iobjs is not None and len(iobjs) > 1
+            res = (net_url, None, uobj) if curl == net_url else (net_url, purl, uobj)
+            resolved[(curl, ideal if timed else None, predicate)] = res
+            size = 64 + len(curl)
+            self.resolved_size += size
+            mem.consumption += size
+        return res
+
+
+def test_ReqresIndex_resolve() -> None:
+    index = ReqresIndex()
+
+    def add(url: str, stime: int, location: str | None = None) -> None:
+        reqres = trivial_Reqres(parse_url(url), stime=Timestamp(stime))
+        if location is not None:
+            assert reqres.response is not None
+            reqres.response = _dc.replace(
+                reqres.response, code=302, headers=[("Location", location.encode("ascii"))]
+            )
+        index.insert_rrexpr(ReqresExpr(UnknownSource(), reqres))
+
+    add("https://example.org/a", 1, "/b#frag")
+    add("https://example.org/b", 2, "https://example.org/c")
+    add("https://example.org/c", 3)
+    add("https://example.org/c", 10)
+    add("https://example.org/x", 1, "/y")
+    add("https://example.org/y", 1, "/x")
+
+    def check(url: str, stime: int, expected: tuple[str, int] | None) -> None:
+        net_url, purl, uobj = index.resolve(url, Timestamp(stime), normal_document)
+        if expected is None:
+            assert uobj is None
+        else:
+            assert uobj is not None
+            assert (net_url, uobj[0]) == (expected[0], Timestamp(expected[1]))
+            assert purl is None or purl.net_url == net_url
+
+    for _ in range(2):
+        check("https://example.org/a", 0, ("https://example.org/c", 3))
+        check("https://example.org/a", 100, ("https://example.org/c", 10))
+        check("https://example.org/b", 0, ("https://example.org/c", 3))
+        check("https://example.org/c", 100, ("https://example.org/c", 10))
+        check("https://example.org/x", 0, None)
+        check("https://example.org/y", 0, None)
+        check("https://example.org/z", 0, None)
+
+    add("https://example.org/c", 4)
+    assert len(index.resolved) == 0
+    check("https://example.org/a", 0, ("https://example.org/c", 3))
+    check("https://example.org/a", 5, ("https://example.org/c", 4))
+
+
+def test_ReqresIndex_base() -> None:
+    with _tempfile.TemporaryDirectory() as tmp:
+        lines: list[bytes] = []
+
+        def add(url: str, stime: int, location: str | None = None) -> None:
+            reqres = trivial_Reqres(parse_url(url), stime=Timestamp(stime))
+            if location is not None:
+                assert reqres.response is not None
+                reqres.response = _dc.replace(
+                    reqres.response, code=302, headers=[("Location", location.encode("ascii"))]
+                )
+            path = _os.path.join(tmp, f"{len(lines)}.wrr")
+            with open(path, "wb") as f:
+                f.write(wrr_dumps(reqres))
+            lines.append(indexed_line(rrexpr_wrr_loadf(path)))
+
+        add("https://example.org/a", 1, "/b#frag")
+        add("https://example.org/b", 2, "https://example.org/c")
+        add("https://example.org/c", 3)
+        add("https://example.org/c", 10)
+        add("https://www.example.org/c", 5)
+        lines.sort()
+
+        index_path = _os.path.join(tmp, "index")
+        with open(index_path, "wb") as f:
+            index_dump(f, lines)
+
+        index = ReqresIndex(base=IndexFile(index_path), max_memory=0)
+        assert index.total == 5 and index.size == 0
+
+        def check(url: str, stime: int, expected: tuple[str, int] | None) -> None:
+            net_url, purl, uobj = index.resolve(url, Timestamp(stime), normal_document)
+            if expected is None:
+                assert uobj is None
+            else:
+                assert uobj is not None
+                assert (net_url, uobj[0]) == (expected[0], Timestamp(expected[1]))
+                assert uobj[1].net_url == net_url
+                assert purl is None or purl.net_url == net_url
+
+        for _ in range(2):
+            check("https://example.org/a", 0, ("https://example.org/c", 3))
+            check("https://example.org/a", 100, ("https://example.org/c", 10))
+            check("https://www.example.org/c", 0, ("https://www.example.org/c", 5))
+            check("https://example.org/z", 0, None)
+        # everything but the last accessed `net_url` got forgotten
+        assert len(index.faulted) == 1
+
+        # a version which is already in `base` does not get duplicated
+        stime, rrexpr, _info = index.get_nearest1("https://example.org/c", Timestamp(3))  # type: ignore
+        rrexpr = ReqresExpr(UnknownSource(), rrexpr.reqres)
+        assert index.insert_rrexpr(rrexpr) is not None
+        assert [x[0] for x in index.iter_nearest("https://example.org/c", stime)] == [
+            Timestamp(3),
+            Timestamp(10),
+        ]
+        assert "https://example.org/c" in index.kept
+
+
+IndexJob = tuple[
+    _t.Any,
+    LoadFFunc[_t.AnyStr, _t.Iterator[ReqresExpr[_t.Any]]],
+    _t.Callable[[ReqresExpr[_t.Any]], bool],
+]
+# lines, `diff_condition_usages`, an error message
+IndexJobResult = tuple[list[bytes], list[tuple[int, int]], str | None]
+
+
+def index_job(path: str) -> IndexJobResult:
+    """Load, filter, and describe all reqres stored at a given `path`. This runs
+    in a worker process."""
+    assert _parallel_job is not None
+    cargs, loadf, filters_allow = _t.cast(IndexJob[_t.Any], _parallel_job)
+
+    lines: list[bytes] = []
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        lines.append(indexed_line(rrexpr))
+
+    before = get_condition_usages()
+    error: str | None = None
+    try:
+        map_wrr_paths(cargs, loadf, filters_allow, emit, [path])
+    except CatastrophicFailure as exc:
+        # these are not necessarily picklable
+        error = exc.get_message(gettext)
+    return lines, diff_condition_usages(get_condition_usages(), before), error
+
+
+def cmd_index(cargs: _t.Any) -> None:
+    _num, filters_allow, filters_warn = compile_filters(cargs)
+
+    destination = _os.path.expanduser(cargs.destination)
+    if _os.path.lexists(destination):
+        raise Failure("destination already exists: `%s`", destination)
+
+    handle_paths(cargs)
+    loadf = mk_rrexprs_load(cargs)
+
+    lines: list[bytes] = []
+
+    def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
+        lines.append(indexed_line(rrexpr))
+        rrexpr.unload()
+
+    def add_result(result: IndexJobResult) -> None:
+        rlines, usages, error = result
+        add_condition_usages(usages)
+        lines.extend(rlines)
+        if error is not None:
+            raise CatastrophicFailure("%s", error)
+
+    if cargs.jobs > 1:
+        job_state = (cargs, loadf, filters_allow)
+        map_paths_parallel(cargs, cargs.paths, job_state, index_job, add_result)
+    else:
+        map_wrr_paths(cargs, loadf, filters_allow, emit, cargs.paths)
+
+    lines.sort()
+
+    def make_dst(tmp_path: str, fsync_immediately: bool) -> None:
+        try:
+            with open(tmp_path, "xb") as fdst:
+                index_dump(fdst, lines)
+                fdst.flush()
+                if fsync_immediately:
+                    _os.fsync(fdst.fileno())
+        except Exception:
+            unlink_maybe(tmp_path)
+            raise
+
+    atomic_make_file(make_dst, destination)
+
+    if not cargs.quiet:
+        filters_warn()
+        stderr.write_str_ln(gettext("indexed %d reqres into `%s`") % (len(lines), destination))
+        stderr.flush()
+
+
+def open_index(cargs: _t.Any) -> IndexFile | None:
+    if cargs.index is None:
+        return None
+    path = _os.path.expanduser(cargs.index)
+    try:
+        return IndexFile(path)
+    except OSError as exc:
+        raise CatastrophicFailure("failed to open `%s`: %s", path, str(exc)) from exc
+    except IndexParsingFailure as exc:
+        raise CatastrophicFailure("%s", exc.get_message(gettext)) from exc
 
 
 def cmd_mirror(cargs: _t.Any) -> None:
     if len(cargs.exprs) == 0:
         cargs.exprs = [compile_expr(default_expr("mirror", cargs.default_expr))]
+    exprs = compile_exprs(cargs.exprs)
 
     output_format = elaborate_output("--output", output_alias, cargs.output)
     destination = _os.path.expanduser(cargs.destination)
@@ -2118,9 +3788,7 @@ def cmd_mirror(cargs: _t.Any) -> None:
     max_depth: int = cargs.depth
     max_memory_mib = cargs.max_memory * 1024 * 1024
 
-    index: SortedIndex[URLType, Timestamp, IndexedReqres] = SortedIndex(
-        key_key=identity, value_key=fst, ideal=nearest if singletons else None
-    )
+    index = ReqresIndex(nearest if singletons else None, open_index(cargs), cargs.sniff)
 
     Queue = _c.OrderedDict[RequestOrPageIDType, IndexedReqres]
     queue: Queue = _c.OrderedDict()
@@ -2167,11 +3835,15 @@ def cmd_mirror(cargs: _t.Any) -> None:
 
     def collect(should_enqueue: bool) -> EmitFunc[ReqresExpr[DeferredSourceType]]:
         def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
-            stime = rrexpr.stime
             net_url = rrexpr.net_url
-            indexed = (stime, rrexpr)
-            if not index.insert(net_url, indexed):
-                return
+            indexed = index.insert_rrexpr(rrexpr)
+            if indexed is None:
+                if index.base is None:
+                    return
+                # `index.base` has a better version, which will never be
+                # `emit`ted, so queue it in place of this one
+                indexed = index[net_url][0]
+            stime, qrrexpr, _info = indexed
 
             unqueued = True
             request_id = get_request_id(net_url, rrexpr)
@@ -2181,10 +3853,10 @@ def cmd_mirror(cargs: _t.Any) -> None:
                 for pid in (request_id, page_id):
                     qobj = queue.get(pid, None)
                     if qobj is not None:
-                        qstime, _qrrexpr = qobj
+                        qstime, _qrrexpr, _qinfo = qobj
                         if nearer_to_than(nearest, stime, qstime):
                             queue[pid] = indexed
-                            report_queued(stime, net_url, rrexpr.pretty_net_url, rrexpr.source, 1, qstime)  # fmt: skip
+                            report_queued(stime, net_url, qrrexpr.pretty_net_url, qrrexpr.source, 1, qstime)  # fmt: skip
                         unqueued = False
 
             if unqueued and should_enqueue and root_filters_allow(rrexpr):
@@ -2192,9 +3864,9 @@ def cmd_mirror(cargs: _t.Any) -> None:
                 pid = request_id if nearest is not None else page_id
                 #     ^ not `--all`                          ^ otherwise
                 queue[pid] = indexed
-                report_queued(stime, net_url, rrexpr.pretty_net_url, rrexpr.source, 1)  # fmt: skip
+                report_queued(stime, net_url, qrrexpr.pretty_net_url, qrrexpr.source, 1)  # fmt: skip
 
-            if unqueued or mem.consumption > max_memory_mib:
+            if unqueued or qrrexpr is not rrexpr or mem.consumption > max_memory_mib:
                 rrexpr.unload()
 
         return emit
@@ -2211,7 +3883,7 @@ def cmd_mirror(cargs: _t.Any) -> None:
         cargs, rrexprs_load, filters_allow, collect(False), cargs.boring, seen_paths=seen_paths
     )
 
-    indexed_num = index.size
+    indexed_num = index.total
 
     def remap_url_fallback(
         stime: Timestamp, purl: ParsedURL, expected_content_types: list[str]
@@ -2302,41 +3974,17 @@ def cmd_mirror(cargs: _t.Any) -> None:
                 ustime = stime if nearest is None or is_requisite else nearest
                 upredicate = normal_document if link_type != LinkType.ACTION else complete_response
 
-                uobj: IndexedReqres | None = None
-                again = True
-                while again:
-                    again = False
-                    for nobj in index.iter_nearest(unet_url, ustime, upredicate):
-                        response = nobj[1].reqres.response
-                        assert response is not None
-                        code = response.code
-                        if code in redirect_response_codes:
-                            location = get_header_value(response.headers, "location", None)
-                            if location is not None:
-                                try:
-                                    unet_url_ = _up.urljoin(unet_url, location)
-                                    upurl_ = parse_url(unet_url_)
-                                except ValueError:
-                                    pass
-                                else:
-                                    # preserve the fragment
-                                    upurl_.ofm = upurl.ofm
-                                    upurl_.fragment = upurl.fragment
-                                    # reset and redirect
-                                    unet_url = unet_url_
-                                    upurl = upurl_
-                                    # try again
-                                    again = True
-                                    break
-                        else:
-                            uobj = nobj
-                            break
-
+                unet_url_, upurl_, uobj = index.resolve(unet_url, ustime, upredicate)
+                if upurl_ is not None:
+                    # preserve the fragment
+                    unet_url = unet_url_
+                    upurl = _dc.replace(upurl_, ofm=upurl.ofm, fragment=upurl.fragment)
+
                 if uobj is None:
                     # unavailable
                     urel_out_path = None
                 else:
-                    ustime, urrexpr = uobj
+                    ustime, urrexpr, _uinfo = uobj
                     urequest_id = get_request_id(unet_url, urrexpr)
                     upage_id = (ustime, urequest_id)
 
@@ -2421,15 +4069,14 @@ def cmd_mirror(cargs: _t.Any) -> None:
                 if stdout.isatty():
                     stdout.write_bytes(b"\033[0m")
             else:
-                with TIOWrappedWriter(_io.BytesIO()) as f:
-                    print_exprs(rrexpr, cargs.exprs, cargs.separator, f)
-                    data = f.fobj.getvalue()
+                data = join_values_bytes(get_exprs_bytes(rrexpr, exprs), cargs.separator)
 
             try:
                 if copying:
                     real_out_path = rel_out_path
                     if old_data != data:
-                        atomic_write(data, rel_out_path, allow_updates)
+                        with prof.stage("atomic_write"):
+                            atomic_write(data, rel_out_path, allow_updates)
                 else:
                     rrexpr.values["content"] = data
                     rrexpr.values["content_sha256"] = sha256_raw = _hashlib.sha256(data).digest()
@@ -2442,7 +4089,8 @@ def cmd_mirror(cargs: _t.Any) -> None:
                     old_content = read_file_maybe(real_out_path)
 
                     if old_content is None:
-                        atomic_write(data, real_out_path, False)
+                        with prof.stage("atomic_write"):
+                            atomic_write(data, real_out_path, False)
                     elif old_content != data:
                         raise Failure(
                             "wrong file content in `%s`: expected sha256 `%s`, got sha256 `%s`",
@@ -2452,7 +4100,8 @@ def cmd_mirror(cargs: _t.Any) -> None:
                         )
 
                     if old_data != data:
-                        action_op(real_out_path, rel_out_path, allow_updates)
+                        with prof.stage("atomic_write"):
+                            action_op(real_out_path, rel_out_path, allow_updates)
 
                     stdout.write_str_ln(ispace + gettext("content_dst %s") % (real_out_path,))
 
@@ -2493,7 +4142,7 @@ def cmd_mirror(cargs: _t.Any) -> None:
             raise_first_delayed_signal()
 
             _qpid, qobj = queue.popitem(False)
-            qstime, qrrexpr = qobj
+            qstime, qrrexpr, _qinfo = qobj
             render(qstime, qrrexpr.net_url, qrrexpr, get_rel_out_path(qrrexpr), enqueue, new_queue, 0)  # fmt: skip
             qrrexpr.unload()
 
@@ -2504,6 +4153,114 @@ def cmd_mirror(cargs: _t.Any) -> None:
     root_filters_warn()
 
 
+def test_cmd_mirror_index() -> None:
+    def run(*argv: str) -> None:
+        old_argv = _sys.argv
+        _sys.argv = [__prog__] + list(argv)
+        try:
+            main()
+        except SystemExit as exc:
+            assert exc.code in (None, 0)
+        finally:
+            _sys.argv = old_argv
+
+    def tree(path: str) -> dict[str, bytes]:
+        res = {}
+        for root, _dirs, files in _os.walk(path):
+            for name in files:
+                fpath = _os.path.join(root, name)
+                with open(fpath, "rb") as f:
+                    res[_os.path.relpath(fpath, path)] = f.read()
+        return res
+
+    with _tempfile.TemporaryDirectory() as tmp:
+        paths: list[str] = []
+
+        def add(url: str, stime: int, data: bytes = b"") -> None:
+            content_type = "text/html" if url.endswith("/") else "image/png"
+            reqres = trivial_Reqres(parse_url(url), content_type, stime=Timestamp(stime), data=data)
+            path = _os.path.join(tmp, f"{len(paths)}.wrr")
+            with open(path, "wb") as f:
+                f.write(wrr_dumps(reqres))
+            paths.append(path)
+
+        add("https://example.org/", 1, b'<img src="/old.png">')
+        add("https://example.org/", 10, b'<img src="/new.png">')
+        add("https://example.org/old.png", 1)
+        add("https://example.org/new.png", 10)
+
+        index_path = _os.path.join(tmp, "index")
+        run("index", "-t", index_path, *paths)
+
+        # the root's version is older than the latest indexed one, which must
+        # be used instead, exactly as with `--boring`
+        with_index = _os.path.join(tmp, "with_index")
+        with_boring = _os.path.join(tmp, "with_boring")
+        run("mirror", "-t", with_index, "--index", index_path, paths[0])
+        boring = [arg for path in paths[1:] for arg in ("--boring", path)]
+        run("mirror", "-t", with_boring, paths[0], *boring)
+        res = tree(with_index)
+        assert res == tree(with_boring)
+        assert "example.org/new.0.png" in res
+        assert "example.org/old.0.png" not in res
+
+
+byte_range_re = _re.compile(r"(\d+)-(\d*)|-(\d+)")
+
+
+def parse_byte_ranges(value: str, total: int) -> list[tuple[int, int]] | None:
+    """Parse a `Range` header `value` into a list of satisfiable `(start, end)`
+    ranges of `total` bytes, with exclusive `end`s. Return `None` if `value` is
+    not a well-formed `bytes` range set, so that it could be ignored, as RFC9110
+    requires."""
+    unit, sep, spec = value.partition("=")
+    if sep == "" or unit.strip().lower() != "bytes":
+        return None
+    res = []
+    num = 0
+    for elem in spec.split(","):
+        elem = elem.strip()
+        if elem == "":
+            continue
+        num += 1
+        m = byte_range_re.fullmatch(elem)
+        if m is None:
+            return None
+        first, last, suffix = m.groups()
+        if suffix is not None:
+            length = int(suffix)
+            if length > 0:
+                res.append((max(0, total - length), total))
+            continue
+        start = int(first)
+        if last == "":
+            end = total
+        else:
+            end = int(last) + 1
+            if end <= start:
+                return None
+        if start < total:
+            res.append((start, min(end, total)))
+    if num == 0:
+        return None
+    return res
+
+
+def test_parse_byte_ranges() -> None:
+    assert parse_byte_ranges("bytes=0-9", 100) == [(0, 10)]
+    assert parse_byte_ranges("bytes=90-", 100) == [(90, 100)]
+    assert parse_byte_ranges("bytes=90-200", 100) == [(90, 100)]
+    assert parse_byte_ranges("bytes=-10", 100) == [(90, 100)]
+    assert parse_byte_ranges("bytes=-200", 100) == [(0, 100)]
+    assert parse_byte_ranges("Bytes = 0-0, 5-5", 100) == [(0, 1), (5, 6)]
+    # unsatisfiable
+    assert parse_byte_ranges("bytes=100-", 100) == []
+    assert parse_byte_ranges("bytes=-0", 100) == []
+    # malformed
+    for value in ["", "bytes", "bytes=", "items=0-9", "bytes=a-b", "bytes=9-0", "bytes=0-9;x"]:
+        assert parse_byte_ranges(value, 100) is None
+
+
 def cmd_serve(cargs: _t.Any) -> None:
     import bottle
     from fnmatch import translate
@@ -2515,7 +4272,7 @@ def cmd_serve(cargs: _t.Any) -> None:
 
     locate_page = bottle.SimpleTemplate(source=_static.locate_page_stpl)
     app = bottle.Bottle()
-    BottleReturnType = str | bytes | None
+    BottleReturnType = str | bytes | _t.Iterator[bytes] | None
 
     PSpec = _t.ParamSpec("PSpec")
 
@@ -2528,6 +4285,18 @@ def cmd_serve(cargs: _t.Any) -> None:
 
         return decorated
 
+    # `spool` updates the index from its own thread
+    index_lock = _threading.Lock()
+
+    def with_index_lock(
+        func: _t.Callable[PSpec, BottleReturnType]
+    ) -> _t.Callable[PSpec, BottleReturnType]:
+        def decorated(*args: PSpec.args, **kwargs: PSpec.kwargs) -> BottleReturnType:
+            with index_lock:
+                return func(*args, **kwargs)
+
+        return decorated
+
     def with_plain_error(
         func: _t.Callable[PSpec, BottleReturnType]
     ) -> _t.Callable[PSpec, BottleReturnType]:
@@ -2576,9 +4345,23 @@ def cmd_serve(cargs: _t.Any) -> None:
             )
         ]
         inherit = "request" if cargs.default_expr == "raw_qbody" else "response"
+    exprs = compile_exprs(cargs.exprs)
     take_whatever = inherit != "response"
     not_web_replay = not cargs.web_replay
 
+    # everything, except the index, that influences replay responses
+    etag_config = repr(
+        (
+            exprs.exprs,
+            cargs.separator,
+            inherit,
+            not_web_replay,
+            time_format,
+            precision,
+            cargs.sniff,
+        )
+    )
+
     if cargs.default_input_filters:
         cargs.status_re += [default_input_status_re]
 
@@ -2586,19 +4369,114 @@ def cmd_serve(cargs: _t.Any) -> None:
 
     PathType: _t.TypeAlias = str
 
-    index: SortedIndex[URLType, Timestamp, IndexedReqres] = SortedIndex(
-        key_key=identity,
-        value_key=fst,
-        ideal=cargs.replay if cargs.replay is not False else anytime.end,
+    index = ReqresIndex(
+        cargs.replay if cargs.replay is not False else anytime.end,
+        open_index(cargs) if do_replay else None,
+        cargs.sniff,
+        cargs.max_memory * 1024 * 1024,
     )
 
     def emit(rrexpr: ReqresExpr[DeferredSourceType]) -> None:
-        stime = rrexpr.stime
-        net_url = rrexpr.net_url
-        indexed = (stime, rrexpr)
-        index.insert(net_url, indexed)
+        index.insert_rrexpr(rrexpr)
         rrexpr.unload()
 
+    def archive_wrr(
+        bucket: str, reqres: Reqres, rfunc: SpoolReaderFunc, size: int, replaying: bool
+    ) -> None:
+        assert destination is not None
+
+        def make_dst(tmp_path: str, fsync_immediately: bool) -> None:
+            try:
+                with open(tmp_path, "xb") as fdst:
+                    if compression:
+                        gz = _gzip.GzipFile(
+                            fileobj=fdst, filename="", mtime=0, mode="wb", compresslevel=9
+                        )
+                        with gz, rfunc() as fsrc:
+                            _shutil.copyfileobj(fsrc, gz, spool_chunk_size)
+                    if not compression or fdst.tell() >= size:
+                        # it does not compress, same as `gzip_maybe`
+                        fdst.seek(0)
+                        fdst.truncate()
+                        with rfunc() as fsrc:
+                            _shutil.copyfileobj(fsrc, fdst, spool_chunk_size)
+                    fdst.flush()
+                    if fsync_immediately:
+                        _os.fsync(fdst.fileno())
+            except Exception:
+                unlink_maybe(tmp_path)
+                raise
+
+        def same_data(path: str) -> bool:
+            try:
+                with open(path, "rb") as fobj, rfunc() as fsrc:
+                    return same_fileobj_data(ungzip_fileobj_maybe(fobj), fsrc)
+            except (OSError, EOFError):
+                return False
+
+        trrexpr = ReqresExpr(UnknownSource(), reqres)
+        trrexpr.values["num"] = 0
+        prev_path: str | None = None
+        while True:
+            rel_out_path = _os.path.join(destination, bucket, output_format % trrexpr)
+            abs_out_path = _os.path.abspath(rel_out_path)
+
+            if prev_path == abs_out_path:
+                raise Failure("destination already exists" + variance_help)
+            prev_path = abs_out_path
+
+            try:
+                with prof.stage("atomic_write"):
+                    atomic_make_file(make_dst, abs_out_path)
+            except FileExistsError:
+                if replaying and same_data(abs_out_path):
+                    # it was archived before the previous run stopped
+                    return
+            except OSError as exc:
+                raise Failure("failed to write data to `%s`: %s", abs_out_path, str(exc)) from exc
+            else:
+                break
+
+            trrexpr.values["num"] += 1
+
+        if do_replay and not replaying:
+            rrexpr = ReqresExpr(make_FileSource(abs_out_path, _os.stat(abs_out_path)), reqres)
+            rrexpr.values = trrexpr.values
+            if filters_allow(rrexpr):
+                # this can run in `spool`'s thread
+                with index_lock:
+                    emit(rrexpr)
+                    all_urls.add(url_info(rrexpr.net_url, rrexpr.reqres.request.url))
+
+        if terminator is not None:
+            stdout.write(abs_out_path)
+            stdout.write_bytes(terminator)
+            stdout.flush()
+
+        stderr.write_str_ln(gettext("archived %s -> %s") % (trrexpr.net_url, abs_out_path))
+        stderr.flush()
+
+    def spool_process(
+        meta: bytes, rfunc: SpoolReaderFunc, size: int, reqres: Reqres | None
+    ) -> None:
+        replaying = reqres is None
+        if reqres is None:
+            with rfunc() as fobj:
+                reqres = wrr_load_cbor_fileobj(fobj)
+        archive_wrr(meta.decode("utf-8"), reqres, rfunc, size, replaying)
+
+    spool: Spool | None = None
+    if destination is not None:
+        _os.makedirs(destination, exist_ok=True)
+    if destination is not None and cargs.spool:
+        spool = Spool(_os.path.join(destination, spool_file_name), spool_process)
+        spooled = spool.replay()
+        if spooled > 0 and not quiet:
+            stderr.write_str_ln(
+                gettext("processed %d reqres left in the spool by the previous run") % (spooled,)
+            )
+            stderr.flush()
+
     if do_replay:
         if stderr.isatty():
             stderr.write_bytes(b"\033[32m")
@@ -2618,6 +4496,8 @@ def cmd_serve(cargs: _t.Any) -> None:
         map_wrr_paths(cargs, rrexprs_load, filters_allow, emit, cargs.paths, seen_paths=seen_paths)
     elif cargs.implicit:
         raise CatastrophicFailure("`--no-replay`: not allowed with `--implicit`")
+    elif cargs.index is not None:
+        raise CatastrophicFailure("`--no-replay`: not allowed with `--index`")
     elif len(cargs.paths) > 0:
         raise CatastrophicFailure("`--no-replay`: not allowed with a non-empty list of `PATH`s")
 
@@ -2629,24 +4509,37 @@ def cmd_serve(cargs: _t.Any) -> None:
 
     all_urls = SortedList(map(lambda net_url: url_info(net_url, parse_url(net_url)), index.keys()))
 
+    def iter_all_urls() -> _t.Iterator[tuple[str, str, str]]:
+        yield from all_urls
+        if index.base is None:
+            return
+        # `URL`s of `--index` do not get loaded into `all_urls`, walk them instead
+        for _key, _stime, fields in index.base:
+            net_url = fields["url"]
+            yield url_info(net_url, parse_url(net_url))
+
     def get_visits(
         url_like_re: _re.Pattern[str], start: Timestamp, end: Timestamp
     ) -> tuple[int, list[tuple[str, str, list[str]]]]:
         visits_total = 0
         url_visits = []
-        for _rhost, pretty_net_url, net_url in all_urls:
-            if not url_like_re.fullmatch(pretty_net_url):
+        seen: set[str] = set()
+        for rhost, pretty_net_url, net_url in iter_all_urls():
+            if net_url in seen or not url_like_re.fullmatch(pretty_net_url):
                 continue
+            seen.add(net_url)
 
             visits = []
-            for when, _rrexpr in index.iter_range(net_url, start, end):
+            for when, _rrexpr, _info in index.iter_range(net_url, start, end):
                 # if normal_document(t, v):
                 visits.append(when.format(time_format, precision=precision))
                 visits_total += 1
 
             if len(visits) > 0:
-                url_visits.append((net_url, pretty_net_url, visits))
-        return visits_total, url_visits
+                url_visits.append((rhost, net_url, pretty_net_url, visits))
+        if index.base is not None:
+            url_visits.sort(key=lambda x: (x[0], x[2], x[1]))
+        return visits_total, [(n, p, v) for _r, n, p, v in url_visits]
 
     server_info_dict: dict[str, _t.Any] = {
         "version": 1,
@@ -2692,75 +4585,35 @@ def cmd_serve(cargs: _t.Any) -> None:
         if len(bucket) == 0:
             bucket = default_bucket
 
-        # read request body data
-        cborf = BytesIOReader(b"")
+        # stream request body data to disk, and then parse it from there,
+        # so that large bodies would not be kept in memory twice
         inf = env["wsgi.input"]
         try:
-            todo = int(env["CONTENT_LENGTH"])
+            size = int(env["CONTENT_LENGTH"])
         except Exception as exc:
             raise Failure("need `content-length`") from exc
 
-        while todo > 0:
-            res = inf.read(todo)
-            if len(res) == 0:
-                raise Failure("incomplete data")
-            cborf.write(res)
-            todo -= len(res)
-
-        cborf.seek(0)
-        try:
-            reqres = wrr_load_cbor_fileobj(cborf)
-        except Failure as exc:
-            raise exc.elaborate("failed to parse content body")
-        except Exception as exc:
-            raise Failure("failed to parse content body: %s", str(exc)) from exc
-
-        cborf.seek(0)
-        data = cborf.getvalue()  # type: ignore
-        del cborf
-        if compression:
-            data = gzip_maybe(data)
-
-        trrexpr = ReqresExpr(UnknownSource(), reqres)
-        trrexpr.values["num"] = 0
-        prev_path: str | None = None
-        while True:
-            rel_out_path = _os.path.join(destination, bucket, output_format % trrexpr)
-            abs_out_path = _os.path.abspath(rel_out_path)
-
-            if prev_path == abs_out_path:
-                raise Failure("destination already exists" + variance_help)
-            prev_path = abs_out_path
-
+        def validate(rfunc: SpoolReaderFunc) -> Reqres:
             try:
-                atomic_write(data, abs_out_path)
-            except FileExistsError:
-                pass
-            except OSError as exc:
-                raise Failure("failed to write data to `%s`: %s", abs_out_path, str(exc)) from exc
-            else:
-                break
-
-            trrexpr.values["num"] += 1
-
-        if do_replay:
-            rrexpr = ReqresExpr(make_FileSource(abs_out_path, _os.stat(abs_out_path)), reqres)
-            rrexpr.values = trrexpr.values
-            if filters_allow(rrexpr):
-                emit(rrexpr)
-                all_urls.add(url_info(rrexpr.net_url, rrexpr.reqres.request.url))
-
-        if terminator is not None:
-            stdout.write(abs_out_path)
-            stdout.write_bytes(terminator)
-            stdout.flush()
-
-        stderr.write_str_ln(gettext("archived %s -> %s") % (rrexpr.net_url, abs_out_path))
-        stderr.flush()
+                with rfunc() as fobj:
+                    return wrr_load_cbor_fileobj(fobj)
+            except Failure as exc:
+                raise exc.elaborate("failed to parse content body")
+            except Exception as exc:
+                raise Failure("failed to parse content body: %s", str(exc)) from exc
 
+        if spool is not None:
+            spool.append(bucket.encode("utf-8"), inf.read, size, validate)
+        else:
+            with _tempfile.TemporaryFile(dir=destination) as tmp:
+                fd = tmp.fileno()
+                copy_to_fd(fd, inf.read, size)
+                rfunc = file_region_reader(fd, 0, size)
+                archive_wrr(bucket, validate(rfunc), rfunc, size, False)
         return b""
 
     @app.route("/<namespace:re:(web|redirect|unavailable|other)>/<selector>/<url_path:path>")  # type: ignore
+    @with_index_lock
     @with_no_signals
     def from_archive(namespace: str, selector: str, url_path: str) -> BottleReturnType:
         if not do_replay:
@@ -2851,12 +4704,42 @@ def cmd_serve(cargs: _t.Any) -> None:
                     }
                 )
 
-        stime, rrexpr = uobj
+        stime, rrexpr, info = uobj
         stime_selector = stime.format(time_format, precision=precision)
+
+        if namespace == "redirect" and inherit == "response" and info.location is not None:
+            # answer with the end of the redirect chain, without loading anything
+            unet_url, upurl, tobj = index.resolve(net_url, stime, normal_document)
+            if tobj is None:
+                unamespace = "unavailable"
+                ustime_selector = stime_selector
+            else:
+                ustime, _trrexpr, tinfo = tobj
+                unamespace = (
+                    "web" if take_whatever or tinfo.code in definitive_response_codes else "other"
+                )
+                ustime_selector = ustime.format(time_format, precision=precision)
+            uofmf = upurl.ofm + upurl.fragment if upurl is not None else ""
+            bottle.redirect(f"/{unamespace}/{ustime_selector}/{unet_url}{uofmf}", info.code)
+            return None
         if stime not in interval or interval.delta > precision_delta:
             bottle.redirect(f"/{namespace}/{stime_selector}/{turl}", 302)
             return None
 
+        # since remapped URLs depend on what's in the index, responses only
+        # stay the same until the next archival
+        etag = (
+            '"'
+            + _hashlib.sha256(
+                f"{etag_config}\0{index.generation}\0{namespace}\0{rrexpr.source!r}".encode("utf-8")
+            ).hexdigest()[:32]
+            + '"'
+        )
+        bottle.response.set_header("etag", etag)
+        if etag_matches(bottle.request.get_header("if-none-match"), etag):
+            bottle.response.status = 304
+            return None
+
         try:
 
             def remap_url(
@@ -2869,10 +4752,8 @@ def cmd_serve(cargs: _t.Any) -> None:
                 ustime_selector = stime_selector if fallbacks is not None else None
 
                 for uobj in index.iter_nearest(unet_url, stime, normal_document):
-                    ustime, urrexpr = uobj
-                    response = urrexpr.reqres.response
-                    assert response is not None
-                    code = response.code
+                    ustime, _urrexpr, uinfo = uobj
+                    code = uinfo.code
                     if take_whatever or code in definitive_response_codes:
                         # that's a definitive answer page, point this directly
                         # there to optimize away redirects
@@ -2965,12 +4846,34 @@ def cmd_serve(cargs: _t.Any) -> None:
             else:
                 bottle.response.set_header("content-type", "application/octet-stream")
 
-            data: bytes
-            with TIOWrappedWriter(_io.BytesIO()) as f:
-                print_exprs(rrexpr, cargs.exprs, cargs.separator, f)
-                data = f.fobj.getvalue()
+            datas = get_exprs_bytes(rrexpr, exprs)
+            total = len_values_bytes(datas, cargs.separator)
+            start, end = 0, total
 
-            return data
+            bottle.response.set_header("accept-ranges", "bytes")
+            range_header = bottle.request.get_header("range")
+            if_range = bottle.request.get_header("if-range")
+            if (
+                range_header is not None
+                and bottle.response.status_code == 200
+                and (if_range is None or if_range.strip() == etag)
+            ):
+                ranges = parse_byte_ranges(range_header, total)
+                if ranges is None:
+                    # malformed, ignore it
+                    pass
+                elif len(ranges) == 0:
+                    bottle.response.status = 416
+                    bottle.response.set_header("content-range", f"bytes */{total}")
+                    return None
+                elif len(ranges) == 1:
+                    start, end = ranges[0]
+                    bottle.response.status = 206
+                    bottle.response.set_header("content-range", f"bytes {start}-{end - 1}/{total}")
+                # otherwise, ignore it, since we don't do `multipart/byteranges`
+
+            bottle.response.set_header("content-length", str(end - start))
+            return iter_values_bytes(datas, cargs.separator, start, end)
         except Failure as exc:
             exc.elaborate("while processing [%s] `%s`", stime.format(), turl)
             bottle.abort(500, exc.get_message(gettext))
@@ -2988,7 +4891,7 @@ def cmd_serve(cargs: _t.Any) -> None:
     if do_replay:
         stderr.write_str_ln(
             gettext("Serving replays for %d reqres at %s")
-            % (index.size, f"{server_url_base}/web/*/*")
+            % (index.total, f"{server_url_base}/web/*/*")
         )
     else:
         stderr.write_str_ln(gettext("Replay server support is disabled"))
@@ -2996,8 +4899,165 @@ def cmd_serve(cargs: _t.Any) -> None:
         stderr.write_bytes(b"\033[0m")
     stderr.flush()
 
-    with yes_signals():
-        app.run(host=cargs.host, port=cargs.port, quiet=quiet, debug=cargs.debug_bottle)
+    try:
+        with yes_signals():
+            app.run(host=cargs.host, port=cargs.port, quiet=quiet, debug=cargs.debug_bottle)
+    finally:
+        if spool is not None:
+            spool.close()
+
+
+def daemon_child(conn: _socket.socket) -> _t.NoReturn:
+    """Serve a single `hoardy-web-client` request received by `cmd_daemon` on `conn`.
+    This runs in a forked child and never returns."""
+    code = 1
+    try:
+        uid = daemon_peer_uid(conn)
+        if uid is not None and uid != _os.getuid():
+            raise Failure("refusing a request from UID %d", uid)
+
+        header, fds, _flags, _addr = _socket.recv_fds(conn, daemon_int.size, daemon_max_fds)
+        if len(header) == 0:
+            # the client went away without sending anything, e.g., it was
+            # `cmd_daemon` checking if this socket is in use
+            _os._exit(code)
+        header += recv_exactly(conn, daemon_int.size - len(header))
+        size = daemon_int.unpack(header)[0]
+        if size < 0 or size > daemon_max_request:
+            raise Failure("bad request size %d", size)
+        request = _json.loads(recv_exactly(conn, size))
+
+        targets = request["fds"]
+        if len(fds) != len(targets) or targets[:3] != [0, 1, 2]:
+            raise Failure("bad file descriptors")
+
+        _os.chdir(request["cwd"])
+        _os.environ.clear()
+        _os.environ.update(request["env"])
+        # recompute it from the new environment
+        _tempfile.tempdir = None
+
+        # the log handlers of the daemon are bound to its own `stderr`
+        for hnd in list(_logging.root.handlers):
+            _logging.root.removeHandler(hnd)
+
+        # move everything out of the way first, so that installing received
+        # file descriptors would not clobber any of them
+        base = max(targets) + 1
+        conn_fd = _fcntl.fcntl(conn.fileno(), _fcntl.F_DUPFD, base)
+        conn.close()
+        conn = _socket.socket(fileno=conn_fd)
+        moved = []
+        for fd in fds:
+            moved.append(_fcntl.fcntl(fd, _fcntl.F_DUPFD, base))
+            _os.close(fd)
+        for fd, target in zip(moved, targets):
+            _os.dup2(fd, target)
+            _os.close(fd)
+
+        # same as what `TIOWrappedWriter.__init__` does
+        no_color = _os.environ.get("NO_COLOR", "") == "1"
+        for fobj in [stdout, stderr]:
+            fobj.ansi = not no_color and fobj.isatty()
+
+        send_int(conn, _os.getpid())
+
+        _sys.argv = [__prog__] + request["argv"]
+        main()
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 0 if exc.code is None else 1
+    except BaseException as exc:
+        _logging.error("while serving a `hoardy-web-client` request: %s", get_traceback(exc))
+    finally:
+        try:
+            send_int(conn, code)
+        except OSError:
+            pass
+    _os._exit(code)
+
+
+def daemon_reap_children() -> None:
+    while True:
+        try:
+            pid, _status = _os.waitpid(-1, _os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def cmd_daemon(cargs: _t.Any) -> None:
+    if cargs.socket is not None:
+        path = _os.path.expanduser(cargs.socket)
+    else:
+        path = daemon_socket_path()
+        try:
+            daemon_prepare_dir(path)
+        except PermissionError as exc:
+            raise CatastrophicFailure("%s", str(exc)) from exc
+
+    # make sure received file descriptors will never get numbers of `stdio`
+    for fd in range(3):
+        try:
+            _os.fstat(fd)
+        except OSError:
+            _os.open(_os.devnull, _os.O_RDWR)
+
+    # warm things up, so that forked children would not have to
+    from . import web as _web  # pylint: disable=unused-import
+
+    try:
+        from . import mitmproxy as _mitmproxy  # pylint: disable=unused-import
+    except ImportError:
+        pass
+
+    for value in default_expr_values.values():
+        compile_expr(value)
+
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+    else:
+        sock.close()
+        raise CatastrophicFailure("`%s` is already being served by another daemon", path)
+    sock.close()
+
+    try:
+        _os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    old_umask = _os.umask(0o177)
+    try:
+        sock.bind(path)
+    finally:
+        _os.umask(old_umask)
+    sock.listen(cargs.backlog)
+
+    if not cargs.quiet:
+        stderr.write_str_ln(gettext("Serving `hoardy-web-client` requests at `%s`") % (path,))
+        stderr.flush()
+
+    try:
+        while True:
+            daemon_reap_children()
+            with yes_signals():
+                conn, _addr = sock.accept()
+                with conn:
+                    stdout.flush()
+                    stderr.flush()
+                    if _os.fork() == 0:
+                        sock.close()
+                        daemon_child(conn)
+    finally:
+        sock.close()
+        try:
+            _os.unlink(path)
+        except FileNotFoundError:
+            pass
 
 
 def add_doc(fmt: argparse.BetterHelpFormatter) -> None:
@@ -3089,8 +5149,66 @@ def add_doc(fmt: argparse.BetterHelpFormatter) -> None:
     # fmt: on
 
 
-def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
-    _: _t.Callable[[str], str] = gettext
+class IgnoredParser:
+    """A stand-in for an `argparse` parser, argument group, or subparsers object of a
+    subcommand that was not requested.  Ignores everything done to it."""
+
+    def __getattr__(self, name: str) -> _t.Callable[..., "IgnoredParser"]:
+        return lambda *args, **kwargs: self
+
+
+class SelectiveSubparsers:
+    """A wrapper over `argparse` subparsers object which registers all subcommands, but only
+    returns real parsers for those that can be selected by the `level`-th word of `words`,
+    when `words` are given, and `IgnoredParser`s for the rest, thus allowing us to skip
+    building parsers for subcommands that will not be used."""
+
+    def __init__(self, subparsers: _t.Any, words: list[str] | None, level: int) -> None:
+        self.subparsers = subparsers
+        self.words = words
+        self.level = level
+
+    def add_parser(self, name: str, *, aliases: list[str] = [], **kwargs: _t.Any) -> _t.Any:
+        cmd = self.subparsers.add_parser(name, aliases=aliases, **kwargs)
+        words = self.words
+        if words is None or len(words) <= self.level:
+            return cmd
+        word = words[self.level]
+        if word == name or word in aliases:
+            return cmd
+        return IgnoredParser()
+
+
+def wants_help(args: list[str]) -> bool:
+    """Check if given command line arguments might request `--help`."""
+    for arg in args:
+        if arg == "--":
+            break
+        if arg == "--help" or arg.startswith("-") and not arg.startswith("--") and "h" in arg:
+            return True
+    return False
+
+
+def make_argparser(
+    real: bool = True, args: list[str] | None = None
+) -> argparse.BetterArgumentParser:
+    """Make an argument parser.
+
+    When `args` are given, the result will only be good enough to parse those: parsers of
+    subcommands not mentioned in `args` will be left empty, and, unless `args` request
+    `--help`, help strings will not be translated and generated examples will be skipped.
+    This makes the startup of short-lived invocations much faster.
+    """
+
+    # Global options take no values, so the first word of `args` names the subcommand, and
+    # the second one names the sub-subcommand of `import`.
+    words: list[str] | None = None
+    want_help = True
+    if args is not None:
+        words = [arg for arg in args if not arg.startswith("-")]
+        want_help = wants_help(args)
+
+    _: _t.Callable[[str], str] = gettext if want_help else identity
 
     # fmt: off
     parser = argparse.BetterArgumentParser(
@@ -3100,9 +5218,21 @@ def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
         + _("Glossary: a `reqres` (`Reqres` when a type/class) is an instance of a structure representing `HTTP` request+response pair with some additional metadata."),
         additional_sections=[add_doc],
         add_version=True,
+        # looking up our own version imports `importlib.metadata`, which is slow
+        version=None if args is None or "--version" in args else "",
+    )
+
+    agrp = parser.add_argument_group("profiling")
+    grp = agrp.add_mutually_exclusive_group()
+    grp.add_argument("--profile", "--stats", dest="profile", action="store_const", const="table",
+        help=_("count calls and wall time spent in each of the hot-path processing stages (directory walking, `gunzip`, `CBOR` decoding, `parse_url`, filtering, expression evaluation, scrubbing, URL remapping, atomic writes, `fsync`s) and print a table of the results to `stderr` at exit; `total` time of a stage includes the time of stages nested in it, `self` time does not"),
+    )
+    grp.add_argument("--profile-json", "--stats-json", dest="profile", action="store_const", const="json",
+        help=_("like `--profile`, but print the results as a single line of `JSON`"),
     )
+    parser.set_defaults(profile=None)
 
-    subparsers = parser.add_subparsers(title="subcommands")
+    subparsers = SelectiveSubparsers(parser.add_subparsers(title="subcommands"), words, 0)
 
     def add_errors(cmd: _t.Any) -> None:
         grp = cmd.add_argument_group("error handling")
@@ -3397,6 +5527,11 @@ def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
         )
         cmd.set_defaults(abridged=True)
 
+    def add_jobs(cmd: _t.Any, what: str, same: str, unit: str = "each input file being processed as a single unit") -> None:
+        cmd.add_argument("-j", "--jobs", metavar="INT", type=int, default=1,
+            help=_(f"""number of worker processes to use for {what}, with {unit}; {same} as with `--jobs 1`, but produced faster when there are many inputs and many CPU cores; requires `fork(2)`; default: `%(default)s`"""),
+        )
+
     def add_termsep(
         cmd: _t.Any,
         name: str,
@@ -3503,6 +5638,11 @@ def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
             help=_("read zero-terminated `PATH`s from stdin, these will be processed after all `PATH`s specified as command-line arguments"),
         )
 
+        if kind in ["mirror", "serve"]:
+            agrp.add_argument("--index", metavar="INDEX_PATH", type=str,
+                help=_(f"use an index file generated by `{__prog__} index` in addition to `PATH`s; entries of the index will be looked up on demand, instead of being loaded and kept in memory; filters are not applied to them, since they were applied when the index was generated"),
+            )
+
         if kind == "mirror":
             agrp.add_argument("--boring", metavar="PATH", action="append", type=str, default=[],
                 help=_("low-priority input `PATH`; boring `PATH`s will be processed after all `PATH`s specified as positional command-line arguments and those given via `--stdin0` and will not be queued as roots even when no `--root-*` options are specified"),
@@ -3519,6 +5659,10 @@ def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
             what = "this simply populates the `potentially` lists in the output in various ways"
         elif kind in ("organize", "import"):
             what = oscrub
+        elif kind == "export":
+            what = "this influences `mime` values of the generated `CDXJ` index"
+        elif kind == "index":
+            what = "this only influences filters which use `MIME` types"
         elif kind != "mirror":
             what = wscrub
         else:
@@ -3643,9 +5787,13 @@ def make_argparser(real: bool = True) -> argparse.BetterArgumentParser:
 - `query_ne_parts|take_prefix 3|qsl_to_path|abbrev 128` will print first 3 non-empty query parameters of the URL, abbreviated to 128 characters or less, minimally quoted to be used as a path;""",
                     2,
                 )
-                + "\n\nExample URL mappings:\n"
-                + "".join(
-                    [f"  - `{name}`:\n" + atom_example(name, 4) + "\n" for name in atom_test]
+                + (
+                    "\n\nExample URL mappings:\n"
+                    + "".join(
+                        [f"  - `{name}`:\n" + atom_example(name, 4) + "\n" for name in atom_test]
+                    )
+                    if want_help
+                    else ""
                 ),
             )
         else:
@@ -3827,14 +5975,20 @@ Esentially, this is a generalized `{__prog__} get`.
     add_pure(cmd)
     add_common(cmd, "stream", "stream-print reqres when")
     add_abridged(cmd)
-    cmd.add_argument("--format", metavar="FORMAT", choices=["py", "cbor", "json", "raw"], default="py",
+    cmd.add_argument("--format", metavar="FORMAT", choices=["py", "cbor", "json", "raw", "cbor-columns", "arrow"], default="py",
         help=_("""generate output in:
 - py: Pythonic Object Representation aka `repr`; default
 - cbor: Concise Binary Object Representation aka `CBOR` (RFC8949)
 - json: JavaScript Object Notation aka `JSON`; **binary data can't be represented, UNICODE replacement characters will be used**
 - raw: concatenate raw values; termination is controlled by `*-terminated` options
+- cbor-columns: a `CBOR` array of chunks of `--batch-size` results each, with results stored column-wise; columns of numbers and timestamps get stored as typed arrays (RFC8746); useful for feeding whole archives into data analysis tools
+- arrow: `Apache Arrow` IPC stream of record batches of `--batch-size` results each; requires `pyarrow` Python module
 """),
     )
+    cmd.add_argument("--batch-size", metavar="INT", type=int, default=4096,
+        help=_("for columnar output `FORMAT`s, number of results per chunk; default: `%(default)s`"),
+    )
+    add_jobs(cmd, "loading, filtering, evaluating, and encoding inputs", "the output will be exactly the same")
     add_expr(cmd, "stream")
     cmd.set_defaults(func=cmd_stream)
 
@@ -3919,8 +6073,7 @@ most useful when doing `{__prog__} organize --symlink --latest --output flat` or
                         f"  - `{name}`{' ' * (12 - len(name))}: `{value.replace('%', '%%')}`"
                         + ("; the default" if name == "default" else "")
                         + "\n"
-                        + output_example(name, 8)
-                        + "\n"
+                        + (output_example(name, 8) + "\n" if want_help else "")
                         for name, value in output_alias.items()
                     ]
                 )
@@ -4050,6 +6203,7 @@ E.g. `{__prog__} organize --move` will not overwrite any files, which is why the
     cmd.set_defaults(action="move")
 
     add_fileout(cmd, "organize")
+    add_jobs(cmd, "loading and filtering inputs, computing their `--output` values, and loading the existing files at the destinations", "the results will be exactly the same")
 
     cmd.set_defaults(func=cmd_organize)
 
@@ -4058,6 +6212,7 @@ E.g. `{__prog__} organize --move` will not overwrite any files, which is why the
         add_impure(cmd)
         add_common(cmd, "import", "import reqres when")
         add_fileout(cmd, "import")
+        add_jobs(cmd, "parsing, filtering, and `WRR`-encoding inputs, computing their `--output` values, and loading the existing files at the destinations", "when `--max-memory` is not hit, the results will be exactly the same", "each input file being split into chunks of reqres by the main process, and with the chunks in flight counting towards `--max-memory`")
 
     # import
     supcmd = subparsers.add_parser("import",
@@ -4065,7 +6220,7 @@ E.g. `{__prog__} organize --move` will not overwrite any files, which is why the
         description=_(f"""Use specified parser to parse data in each `INPUT` `PATH` into (a sequence of) reqres and then generate and place their `WRR` dumps into separate `WRR` files under `OUTPUT_DESTINATION` with paths derived from their metadata.
 In short, this is `{__prog__} organize --copy` for `INPUT` files that use different files formats."""),
     )
-    supsub = supcmd.add_subparsers(title="file formats")
+    supsub = SelectiveSubparsers(supcmd.add_subparsers(title="file formats"), words, 1)
 
     cmd = supsub.add_parser("wrrb", aliases=["bundle"],
         help=_("convert `WRR` bundles into separate `WRR` files"),
@@ -4081,6 +6236,110 @@ In short, this is `{__prog__} organize --copy` for `INPUT` files that use differ
     add_import_args(cmd)
     cmd.set_defaults(func=cmd_import_mitmproxy)
 
+    cmd = supsub.add_parser("warc",
+        help=_("convert `WARC` files into `WRR` files"),
+        description=_("""Parse each `INPUT` `PATH` as a `WARC` file (plain, `gzip`ped as a whole, or `gzip`ped record by record, i.e. a usual `.warc.gz`), pair its `request` and `response` records into a sequence of reqres, and then generate and place their `WRR` dumps into separate `WRR` files under `OUTPUT_DESTINATION` with paths derived from their metadata.
+
+`WARC` records are read one by one, so inputs can be arbitrarily large.
+Records get paired by `WARC-Concurrent-To`, or, when neither record has it, by `WARC-Target-URI`.
+Records of other types, including `revisit` records, are ignored.
+`Transfer-Encoding: chunked` and `gzip` and `deflate` `Content-Encoding`s of `HTTP` bodies get undone, similarly to what `import mitmproxy` does."""),
+    )
+    add_import_args(cmd)
+    cmd.set_defaults(func=cmd_import_warc)
+
+    cmd = supsub.add_parser("har",
+        help=_("convert `HAR` files (`HTTP` archives produced by browsers' developer tools) into `WRR` files"),
+        description=_("""Parse each `INPUT` `PATH` as a `HAR` file into a sequence of reqres, one for each of its `log.entries`, and then generate and place their `WRR` dumps into separate `WRR` files under `OUTPUT_DESTINATION` with paths derived from their metadata.
+
+`HAR` files are parsed incrementally, entry by entry, so inputs can be arbitrarily large.
+Entries with non-`HTTP` `URL`s, like `data:` `URL`s, are ignored.
+Responses with bodies the browser did not save get imported as incomplete responses.
+`Chromium`'s `_webSocketMessages` get imported as `WebSocket` frames."""),
+    )
+    add_import_args(cmd)
+    cmd.set_defaults(func=cmd_import_har)
+
+    # export
+    supcmd = subparsers.add_parser("export",
+        help=_("convert inputs into other `HTTP` archive formats"),
+        description=_("""Use specified printer to convert inputs into files of other `HTTP` archive formats."""),
+    )
+    supsub = SelectiveSubparsers(supcmd.add_subparsers(title="file formats"), words, 1)
+
+    cmd = supsub.add_parser("warc",
+        help=_("convert inputs into `WARC` files with a `CDXJ` index"),
+        description=_("""Convert inputs into a sequence of `.warc.gz` files with a `CDXJ` index, for use with other web archiving tools.
+
+Algorithm:
+
+- for each input `PATH`:
+  - load it;
+  - check this reqres satisfies given filters and skip it if it does not,
+  - generate its `response` (if it has one) and `request` `WARC` records and compress each of them into a separate `gzip` member;
+  - append those to `OUTPUT_DESTINATION/PREFIX-NNNNN.warc.gz`, starting a new file when the current one would grow larger than `--max-size`;
+  - remember a `CDXJ` index line pointing to its `response` record;
+- sort and write the index to `OUTPUT_DESTINATION/PREFIX.cdxj`.
+
+The end.
+
+Since `WRR` files store decoded `HTTP` bodies, `Content-Encoding`, `Transfer-Encoding`, and `Content-Length` `HTTP` headers get replaced with a `Content-Length` of the decoded body.
+`WebSocket` frames are not exported."""),
+    )
+    add_pure(cmd)
+    add_common(cmd, "export", "export reqres when")
+    add_jobs(cmd, "loading, filtering, `WARC`-encoding, and compressing inputs", "the outputs, except for randomly generated `WARC-Record-ID`s and `warcinfo` `WARC-Date`s, will be the same")
+
+    agrp = cmd.add_argument_group("file outputs")
+    agrp.add_argument("-t", "--to", dest="destination", metavar="OUTPUT_DESTINATION", type=str, required=True,
+        help=_("destination directory; required"),
+    )
+    agrp.add_argument("--prefix", metavar="PREFIX", type=str, default="hoardy-web",
+        help=_("file name prefix for generated files; default: `%(default)s`"),
+    )
+    agrp.add_argument("--max-size", metavar="INT", type=int, default=1024,
+        help=_("maximum size of a single `.warc.gz` file in MiB, a file can only be larger than this when a single reqres is; default: `%(default)s`"),
+    )
+    grp = agrp.add_mutually_exclusive_group()
+    grp.add_argument("--cdxj", dest="cdxj", action="store_true",
+        help=_("also generate a `CDXJ` index; default"),
+    )
+    grp.add_argument("--no-cdxj", dest="cdxj", action="store_false",
+        help=_("do not generate a `CDXJ` index"),
+    )
+    cmd.set_defaults(cdxj=True)
+    cmd.set_defaults(func=cmd_export_warc)
+
+    # index
+    cmd = subparsers.add_parser("index",
+        help=_("generate an index file for `mirror` and `serve`"),
+        description=_(f"""Generate a sorted, block-compressed, `CDXJ`-like index file mapping `URL`s and times to reqres stored in given inputs, for use with `{__prog__} mirror --index` and `{__prog__} serve --index`.
+
+Algorithm:
+
+- for each input `PATH`:
+  - load it;
+  - check this reqres satisfies given filters and skip it if it does not,
+  - remember an index line for it, keyed by `surt` (which see) of its `net_url` and by its `stime`, and pointing to the `WRR` file or the reqres number inside a `WRR` bundle it was loaded from;
+- sort all index lines and write them to `INDEX_PATH` in compressed blocks, followed by a table of the first keys of all blocks.
+
+The end.
+
+Then, `mirror` and `serve` can do a binary search over the `mmap`ed table and decompress only the blocks they need, which makes their startup essentially free and their memory consumption bounded by `--max-memory` for `serve`, and by the number of the actually used reqres for `mirror`.
+
+Since the index only points to input files, it has to be re-generated after those get moved, and reqres of files that were modified after the index was generated will fail to load.
+Only `WRR` files and bundles can be indexed."""),
+    )
+    add_pure(cmd)
+    add_common(cmd, "index", "index reqres when")
+    add_jobs(cmd, "loading, filtering, and indexing inputs", "the output will be exactly the same")
+
+    agrp = cmd.add_argument_group("file outputs")
+    agrp.add_argument("-t", "--to", dest="destination", metavar="INDEX_PATH", type=str, required=True,
+        help=_("path of the index file to generate; required"),
+    )
+    cmd.set_defaults(func=cmd_index)
+
     def add_index_memory(cmd: _t.Any) -> None:
         agrp = cmd.add_argument_group("caching")
         agrp.add_argument("--max-memory", metavar="INT", dest="max_memory", type=int, default=1024,
@@ -4274,6 +6533,16 @@ The end.
 
     add_fileout(cmd, "serve")
 
+    agrp = cmd.add_argument_group("archiving how")
+    grp = agrp.add_mutually_exclusive_group()
+    grp.add_argument("--spool", dest="spool", action="store_const", const=True,
+        help=_(f"""append each newly archived reqres to `ARCHIVE_DESTINATION/{spool_file_name}` write-ahead spool file and respond immediately, then compress it and write it under `ARCHIVE_DESTINATION` in the background; reqres left in the spool when the server stops abnormally will get processed when it is started again; reqres that fail to be processed {spool_max_attempts} times get moved to `ARCHIVE_DESTINATION/{spool_file_name}{spool_failed_suffix}`; default"""),
+    )
+    grp.add_argument("--no-spool", dest="spool", action="store_const", const=False,
+        help=_("compress and write each newly archived reqres under `ARCHIVE_DESTINATION` before responding"),
+    )
+    cmd.set_defaults(spool=True)
+
     agrp = cmd.add_argument_group("replay what")
     grp = agrp.add_mutually_exclusive_group()
     fiar = "for each URL, index and replay only"
@@ -4306,19 +6575,64 @@ The end.
     cmd.set_defaults(web_replay=True)
 
     cmd.set_defaults(func=cmd_serve)
+
+    # daemon
+    cmd = subparsers.add_parser("daemon",
+        help=_("run a daemon serving `hoardy-web-client` requests"),
+        description=_(f"""Listen on a `UNIX` socket and run `{__prog__}` subcommands requested by `hoardy-web-client`, which is a thin client taking the same command-line arguments as `{__prog__}` itself.
+
+This is useful when your scripts run `{__prog__} get`, `{__prog__} run`, or similar commands on lots of separate files, since, with a running daemon, `hoardy-web-client` will skip paying for `{__prog__}`'s startup on each invocation.
+
+Algorithm:
+
+- pre-load all the modules and pre-compile all the default expressions;
+- for each connection to the socket:
+  - fork a child process, which will:
+    - receive file descriptors, command-line arguments, current working directory, and environment variables from the client;
+    - run the requested command with those, writing its outputs directly into client's `stdout` and `stderr`;
+    - send the exit code back to the client.
+
+`hoardy-web-client` forwards only `pprint` (and its `print` and `inspect` aliases), `get`, `run` (and its `spawn` alias), `stream`, and `find` subcommands, passing `stdin`, `stdout`, `stderr`, and all file descriptors given to `get --expr-fd`.
+It runs everything else, and everything when the daemon is not running, locally, as if it were `{__prog__}`.
+So, it is safe to use it in place of `{__prog__}` in your scripts, regardless of whether you are running this daemon or not.
+
+Note that caches of the child processes do not survive the end of their requests, only the things the daemon warmed up itself get reused between requests."""),
+    )
+    cmd.add_argument("-q", "--quiet", action="store_true",
+        help=_("don't print optional informational messages to stderr"),
+    )
+    cmd.add_argument("--socket", metavar="PATH", type=str,
+        help=_("path of the `UNIX` socket to listen on; the default is the value of `HOARDY_WEB_SOCKET` environment variable, or `hoardy-web.socket` under `XDG_RUNTIME_DIR`, or `hoardy-web.socket` in a private `hoardy-web-<UID>` directory under the temporary directory; `hoardy-web-client` uses the same default, and refuses to use sockets not owned by the current user, accessible by other users, or served by processes of other users"),
+    )
+    cmd.add_argument("--backlog", metavar="INT", type=int, default=64,
+        help=_("maximum number of pending connections; default: `%(default)s`"),
+    )
+    cmd.set_defaults(func=cmd_daemon)
     # fmt: on
 
     return parser
 
 
+def run_cmd(cargs: _t.Any) -> None:
+    if cargs.profile is None:
+        cargs.func(cargs)
+        return
+
+    prof.enable()
+    try:
+        cargs.func(cargs)
+    finally:
+        prof.report(stderr, cargs.profile)
+
+
 def main() -> None:
     setup_result = setup_kisstdlib(__prog__, do_setup_delay_signals=False)
     setup_delay_signals(["SIGTERM", "SIGINT", "SIGBREAK", "SIGUSR1"])
     run_kisstdlib_main(
         setup_result,
         argparse.make_argparser_and_run,
-        make_argparser,
-        lambda cargs: cargs.func(cargs),
+        lambda real: make_argparser(real, _sys.argv[1:]),
+        run_cmd,
     )
 
 
@@ -0,0 +1,248 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A thin client for `hoardy-web daemon`.
+
+This module only imports things from the standard library, so that
+`hoardy-web-client` could start quickly.
+
+The protocol:
+
+- the client connects to the daemon's `UNIX` socket and sends a 4-byte big-endian
+  length of the request together with its `stdin`, `stdout`, `stderr`, and
+  `--expr-fd` file descriptors attached as `SCM_RIGHTS`, followed by the request
+  itself, which is a `JSON` object with `argv`, `cwd`, `env`, and `fds` fields,
+  the latter listing the numbers of attached file descriptors;
+- the daemon forks a child which installs those file descriptors under those
+  numbers, sends back its PID as a 4-byte big-endian integer, runs the command,
+  and then sends back its exit code in the same format.
+
+Since the child writes directly into the client's file descriptors, there is no
+copying of outputs involved.
+
+Since the request includes the whole environment of the client, the client
+refuses to talk to sockets not owned by the current user, accessible by other
+users, or served by processes running under other UIDs.  By default, the socket
+lives in a private, `0700`, directory.
+"""
+
+import json as _json
+import os as _os
+import signal as _signal
+import socket as _socket
+import stat as _stat
+import struct as _struct
+import sys as _sys
+import tempfile as _tempfile
+import typing as _t
+
+daemon_commands = frozenset(["pprint", "print", "inspect", "get", "run", "spawn", "stream", "find"])
+"""Subcommands `hoardy-web-client` will forward to the daemon. Everything else will be
+run locally."""
+
+daemon_int = _struct.Struct("!i")
+daemon_max_request = 16 * 1024 * 1024
+daemon_max_fds = 16
+
+
+def daemon_socket_path() -> str:
+    """Get the path of `hoardy-web daemon`'s socket: `HOARDY_WEB_SOCKET`, if set, or a
+    per-user default."""
+    res = _os.environ.get("HOARDY_WEB_SOCKET", None)
+    if res:
+        return res
+    runtime_dir = _os.environ.get("XDG_RUNTIME_DIR", None)
+    if runtime_dir:
+        return _os.path.join(runtime_dir, "hoardy-web.socket")
+    return _os.path.join(_tempfile.gettempdir(), f"hoardy-web-{_os.getuid()}", "hoardy-web.socket")
+
+
+def daemon_private(path: str, is_socket: bool) -> str | None:
+    """Check that `path` is a socket or a directory owned by the current user and not
+    accessible by anyone else. Return `None` if so, or a reason why not."""
+    try:
+        st = _os.lstat(path)
+    except OSError as exc:
+        return exc.strerror
+    if is_socket and not _stat.S_ISSOCK(st.st_mode):
+        return "not a socket"
+    if not is_socket and not _stat.S_ISDIR(st.st_mode):
+        return "not a directory"
+    if st.st_uid != _os.getuid():
+        return f"owned by UID {st.st_uid}"
+    if st.st_mode & 0o077 != 0:
+        return f"accessible by other users, mode {_stat.S_IMODE(st.st_mode):o}"
+    return None
+
+
+def daemon_prepare_dir(path: str) -> None:
+    """Make the directory of the default `path` of `hoardy-web daemon`'s socket, if it does
+    not exist, and make sure it is private. Raise `PermissionError` if it is not."""
+    dirname = _os.path.dirname(path)
+    try:
+        _os.mkdir(dirname, 0o700)
+    except FileExistsError:
+        pass
+    reason = daemon_private(dirname, False)
+    if reason is not None:
+        raise PermissionError(f"refusing to use `{dirname}`: {reason}")
+
+
+def daemon_peer_uid(sock: _socket.socket) -> int | None:
+    """Get the UID of the process on the other side of a connected `UNIX` socket, or
+    `None`, if this OS does not support `SO_PEERCRED`."""
+    if not hasattr(_socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(_socket.SOL_SOCKET, _socket.SO_PEERCRED, _struct.calcsize("3i"))
+    _pid, uid, _gid = _struct.unpack("3i", creds)
+    return uid  # type: ignore
+
+
+def recv_exactly(sock: _socket.socket, size: int) -> bytes:
+    """Receive exactly `size` bytes from `sock` or raise `EOFError`."""
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if len(chunk) == 0:
+            raise EOFError("unexpected EOF")
+        data += chunk
+    return data
+
+
+def recv_int(sock: _socket.socket) -> int:
+    res: int = daemon_int.unpack(recv_exactly(sock, daemon_int.size))[0]
+    return res
+
+
+def send_int(sock: _socket.socket, value: int) -> None:
+    sock.sendall(daemon_int.pack(value))
+
+
+def daemon_subcommand(argv: list[str]) -> str | None:
+    """Get the subcommand of `hoardy-web`'s command line. Global options take no values,
+    so this is simply the first non-option argument."""
+    for arg in argv:
+        if not arg.startswith("-"):
+            return arg
+    return None
+
+
+def daemon_fds(argv: list[str]) -> list[int] | None:
+    """Get the numbers of file descriptors `hoardy-web` with given command line arguments
+    can use: `stdio` and all `--expr-fd`s. Return `None` if there are too many, if
+    they can't be parsed, or if some of them are not open, so that the command would
+    be run locally instead, and thus would fail in the usual way, if it has to."""
+    res = [0, 1, 2]
+    prev = None
+    for arg in argv:
+        if arg == "--":
+            break
+        value = None
+        if prev == "--expr-fd":
+            value = arg
+        elif arg.startswith("--expr-fd="):
+            value = arg[10:]
+        prev = arg
+        if value is None:
+            continue
+        try:
+            fd = int(value)
+        except ValueError:
+            return None
+        if fd < 0:
+            return None
+        if fd not in res:
+            res.append(fd)
+    if len(res) > daemon_max_fds:
+        return None
+    for fd in res:
+        try:
+            _os.fstat(fd)
+        except OSError:
+            return None
+    return res
+
+
+def daemon_run(sock: _socket.socket, argv: list[str], targets: list[int]) -> int:
+    """Ask the daemon on the other side of `sock` to run `hoardy-web` with `argv` in the
+    current directory and environment and with our file descriptors `targets`, wait
+    for it to finish, and return its exit code."""
+    request = _json.dumps(
+        {"argv": argv, "cwd": _os.getcwd(), "env": dict(_os.environ), "fds": targets}
+    ).encode("ascii")
+
+    _socket.send_fds(sock, [daemon_int.pack(len(request))], targets)
+    sock.sendall(request)
+
+    try:
+        pid = recv_int(sock)
+    except EOFError:
+        _sys.stderr.write("hoardy-web-client: the daemon dropped the connection\n")
+        return 1
+
+    # the child is not in our process group, so forward terminal signals to it
+    def forward(signum: int, _frame: _t.Any) -> None:
+        try:
+            _os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    for name in ["SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT"]:
+        signum = getattr(_signal, name, None)
+        if signum is not None:
+            _signal.signal(signum, forward)
+
+    try:
+        return recv_int(sock)
+    except EOFError:
+        _sys.stderr.write("hoardy-web-client: the daemon's child died without an exit code\n")
+        return 1
+
+
+def client_main() -> None:
+    """Run `hoardy-web` with given command line arguments via `hoardy-web daemon`, if it is
+    running and the subcommand can be forwarded, or locally otherwise."""
+    argv = _sys.argv[1:]
+    targets = daemon_fds(argv)
+    if daemon_subcommand(argv) in daemon_commands and targets is not None:
+        path = daemon_socket_path()
+        sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+        else:
+            with sock:
+                # check everything before sending our environment and file descriptors
+                reason = daemon_private(path, True)
+                if reason is None:
+                    uid = daemon_peer_uid(sock)
+                    if uid is not None and uid != _os.getuid():
+                        reason = f"served by UID {uid}"
+                if reason is None:
+                    _sys.exit(daemon_run(sock, argv, targets))
+            _sys.stderr.write(
+                f"hoardy-web-client: refusing to use `{path}`: {reason}; running locally\n"
+            )
+
+    from .__main__ import main
+
+    main()
+
+
+if __name__ == "__main__":
+    client_main()
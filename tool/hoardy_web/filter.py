@@ -31,6 +31,27 @@ class ConditionUsage:
     matched: int
 
 
+# all `ConditionUsage`s ever made, in order of creation, so that usage
+# statistics collected by forked worker processes could be merged back
+condition_usages: list[ConditionUsage] = []
+
+
+def get_condition_usages() -> list[tuple[int, int]]:
+    return [(u.evaluated, u.matched) for u in condition_usages]
+
+
+def diff_condition_usages(
+    after: list[tuple[int, int]], before: list[tuple[int, int]]
+) -> list[tuple[int, int]]:
+    return [(ae - be, am - bm) for (ae, am), (be, bm) in zip(after, before)]
+
+
+def add_condition_usages(usages: list[tuple[int, int]]) -> None:
+    for u, (evaluated, matched) in zip(condition_usages, usages):
+        u.evaluated += evaluated
+        u.matched += matched
+
+
 ConditionsKeyType = _t.TypeVar("ConditionsKeyType")
 ConditionsValueType = _t.TypeVar("ConditionsValueType")
 Conditions = dict[ConditionsKeyType, tuple[ConditionsValueType, ConditionUsage]]
@@ -43,7 +64,9 @@ def mk_conditions(
 ) -> Conditions[ConditionsKeyType, ConditionsValueType]:
     res: Conditions[ConditionsKeyType, ConditionsValueType] = {}
     for v in attrs:
-        res[fk(v)] = fv(v), ConditionUsage(0, 0)
+        usage = ConditionUsage(0, 0)
+        condition_usages.append(usage)
+        res[fk(v)] = fv(v), usage
     return res
 
 
@@ -0,0 +1,419 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Loading of `HAR` files into `Reqres` structures."""
+
+import base64 as _base64
+import io as _io
+import json as _json
+import os as _os
+import re as _re
+import typing as _t
+
+from .wrr import *
+
+
+class HARParsingFailure(ParsingFailure):
+    pass
+
+
+# size of reads `JSONScanner` does
+har_read_size = 64 * 1024
+
+_ws_re = _re.compile(rb"[ \t\r\n]*")
+_string_special_re = _re.compile(rb'["\\]')
+_value_special_re = _re.compile(rb'[{}\[\]"]')
+_scalar_end_re = _re.compile(rb"[,:{}\[\]\s]")
+
+
+class JSONScanner:
+    """An incremental scanner of `JSON` data. It reads `fobj` chunk by chunk,
+    only keeping the value it currently scans in memory, and remembers the
+    offsets of scanned values in `fobj`.
+
+    It does not validate the values it scans, use `json.loads` on the results
+    of `read_value` for that.
+    """
+
+    def __init__(self, fobj: _io.BufferedReader) -> None:
+        self.fobj = fobj
+        # offset of `buf` in `fobj`
+        self.offset = fobj.tell()
+        self.buf = bytearray()
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        data = self.fobj.read(har_read_size)
+        if len(data) == 0:
+            return False
+        self.buf += data
+        return True
+
+    def _search(self, regex: _re.Pattern[bytes], pos: int) -> int:
+        while True:
+            m = regex.search(self.buf, pos)
+            if m is not None:
+                return m.start()
+            pos = max(pos, len(self.buf))
+            if not self._fill():
+                raise HARParsingFailure("unexpected EOF")
+
+    def _skip_string(self, pos: int) -> int:
+        while True:
+            i = self._search(_string_special_re, pos)
+            if self.buf[i] == 0x22:  # "
+                return i + 1
+            # skip the escaped character
+            pos = i + 2
+
+    def peek(self) -> int:
+        """Skip whitespace and return the next byte, or `-1` on EOF."""
+        pos = self.pos
+        if pos > 0:
+            del self.buf[:pos]
+            self.offset += pos
+            self.pos = 0
+        while True:
+            m = _ws_re.match(self.buf, self.pos)
+            assert m is not None
+            self.pos = m.end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return -1
+
+    def expect(self, c: bytes) -> None:
+        if self.peek() != c[0]:
+            raise HARParsingFailure(
+                "expected `%s` at offset %d", c.decode(), self.offset + self.pos
+            )
+        self.pos += 1
+
+    def scan_value(self) -> tuple[int, int]:
+        """Skip the next value and return its start and end indices in `buf`."""
+        c = self.peek()
+        if c == -1:
+            raise HARParsingFailure("unexpected EOF")
+        start = self.pos
+        if c == 0x22:  # "
+            end = self._skip_string(start + 1)
+        elif c in (0x7B, 0x5B):  # { [
+            depth = 0
+            pos = start
+            while True:
+                i = self._search(_value_special_re, pos)
+                b = self.buf[i]
+                if b == 0x22:
+                    pos = self._skip_string(i + 1)
+                    continue
+                pos = i + 1
+                if b in (0x7B, 0x5B):
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        break
+            end = pos
+        else:
+            pos = start
+            while True:
+                m = _scalar_end_re.search(self.buf, pos)
+                if m is not None:
+                    end = m.start()
+                    break
+                pos = len(self.buf)
+                if not self._fill():
+                    end = pos
+                    break
+            if end == start:
+                raise HARParsingFailure("unexpected `%s` at offset %d", chr(c), self.offset + start)
+        self.pos = end
+        return start, end
+
+    def read_value(self) -> tuple[int, bytes]:
+        """Read raw data of the next value, return its offset in `fobj` and the data."""
+        start, end = self.scan_value()
+        return self.offset + start, bytes(self.buf[start:end])
+
+    def _items(self, opening: bytes, closing: bytes) -> _t.Iterator[None]:
+        self.expect(opening)
+        if self.peek() == closing[0]:
+            self.pos += 1
+            return
+        while True:
+            yield None
+            c = self.peek()
+            if c == 0x2C:  # ,
+                self.pos += 1
+            elif c == closing[0]:
+                self.pos += 1
+                return
+            else:
+                raise HARParsingFailure(
+                    "expected `,` or `%s` at offset %d", closing.decode(), self.offset + self.pos
+                )
+
+    def object_keys(self) -> _t.Iterator[str]:
+        """Scan an object, yielding its keys. The caller must scan the
+        corresponding values."""
+        for _ in self._items(b"{", b"}"):
+            if self.peek() != 0x22:
+                raise HARParsingFailure("expected a string at offset %d", self.offset + self.pos)
+            _, data = self.read_value()
+            self.expect(b":")
+            yield _json.loads(data)
+
+    def array_items(self) -> _t.Iterator[None]:
+        """Scan an array, yielding once for each element. The caller must scan
+        the elements."""
+        yield from self._items(b"[", b"]")
+
+
+def har_entries(fobj: _io.BufferedReader) -> _t.Iterator[tuple[int, bytes]]:
+    """Produce offsets and raw `JSON` data of `log.entries` of a `HAR` file."""
+    if fobj.peek(3)[:3] == b"\xef\xbb\xbf":
+        # skip UTF-8 BOM
+        fobj.read(3)
+    scanner = JSONScanner(fobj)
+    for key in scanner.object_keys():
+        if key != "log":
+            scanner.scan_value()
+            continue
+        for lkey in scanner.object_keys():
+            if lkey != "entries":
+                scanner.scan_value()
+                continue
+            for _ in scanner.array_items():
+                yield scanner.read_value()
+    if scanner.peek() != -1:
+        raise HARParsingFailure("expected EOF at offset %d", scanner.offset + scanner.pos)
+
+
+def _hd(x: _t.Any) -> Headers:
+    res = []
+    for h in x:
+        name = h["name"]
+        if name.startswith(":"):
+            # skip `HTTP/2` pseudo-headers
+            continue
+        res.append((name, h["value"].encode("utf-8")))
+    return res
+
+
+def _protocol(x: str) -> str:
+    p = x.strip().upper()
+    if p in ("H2", "HTTP/2"):
+        return "HTTP/2.0"
+    if p in ("H3", "HTTP/3"):
+        return "HTTP/3.0"
+    if p.startswith("HTTP/"):
+        return p
+    return ""
+
+
+def _ms(x: _t.Any) -> Decimal:
+    return Decimal(str(x)) / 1000
+
+
+def har_entry_reqres(entry: _t.Any) -> Reqres | None:
+    """Make a `Reqres` from a parsed `HAR` entry. Returns `None` for entries
+    that are not `HTTP` requests."""
+    rq = entry["request"]
+    url = rq["url"]
+    if not url.startswith(("http:", "https:", "ws:", "wss:")):
+        # `data:`, `blob:`, and similar
+        return None
+
+    qtime = parse_iso_Timestamp(entry["startedDateTime"])
+    protocol = _protocol(rq.get("httpVersion", ""))
+
+    post = rq.get("postData", None)
+    if post is not None and post.get("text", None) is not None:
+        rq_body = post["text"].encode("utf-8")
+        rq_complete = True
+    else:
+        rq_body = b""
+        rq_complete = post is None and rq.get("bodySize", 0) <= 0
+
+    request = Request(qtime, rq["method"].upper(), parse_url(url), _hd(rq["headers"]), rq_complete, rq_body)  # fmt: skip
+
+    ftime = Timestamp(qtime + _ms(max(0, entry.get("time", 0))))
+
+    response = None
+    rs = entry.get("response", None)
+    if rs is not None and rs.get("status", 0) > 0:
+        timings = entry.get("timings", {})
+        wait = sum(timings.get(k, -1) for k in ("blocked", "dns", "connect", "send", "wait") if timings.get(k, -1) > 0)  # fmt: skip
+        stime = Timestamp(qtime + _ms(wait))
+
+        rs_headers = _hd(rs["headers"])
+        content = rs.get("content", {})
+        text = content.get("text", None)
+        if text is not None:
+            if content.get("encoding", None) == "base64":
+                rs_body = _base64.b64decode(text)
+            else:
+                rs_body = text.encode("utf-8")
+            rs_complete = True
+            # `text` is always decoded
+            rs_headers = [(k, v) for k, v in rs_headers if k.lower() != "content-encoding"]
+        else:
+            rs_body = b""
+            rs_complete = content.get("size", 0) == 0
+
+        if protocol == "":
+            protocol = _protocol(rs.get("httpVersion", ""))
+
+        response = Response(stime, rs["status"], rs.get("statusText", ""), rs_headers, rs_complete, rs_body)  # fmt: skip
+
+    wsstream = None
+    messages = entry.get("_webSocketMessages", None)
+    if messages is not None:
+        wsframes = []
+        for msg in messages:
+            opcode = msg.get("opcode", 1)
+            data = msg["data"]
+            content = _base64.b64decode(data) if opcode == 2 else data.encode("utf-8")
+            wsframes.append(
+                WebSocketFrame(
+                    Timestamp(Decimal(str(msg["time"]))), msg["type"] == "send", opcode, content
+                )
+            )
+        wsstream = WebSocketFrames.from_list(wsframes)
+
+    if protocol == "":
+        protocol = "HTTP/1.1"
+
+    return Reqres(1, "hoardy-har/1", protocol, request, response, ftime, {}, wsstream)
+
+
+def har_loads(data: bytes) -> Reqres | None:
+    try:
+        return har_entry_reqres(_json.loads(data))
+    except ParsingFailure:
+        raise
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise HARParsingFailure("failed to parse `HAR` entry") from exc
+
+
+def har_load_offsets(fobj: _io.BufferedReader, offsets: tuple[int, ...]) -> Reqres:
+    """Load a `Reqres` from the `HAR` entry at a given offset."""
+    fobj.seek(offsets[0])
+    _, data = JSONScanner(fobj).read_value()
+    reqres = har_loads(data)
+    if reqres is None:
+        raise HARParsingFailure("no reqres at offset %d", offsets[0])
+    return reqres
+
+
+def rrexprs_har_load_fileobj(
+    fobj: _io.BufferedReader, source: DeferredSourceType
+) -> _t.Iterator[ReqresExpr[SeekableStreamElementSource[DeferredSourceType]]]:
+    n = 0
+    for offset, data in har_entries(fobj):
+        reqres = har_loads(data)
+        if reqres is None:
+            continue
+        yield ReqresExpr(
+            SeekableStreamElementSource(source, n, (offset,), har_load_offsets), reqres
+        )
+        n += 1
+
+
+def har_split_fileobj(fobj: _io.BufferedReader) -> _t.Iterator[bytes]:
+    """Split a `HAR` file into raw `JSON` data of separate entries, without
+    parsing them. Use `har_loads` to parse the results."""
+    for _, data in har_entries(fobj):
+        yield data
+
+
+def rrexprs_har_loadf(
+    path: str | bytes,
+) -> _t.Iterator[ReqresExpr[SeekableStreamElementSource[FileSource]]]:
+    with open(path, "rb") as f:
+        in_stat = _os.fstat(f.fileno())
+        yield from rrexprs_har_load_fileobj(f, make_FileSource(path, in_stat))
+
+
+def test_har_load() -> None:
+    har = {
+        "log": {
+            "version": "1.2",
+            "pages": [{"title": 'tricky ] } " [ {'}],
+            "entries": [
+                {
+                    "startedDateTime": "2024-01-02T03:04:05.123Z",
+                    "time": 10,
+                    "request": {
+                        "method": "post",
+                        "url": "https://example.org/?q=%7B",
+                        "httpVersion": "h2",
+                        "headers": [{"name": ":path", "value": "/"}, {"name": "A", "value": "b"}],
+                        "postData": {"text": "data"},
+                    },
+                    "response": {
+                        "status": 200,
+                        "statusText": "",
+                        "headers": [{"name": "Content-Encoding", "value": "br"}],
+                        "content": {"size": 3, "text": "AAEC", "encoding": "base64"},
+                    },
+                    "timings": {"blocked": -1, "wait": 5, "receive": 5},
+                },
+                {
+                    "startedDateTime": "2024-01-02T03:04:06Z",
+                    "request": {"method": "GET", "url": "data:,", "headers": []},
+                },
+                {
+                    "startedDateTime": "2024-01-02T03:04:07+01:00",
+                    "request": {"method": "GET", "url": "https://example.org/}", "headers": []},
+                    "response": {"status": 0, "headers": [], "content": {}},
+                },
+            ],
+        }
+    }
+
+    for data in [
+        _json.dumps(har).encode("utf-8"),
+        b"\xef\xbb\xbf" + _json.dumps(har, indent=2).encode("utf-8"),
+    ]:
+        rrexprs = list(rrexprs_har_load_fileobj(BytesIOReader(data), BytesSource(data)))
+        assert len(rrexprs) == 2
+
+        first, second = [rrexpr.reqres for rrexpr in rrexprs]
+        assert first.protocol == "HTTP/2.0"
+        assert first.request.started_at == Timestamp("1704164645.123")
+        assert first.request.method == "POST" and first.request.body == b"data"
+        assert first.request.headers == [("A", b"b")]
+        assert first.response is not None and first.response.body == b"\x00\x01\x02"
+        assert first.response.started_at == Timestamp("1704164645.128")
+        assert first.response.headers == []
+        assert first.finished_at == Timestamp("1704164645.133")
+        assert second.request.url.raw_url == "https://example.org/}"
+        assert second.request.started_at == Timestamp(1704161047)
+        assert second.response is None
+
+        for rrexpr in rrexprs:
+            reqres = rrexpr.reqres
+            rrexpr.unload()
+            assert rrexpr.reqres == reqres
+
+        reqreses = [har_loads(x) for x in har_split_fileobj(BytesIOReader(data))]
+        assert reqreses[1] is None
+        assert [wrr_dumps(x) for x in reqreses if x is not None] == [
+            wrr_dumps(first),
+            wrr_dumps(second),
+        ]
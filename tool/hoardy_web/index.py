@@ -0,0 +1,277 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Sorted, block-compressed, `CDXJ`-like index files.
+
+An index file is a sequence of lines of the form `<key> <time> <JSON>`, sorted
+as bytes, split into blocks of about `index_block_size` bytes, each of which is
+compressed into a separate `gzip` member.  So, `zcat` can be used to look
+inside.  The blocks are followed by the first keys of all blocks, a table of
+`index_block` records pointing to blocks and their first keys, and an
+`index_trailer`.
+
+Looking up a key is a binary search over the table, followed by a
+decompression of one or a few blocks.  Since the whole file is `mmap`ed and
+only a bounded number of decompressed blocks is kept in memory, opening an
+index file is essentially free, regardless of its size.
+"""
+
+import bisect as _bisect
+import calendar as _calendar
+import collections as _c
+import decimal as _dec
+import gzip as _gzip
+import io as _io
+import json as _json
+import mmap as _mmap
+import struct as _struct
+import time as _time
+import typing as _t
+
+from kisstdlib.failure import *
+from kisstdlib.parsing import ParsingFailure
+from kisstdlib.time import Timestamp
+
+index_magic = b"HWIDX001"
+# magic, number of lines, number of blocks, offset of the block table
+index_trailer = _struct.Struct("!8sQQQ")
+# block offset, block size, first key offset, first key size
+index_block = _struct.Struct("!QIQI")
+index_block_size = 64 * 1024
+# number of decompressed blocks `IndexFile` keeps in memory
+index_cache_blocks = 32
+
+index_time_format = "%Y%m%d%H%M%S"
+
+
+class IndexParsingFailure(ParsingFailure):
+    pass
+
+
+def index_time(stime: Timestamp) -> str:
+    """Format `stime` as a fixed-width string, so that the lexicographic order of
+    the results would match the order of the inputs."""
+    return stime.format(index_time_format, precision=9, utc=True)
+
+
+def parse_index_time(value: str) -> Timestamp:
+    try:
+        whole = _calendar.timegm(_time.strptime(value[:14], index_time_format))
+        frac = _dec.Decimal("0." + value[15:]) if len(value) > 15 else 0
+    except (ValueError, _dec.InvalidOperation) as exc:
+        raise IndexParsingFailure("malformed time `%s`", value) from exc
+    return Timestamp(whole + frac)
+
+
+def index_line(key: str, stime: Timestamp, fields: dict[str, _t.Any]) -> bytes:
+    """Make an index line, `key` must not contain spaces or newlines."""
+    return f"{key} {index_time(stime)} {_json.dumps(fields)}".encode("utf-8")
+
+
+IndexEntry = tuple[str, Timestamp, dict[str, _t.Any]]
+
+
+def parse_index_line(line: bytes) -> IndexEntry:
+    try:
+        key, stime, fields = line.split(b" ", 2)
+        return key.decode("utf-8"), parse_index_time(stime.decode("ascii")), _json.loads(fields)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise IndexParsingFailure("malformed index line `%s`", line) from exc
+
+
+def index_dump(fobj: _io.BufferedWriter, lines: _t.Iterable[bytes]) -> int:
+    """Write sorted index `lines` into `fobj`. Returns the number of written lines."""
+    blocks: list[tuple[int, int, bytes]] = []
+    pos = 0
+    buf: list[bytes] = []
+    buf_size = 0
+    num = 0
+    prev: bytes | None = None
+
+    def flush() -> None:
+        nonlocal pos, buf, buf_size
+        data = _gzip.compress(b"".join(buf), compresslevel=9, mtime=0)
+        fobj.write(data)
+        blocks.append((pos, len(data), buf[0].split(b" ", 1)[0]))
+        pos += len(data)
+        buf = []
+        buf_size = 0
+
+    for line in lines:
+        if prev is not None and line < prev:
+            raise ValueError("index lines are not sorted")
+        prev = line
+        buf.append(line + b"\n")
+        buf_size += len(line) + 1
+        num += 1
+        if buf_size >= index_block_size:
+            flush()
+    if len(buf) > 0:
+        flush()
+
+    key_pos = pos
+    for _offset, _size, key in blocks:
+        fobj.write(key)
+        pos += len(key)
+    table_pos = pos
+    for offset, size, key in blocks:
+        fobj.write(index_block.pack(offset, size, key_pos, len(key)))
+        key_pos += len(key)
+    fobj.write(index_trailer.pack(index_magic, num, len(blocks), table_pos))
+    return num
+
+
+class IndexFile:
+    """A read-only, `mmap`ed index file produced by `index_dump`."""
+
+    def __init__(self, path: str | bytes) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self.mm = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+            except ValueError as exc:
+                # an empty file
+                raise IndexParsingFailure("`%s` is not an index file", path) from exc
+
+        mm = self.mm
+        size = len(mm)
+        tsize = index_trailer.size
+        if size < tsize:
+            mm.close()
+            raise IndexParsingFailure("`%s` is not an index file", path)
+        magic, self.size, self.num_blocks, self.table_pos = index_trailer.unpack_from(
+            mm, size - tsize
+        )
+        if (
+            magic != index_magic
+            or self.table_pos + self.num_blocks * index_block.size != size - tsize
+        ):
+            mm.close()
+            raise IndexParsingFailure("`%s` is not an index file", path)
+
+        self.cache: _c.OrderedDict[int, list[bytes]] = _c.OrderedDict()
+
+    def close(self) -> None:
+        self.cache.clear()
+        self.mm.close()
+
+    def __len__(self) -> int:
+        return self.size  # type: ignore
+
+    def _block_info(self, n: int) -> tuple[int, int, int, int]:
+        return index_block.unpack_from(self.mm, self.table_pos + n * index_block.size)
+
+    def _first_key(self, n: int) -> bytes:
+        _offset, _size, key_offset, key_size = self._block_info(n)
+        return self.mm[key_offset : key_offset + key_size]
+
+    def _read_block(self, n: int) -> list[bytes]:
+        offset, size, _key_offset, _key_size = self._block_info(n)
+        try:
+            data = _gzip.decompress(self.mm[offset : offset + size])
+        except (OSError, EOFError) as exc:
+            raise IndexParsingFailure("`%s`: block %d is corrupted", self.path, n) from exc
+        return data.split(b"\n")[:-1]
+
+    def _get_block(self, n: int) -> list[bytes]:
+        cache = self.cache
+        try:
+            res = cache[n]
+        except KeyError:
+            res = cache[n] = self._read_block(n)
+            if len(cache) > index_cache_blocks:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(n)
+        return res
+
+    def lookup(self, key: str) -> _t.Iterator[IndexEntry]:
+        """Iterate over all entries with a given `key`, in order of ascending time."""
+        bkey = key.encode("utf-8")
+
+        # find the first block with the first key not smaller than `bkey`
+        lo, hi = 0, self.num_blocks
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._first_key(mid) < bkey:
+                lo = mid + 1
+            else:
+                hi = mid
+        # the previous block can have some matching lines at its end
+        n = max(lo - 1, 0)
+
+        prefix = bkey + b" "
+        while n < self.num_blocks:
+            lines = self._get_block(n)
+            for i in range(_bisect.bisect_left(lines, prefix), len(lines)):
+                line = lines[i]
+                if not line.startswith(prefix):
+                    return
+                yield parse_index_line(line)
+            n += 1
+
+    def __iter__(self) -> _t.Iterator[IndexEntry]:
+        """Iterate over all entries, in order."""
+        for n in range(self.num_blocks):
+            # do not pollute the cache
+            for line in self._read_block(n):
+                yield parse_index_line(line)
+
+
+def test_IndexFile() -> None:
+    import os
+    import tempfile
+
+    entries = []
+    for i in range(5000):
+        for t in range(i % 3 + 1):
+            key = f"org,example)/page{i:05}"
+            stime = Timestamp(1700000000 + t) + _dec.Decimal("0.125")
+            entries.append(index_line(key, stime, {"n": i, "t": t}))
+    entries.sort()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.idx")
+        with open(path, "wb") as f:
+            assert index_dump(f, entries) == len(entries)
+
+        index = IndexFile(path)
+        try:
+            assert len(index) == len(entries)
+            assert index.num_blocks > 2
+            assert [index_line(*e) for e in index] == entries
+
+            for i in [0, 1, 2, 1234, 4999]:
+                res = list(index.lookup(f"org,example)/page{i:05}"))
+                assert [e[2] for e in res] == [{"n": i, "t": t} for t in range(i % 3 + 1)]
+                assert res[0][1] == Timestamp(1700000000) + _dec.Decimal("0.125")
+
+            assert list(index.lookup("org,example)/page")) == []
+            assert list(index.lookup("org,example)/page050000")) == []
+            assert list(index.lookup("a")) == []
+            assert list(index.lookup("z")) == []
+        finally:
+            index.close()
+
+        with open(path, "r+b") as f:
+            f.truncate(100)
+        try:
+            IndexFile(path)
+        except IndexParsingFailure:
+            pass
+        else:
+            assert False
@@ -0,0 +1,247 @@
+# Copyright (c) 2023-2024 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Link types, `URL` remapping, and scrubbing options, without the `HTML` and `CSS` parsing
+machinery of `web`."""
+
+import collections.abc as _cabc
+import dataclasses as _dc
+import enum as _enum
+import typing as _t
+
+from .tracking import *
+from .wire import *
+from .mime import *
+
+URLType: _t.TypeAlias = str
+
+
+def is_data_url(url: URLType) -> bool:
+    return url.startswith("data:")
+
+
+def is_script_url(url: URLType) -> bool:
+    return url.startswith("javascript:")
+
+
+def is_page_url(url: URLType) -> bool:
+    return url.startswith("http:") or url.startswith("https:")
+
+
+class LinkType(_enum.Enum):
+    JUMP = 0
+    ACTION = 1
+    REQ = 2
+
+
+def get_void_url(link_type: LinkType) -> str:
+    if link_type == LinkType.REQ:
+        return "data:text/plain,%20"
+    return "javascript:void(0)"
+
+
+RefType = tuple[LinkType, list[URLType]]  # tuple[LinkType, possible mime types]
+URLRemapperType = _t.Callable[[URLType, LinkType, list[str] | None], URLType | None]
+
+web_url_schemes = frozenset(["http", "https", "ftp", "ftps"])
+noop_url_schemes = frozenset(["mailto", "irc", "magnet"])
+
+
+def remappable_web(scheme: str) -> bool | None:
+    if scheme in noop_url_schemes:
+        return None
+    if scheme in web_url_schemes:
+        return True
+    return False
+
+
+def cached_remap_url(
+    document_net_url: URLType,
+    remap_url: _t.Callable[[URLType, ParsedURL, LinkType, list[str] | None], URLType | None],
+    *,
+    remappable: _t.Callable[[str], bool | None] = remappable_web,
+    paranoid: bool = False,
+    handle_warning: _t.Callable[..., None] | None = None,
+) -> URLRemapperType:
+    remap_cache: dict[tuple[URLType, bool], URLType | None] = {}
+
+    def our_remap_url(
+        url: URLType, link_type: LinkType, fallbacks: list[str] | None
+    ) -> URLType | None:
+        is_requisite = link_type == LinkType.REQ
+        cache_id = (url, is_requisite)
+        try:
+            return remap_cache[cache_id]
+        except KeyError:
+            pass
+
+        res: URLType | None
+        try:
+            purl = parse_url(url)
+        except URLParsingError:
+            if handle_warning is not None:
+                handle_warning("malformed URL `%s`", url)
+            if is_requisite or paranoid:
+                remap_cache[cache_id] = res = get_void_url(link_type)
+                return res
+            remap_cache[cache_id] = url
+            return url
+
+        cr = remappable(purl.scheme)
+        if cr is None:
+            remap_cache[cache_id] = url
+            return url
+        if not cr:
+            if is_requisite:
+                if handle_warning is not None:
+                    handle_warning("malformed requisite URL `%s`", url)
+                remap_cache[cache_id] = res = get_void_url(link_type)
+                return res
+            if handle_warning is not None:
+                handle_warning("not remapping `%s`", url)
+            remap_cache[cache_id] = url
+            return url
+
+        net_url = purl.net_url
+
+        if net_url == document_net_url:
+            # this is a reference to an inter-page `id`
+            remap_cache[cache_id] = res = purl.ofm + purl.fragment
+            return res
+
+        with prof.stage("remap"):
+            res = remap_url(net_url, purl, link_type, fallbacks)
+        remap_cache[cache_id] = res
+        return res
+
+    return our_remap_url
+
+
+verbatim_http_headers = frozenset(["default-style", "x-ua-compatible"])
+interpreted_http_headers = frozenset(["content-security-policy", "link", "refresh"])
+
+
+class RemapType(_enum.IntEnum):
+    ID = 0
+    VOID = 1
+    OPEN = 2
+    CLOSED = 3
+    FALLBACK = 4
+
+
+@_dc.dataclass
+class ScrubbingOptions:
+    jumps: RemapType = _dc.field(default=RemapType.OPEN)
+    actions: RemapType = _dc.field(default=RemapType.FALLBACK)
+    reqs: RemapType = _dc.field(default=RemapType.FALLBACK)
+    styles: bool = _dc.field(default=True)
+    scripts: bool = _dc.field(default=False)
+    iepragmas: bool = _dc.field(default=False)
+    iframes: bool = _dc.field(default=True)
+    prefetches: bool = _dc.field(default=False)
+    tracking: bool = _dc.field(default=False)
+    navigations: bool = _dc.field(default=False)
+    inline_headers: bool = _dc.field(default=True)
+    inline_fallback_icon: bool | None = _dc.field(default=None)
+    interpret_noscript: bool = _dc.field(default=True)
+    unknown: bool = _dc.field(default=True)
+
+    verbose: bool = _dc.field(default=True)
+    whitespace: bool = _dc.field(default=True)
+    optional_tags: bool = _dc.field(default=True)
+    indent: bool = _dc.field(default=False)
+    indent_step: int = _dc.field(default=2)
+    debug: bool = _dc.field(default=False)
+
+
+ScrubbingReferenceOptions = ["jumps", "actions", "reqs"]
+ScrubbingDynamicOpts = ["styles", "scripts", "iepragmas", "iframes", "prefetches", "tracking", "navigations"]  # fmt: skip
+
+jump_ref: RefType = (LinkType.JUMP, page_mime)
+action_ref: RefType = (LinkType.ACTION, page_mime)
+
+preload_link_rels = frozenset(
+    [
+        "dns-prefetch",
+        "preconnect",
+        "prefetch",
+        "prerender",
+        "preload",
+        "modulepreload",
+    ]
+)
+
+stylesheet_link_rels = frozenset(
+    [
+        "stylesheet",
+        "ie-optimized-stylesheet-desk",
+        "ie-optimized-onevent-stylesheet",
+        "kinetic-stylesheet",
+    ]
+)
+
+icon_link_rels = frozenset(
+    [
+        "icon",
+        "shortcut",
+        "apple-touch-icon",
+        "apple-touch-startup-image",
+        "apple-touch-icon-precomposed",
+        "fluid-icon",
+        "mask-icon",
+        "rich-pin-icon",
+    ]
+)
+
+link_rel_ref_type: dict[str, RefType]
+link_rel_ref_type = {}
+
+
+def populate_link_rel_ref_type() -> None:
+    for e in stylesheet_link_rels:
+        link_rel_ref_type[e] = (LinkType.REQ, stylesheet_mime)
+    for e in icon_link_rels:
+        link_rel_ref_type[e] = (LinkType.REQ, image_mime)
+
+
+populate_link_rel_ref_type()
+
+
+def link_rels_of(
+    rels: str,
+    *,
+    whitelist: _cabc.Collection[str] | None = None,
+    blacklist: _cabc.Collection[str] | None = None,
+) -> list[str]:
+    rparts = map(lambda x: x.lower(), word_re.findall(rels))
+    return [
+        r
+        for r in rparts
+        if (whitelist is None or r in whitelist) and (blacklist is None or r not in blacklist)
+    ]
+
+
+def rel_ref_type_of(link_rels: list[str]) -> RefType:
+    slink_type = None
+    cts = []
+    for rel in link_rels:
+        link_type_, cts_ = link_rel_ref_type.get(rel, jump_ref)
+        if slink_type is None or link_type_ == LinkType.REQ:
+            slink_type = link_type_
+        cts += [e for e in cts_ if e not in cts]
+    link_type = slink_type if slink_type is not None else LinkType.JUMP
+    return link_type, cts
@@ -36,6 +36,8 @@ from kisstdlib.failure import *
 from kisstdlib.base import compose_pipe
 from kisstdlib.string_ext import abbrev
 
+from .tracking import *
+
 LinstEnv = _t.Any  # TODO: _t.Callable[[str], _t.Any]
 LinstFunc = _t.Callable[[_t.Any, LinstEnv], _t.Any]
 LinstAtom = tuple[list[type], _t.Callable[..., LinstFunc]]
@@ -53,19 +55,44 @@ def linst_unknown_atom(name: str) -> LinstAtom:
     raise LinstUnknownAtomError("unknown atom `%s`", name)
 
 
-_compile_cache: dict[str, LinstFunc] = {}
+LinstPrefix = tuple[tuple[str, ...], ...]
+LinstPipe = list[tuple[LinstPrefix, LinstFunc]]
+
+# compiled atoms depend on `lookup`, so these are indexed by `(lookup, expr)`
+LinstCacheKey = tuple[_t.Callable[[str], LinstAtom], str]
+_compile_cache: dict[LinstCacheKey, LinstFunc] = {}
+_compile_pipe_cache: dict[LinstCacheKey, LinstPipe] = {}
 
 
 def _linst_compile(expr: str, lookup: _t.Callable[[str], LinstAtom]) -> LinstFunc:
     if expr == "":
         return lambda e, v: v
 
+    key = (lookup, expr)
     try:
-        return _compile_cache[expr]
+        return _compile_cache[key]
     except KeyError:
         pass
 
-    pipe = []
+    pipe = _linst_compile_pipe(expr, lookup)
+    _compile_cache[key] = res = compose_pipe([func for _prefix, func in pipe])
+    return res
+
+
+def _linst_compile_pipe(expr: str, lookup: _t.Callable[[str], LinstAtom]) -> LinstPipe:
+    """Compile `expr` into a list of its steps, each paired with a normalized
+    representation of the prefix of `expr` ending with that step."""
+    if expr == "":
+        return []
+
+    key = (lookup, expr)
+    try:
+        return _compile_pipe_cache[key]
+    except KeyError:
+        pass
+
+    pipe: LinstPipe = []
+    prefix: LinstPrefix = ()
     for single in expr.split("|"):
         cmd, *args = _shlex.split(single)
         argtypes, func = lookup(cmd)
@@ -87,13 +114,14 @@ def _linst_compile(expr: str, lookup: _t.Callable[[str], LinstAtom]) -> LinstFun
                 args_.append(argtypes[i](args[i]))
 
         func_ = func(*args_)
-        pipe.append(func_)
+        prefix += (tuple([cmd] + args),)
+        pipe.append((prefix, func_))
 
     if len(pipe) == 0:
         raise LinstCompileError("empty pipe")
 
-    _compile_cache[expr] = res = compose_pipe(pipe)
-    return res
+    _compile_pipe_cache[key] = pipe
+    return pipe
 
 
 def linst_compile(
@@ -105,6 +133,68 @@ def linst_compile(
         raise exc.elaborate("while compiling `%s`", expr)
 
 
+class LinstDAG:
+    """A list of expressions compiled together, so that `eval_all` evaluates
+    their common prefixes only once.
+
+    E.g., evaluating `response.body|eb|scrub response +all_refs` and
+    `response.body|eb|sha256` together will only evaluate
+    `response.body|eb` once.
+    """
+
+    def __init__(self, exprs: list[str], pipes: list[LinstPipe]) -> None:
+        self.exprs = exprs
+
+        uses: dict[LinstPrefix, int] = {}
+        for pipe in pipes:
+            for prefix, _func in pipe:
+                uses[prefix] = uses.get(prefix, 0) + 1
+
+        # only remember results of shared prefixes
+        self.steps: list[list[tuple[LinstPrefix | None, LinstFunc]]] = [
+            [(prefix if uses[prefix] > 1 else None, func) for prefix, func in pipe]
+            for pipe in pipes
+        ]
+
+    def eval_all(self, env: LinstEnv, v: _t.Any = None) -> list[_t.Any]:
+        return list(self.iter_all(env, v))
+
+    def iter_all(self, env: LinstEnv, v: _t.Any = None) -> _t.Iterator[_t.Any]:
+        """Like `eval_all`, but yield each value as soon as it is evaluated."""
+        memo: dict[LinstPrefix, _t.Any] = {}
+        for expr, steps in zip(self.exprs, self.steps):
+            x = v
+            start = 0
+            # continue from the longest already evaluated prefix
+            for i in range(len(steps) - 1, -1, -1):
+                prefix = steps[i][0]
+                if prefix is not None and prefix in memo:
+                    x = memo[prefix]
+                    start = i + 1
+                    break
+
+            try:
+                for prefix, func in steps[start:]:
+                    x = func(x, env)
+                    if prefix is not None:
+                        memo[prefix] = x
+            except CatastrophicFailure as exc:
+                raise exc.elaborate("while evaluating `%s`", expr)
+            yield x
+
+
+def linst_compile_dag(
+    exprs: list[str], lookup: _t.Callable[[str], LinstAtom] = linst_unknown_atom
+) -> LinstDAG:
+    pipes = []
+    for expr in exprs:
+        try:
+            pipes.append(_linst_compile_pipe(expr, lookup))
+        except Failure as exc:
+            raise exc.elaborate("while compiling `%s`", expr)
+    return LinstDAG(exprs, pipes)
+
+
 def linst_cast(typ: type, arg: _t.Any) -> _t.Any:
     atyp = type(arg)
     if atyp == typ:
@@ -349,7 +439,16 @@ class LinstEvaluator:
         return self.get_value(name)
 
     def eval_func(self, func: LinstFunc, v: _t.Any = None) -> _t.Any:
-        return func(v, self)  # TODO: func(v, self.get_value)
+        with prof.stage("linst_eval"):
+            return func(v, self)  # TODO: func(v, self.get_value)
+
+    def iter_dag(self, dag: LinstDAG, v: _t.Any = None) -> _t.Iterator[_t.Any]:
+        """Like `eval_dag`, but yield each value as soon as it is evaluated."""
+        return prof.wrap_iter("linst_eval", dag.iter_all(self, v))
+
+    def eval_dag(self, dag: LinstDAG, v: _t.Any = None) -> list[_t.Any]:
+        with prof.stage("linst_eval"):
+            return dag.eval_all(self, v)
 
     def eval_expr(self, expr: str) -> _t.Any:
         try:
@@ -358,7 +457,7 @@ class LinstEvaluator:
             pass
 
         func = linst_compile(expr, self.lookup)
-        return func(None, self)  # TODO: func(None, self.get_value)
+        return self.eval_func(func)
 
     def __getitem__(self, expr: str) -> _t.Any:
         # this is used in `format_string % self` expressions
@@ -366,3 +465,42 @@ class LinstEvaluator:
         if res is None:
             raise Failure("expression `%s` evaluated to `None`", expr)
         return res
+
+
+def test_LinstDAG() -> None:
+    calls: list[str] = []
+
+    def counted(name: str, func: _t.Callable[[_t.Any], _t.Any]) -> LinstAtom:
+        def atom() -> LinstFunc:
+            def sub(v: _t.Any, _e: LinstEnv) -> _t.Any:
+                calls.append(name)
+                return func(v)
+
+            return sub
+
+        return [], atom
+
+    atoms = {
+        "one": counted("one", lambda v: 1),
+        "inc": counted("inc", lambda v: v + 1),
+        "neg": counted("neg", lambda v: -v),
+    }
+    exprs = ["one|inc|inc", "one | inc|neg", "one|inc|inc", "", "one|neg"]
+    # a fresh `lookup`, so that nothing compiled by previous runs of this test
+    # would be reused
+    dag = linst_compile_dag(exprs, lambda name: atoms[name])
+    env = LinstEvaluator()
+
+    assert env.eval_dag(dag) == [3, -2, 3, None, -1]
+    assert calls == ["one", "inc", "inc", "neg", "neg"]
+
+    calls.clear()
+    assert env.eval_dag(dag) == [3, -2, 3, None, -1]
+    assert calls == ["one", "inc", "inc", "neg", "neg"]
+
+    # compiled pipes are not shared between different `lookup`s
+    other = dict(atoms, one=counted("ten", lambda v: 10))
+    calls.clear()
+    other_dag = linst_compile_dag(exprs, lambda name: other[name])
+    assert env.eval_dag(other_dag) == [12, -11, 12, None, -10]
+    assert calls == ["ten", "inc", "inc", "neg", "neg"]
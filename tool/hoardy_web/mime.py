@@ -21,12 +21,15 @@
   usually does more than mimesniff requires.
 """
 
+import codecs as _codecs
 import enum as _enum
+import functools as _ft
 import re as _re
 import typing as _t
 
 from kisstdlib.failure import *
 
+from .tracking import prof
 from .wire import parse_content_type_header
 
 canonical_mime_of: dict[str, str]
@@ -247,6 +250,23 @@ def normalize_content_type(header: str) -> tuple[list[str] | None, str, str | No
     return None, ct, charset, []
 
 
+content_type_cache_size = 1024
+
+_normalize_content_type_lru = _ft.lru_cache(maxsize=content_type_cache_size)(normalize_content_type)
+
+
+def _normalize_content_type_counters() -> dict[str, int]:
+    info = _normalize_content_type_lru.cache_info()
+    return {
+        "content_type_cache_hits": info.hits,
+        "content_type_cache_misses": info.misses,
+        "content_type_cache_size": info.currsize,
+    }
+
+
+prof.add_counters(_normalize_content_type_counters)
+
+
 _pre = r"(?:\ufeff|\s)*"
 html_sniff_re = _re.compile(
     rf"^{_pre}(?:<\?xml(?:\s[^>]*)?>\s*)?(?:<!--[\s\S]*-->\s*)*<(?:!doctype\shtml|html|head|meta|link|title|body|frameset|frame|iframe|style|font|script|header|nav|article|section|footer|table|thead|tbody|tfoot|th|tr|td|h1|h2|h3|h4|h5|div|p|span|b|strong|i|em|strike|br|a)(?:\s[^>]*)?>",
@@ -259,89 +279,91 @@ svg_sniff_re = _re.compile(
 xml_sniff_re = _re.compile(rf"^{_pre}<\?xml(?:\s[^>]*)?>", flags=_re.IGNORECASE)
 
 
-def sniff_mime_type(
-    data: str | bytes, charset: str | None
-) -> tuple[list[str], str, str | None, list[str]]:
-    """Sniff MIME type value from given file content or file content prefix,
-    returns (possible kinds, MIME type, extensions, charset | None).
-    """
+SniffResult = tuple[list[str], str, str | None, list[str]]
+
+# (prefix, offset, infix, MIME type), checked in order; see `sniff_mime_type`
+sniff_magic_certain = [
+    # image
+    (b"GIF87a", 0, b"", "image/gif"),
+    (b"GIF89a", 0, b"", "image/gif"),
+    (b"RIFF", 8, b"WEBPVP", "image/webp"),
+    (b"\x89PNG\x0d\x0a\x1a\x0a", 0, b"", "image/png"),
+    (b"\xff\xd8\xff", 6, b"JFIF", "image/jpeg"),
+    # audio and video
+    (b"FORM", 8, b"AIFF", "audio/aiff"),
+    (b"ID3", 0, b"", "audio/mpeg"),
+    (b"OggS\x00", 0, b"", "application/ogg"),
+    (b"MThd\x00\x00\x00\x06", 0, b"", "audio/midi"),
+    (b"RIFF", 8, b"WAVE", "audio/wave"),
+    (b"RIFF", 8, b"AVI ", "video/avi"),
+    # fonts
+    (b"ttcf", 0, b"", "font/collection"),
+    (b"OTTO", 0, b"", "font/otf"),
+    (b"wOFF", 0, b"", "font/woff"),
+    (b"wOF2", 0, b"", "font/woff2"),
+    # documents
+    (b"%PDF-", 0, b"", "application/pdf"),
+    (b"%!PS-Adobe-", 0, b"", "application/postscript"),
+    # archives
+    (b"\x1f\x8b\x08", 0, b"", "application/gzip"),
+    (b"PK\x03\x04", 0, b"", "application/zip"),
+    (b"Rar \x1a\x07\x00", 0, b"", "application/rar"),
+]
 
-    ct: str | None = None
-    if isinstance(data, bytes):
-        # image
-        if data.startswith(b"GIF87a") and data.startswith(b"GIF89a"):
-            ct = "image/gif"
-        elif data.startswith(b"RIFF") and data[8:14] == b"WEBPVP":
-            ct = "image/webp"
-        elif data.startswith(b"\x89PNG\x0d\x0a\x1a\x0a"):
-            ct = "image/png"
-        elif data.startswith(b"\xff\xd8\xff") and data[6:10] == b"JFIF":
-            ct = "image/jpeg"
-        # audio and video
-        elif data.startswith(b"FORM") and data[8:12] == b"AIFF":
-            ct = "audio/aiff"
-        elif data.startswith(b"ID3"):
-            ct = "audio/mpeg"
-        elif data.startswith(b"OggS\x00"):
-            ct = "application/ogg"
-        elif data.startswith(b"MThd\x00\x00\x00\x06"):
-            ct = "audio/midi"
-        elif data.startswith(b"RIFF") and data[8:12] == b"WAVE":
-            ct = "audio/wave"
-        elif data.startswith(b"RIFF") and data[8:12] == b"AVI ":
-            ct = "video/avi"
-        # fonts
-        elif data.startswith(b"ttcf"):
-            ct = "font/collection"
-        elif data.startswith(b"OTTO"):
-            ct = "font/otf"
-        elif data.startswith(b"wOFF"):
-            ct = "font/woff"
-        elif data.startswith(b"wOF2"):
-            ct = "font/woff2"
-        # documents
-        elif data.startswith(b"%PDF-"):
-            ct = "application/pdf"
-        elif data.startswith(b"%!PS-Adobe-"):
-            ct = "application/postscript"
-        # archives
-        elif data.startswith(b"\x1f\x8b\x08"):
-            ct = "application/gzip"
-        elif data.startswith(b"PK\x03\x04"):
-            ct = "application/zip"
-        elif data.startswith(b"Rar \x1a\x07\x00"):
-            ct = "application/rar"
-
-        if ct is not None:
-            kinds, exts = mime_info_of[ct]
-            return kinds, ct, None, exts
-
-        # now, less certain ones
-        # image
-        if data.startswith(b"\x00\x00\x01\x00") or data.startswith(b"\x00\x00\x02\x00"):
-            ct = "image/x-icon"
-        elif data.startswith(b"BM"):
-            ct = "image/bmp"
-        elif data.startswith(b"\xff\xd8\xff"):
-            ct = "image/jpeg"
-        # font
-        elif data.startswith(b"\x00\x01\x00\x00"):
-            ct = "font/ttf"
-        elif data[34:36] == b"LP":
-            ct = canonicalize_mime("application/vnd.ms-fontobject")
-
-        if ct is not None:
+# less certain ones
+sniff_magic_uncertain = [
+    # image
+    (b"\x00\x00\x01\x00", 0, b"", "image/x-icon"),
+    (b"\x00\x00\x02\x00", 0, b"", "image/x-icon"),
+    (b"BM", 0, b"", "image/bmp"),
+    (b"\xff\xd8\xff", 0, b"", "image/jpeg"),
+    # font
+    (b"\x00\x01\x00\x00", 0, b"", "font/ttf"),
+]
+
+SniffMagic = tuple[bytes, int, bytes, SniffResult]
+
+# first byte -> list of `SniffMagic`s starting with it
+sniff_magic_of_byte: list[list[SniffMagic]]
+sniff_magic_of_byte = [[] for _ in range(256)]
+
+
+def populate_sniff_magic_of_byte() -> None:
+    # since all certain ones come before all uncertain ones in each list, and all
+    # elements of each list share the first byte, checking a single list is
+    # equivalent to checking all of them in order
+    for magics, extra_kinds in [(sniff_magic_certain, []), (sniff_magic_uncertain, ["unknown"])]:
+        for prefix, offset, infix, ct in magics:
             kinds, exts = mime_info_of[ct]
-            return kinds + ["unknown"], ct, None, exts
+            res = (kinds + extra_kinds, ct, None, exts)
+            sniff_magic_of_byte[prefix[0]].append((prefix, offset, infix, res))
+
+
+populate_sniff_magic_of_byte()
+
+_eot_kinds, _eot_exts = mime_info_of[canonicalize_mime("application/vnd.ms-fontobject")]
+_eot_res = (
+    _eot_kinds + ["unknown"],
+    canonicalize_mime("application/vnd.ms-fontobject"),
+    None,
+    _eot_exts,
+)
+
+sniff_prefix_size = 16384
+"""Only this many first bytes of the data are ever looked at by `sniff_mime_type`.
+`mimesniff` only looks at the first 1445 bytes, we are a bit more generous."""
+
+sniff_cache_size = 1024
 
-        # TODO mp3 and mp4 headers
 
+def _sniff_text_uncached(data: str | bytes, truncated: bool, charset: str | None) -> SniffResult:
+    if isinstance(data, bytes):
         # text
         if charset is not None:
             # try the specified charset first
             try:
-                data = data.decode(charset)
-            except UnicodeDecodeError:
+                data = _decode_prefix(data, charset, truncated)
+            except UnicodeError:
                 # it's a lie
                 charset = None
 
@@ -359,8 +381,8 @@ def sniff_mime_type(
             if charset is not None:
                 # try decoding the final time
                 try:
-                    data = data.decode(charset)
-                except UnicodeDecodeError:
+                    data = _decode_prefix(data, charset, truncated)
+                except UnicodeError:
                     return _unknown_binary()
             else:
                 if data.find(b"\x00") != -1:
@@ -373,8 +395,8 @@ def sniff_mime_type(
                 # TODO: detect pure ascii and UTF-8 without replacements here too?
 
     assert isinstance(data, str)
-    assert ct is None
 
+    ct: str | None = None
     if html_sniff_re.match(data):
         ct = "text/html"
     elif svg_sniff_re.match(data):
@@ -389,9 +411,70 @@ def sniff_mime_type(
     return any_text, "text/plain", charset, any_text_ext
 
 
+def _decode_prefix(data: bytes, charset: str, truncated: bool) -> str:
+    """Decode `data` using `charset`. If `data` is a `truncated` prefix, ignore a
+    multi-byte sequence cut at its end."""
+    if truncated:
+        try:
+            return _codecs.getincrementaldecoder(charset)().decode(data, False)
+        except UnicodeDecodeError:
+            raise
+        except UnicodeError:
+            # incremental "utf-16" and "utf-32" decoders insist on a BOM,
+            # while `bytes.decode` assumes native byte order without one
+            pass
+    return data.decode(charset)
+
+
+_sniff_text_lru = _ft.lru_cache(maxsize=sniff_cache_size)(_sniff_text_uncached)
+
+
+def _sniff_counters() -> dict[str, int]:
+    info = _sniff_text_lru.cache_info()
+    return {
+        "sniff_cache_hits": info.hits,
+        "sniff_cache_misses": info.misses,
+        "sniff_cache_size": info.currsize,
+    }
+
+
+prof.add_counters(_sniff_counters)
+
+
+def sniff_mime_type(data: str | bytes, charset: str | None) -> SniffResult:
+    """Sniff MIME type value from given file content or file content prefix,
+    returns (possible kinds, MIME type, charset | None, extensions).
+
+    Binary formats are detected by looking up their magic numbers by the first
+    byte of `data`. Everything else only looks at the first `sniff_prefix_size`
+    bytes of `data` and gets memoized by that prefix and `charset`.
+
+    The returned lists are shared and must not be modified.
+    """
+
+    truncated = len(data) > sniff_prefix_size
+    if truncated:
+        data = data[:sniff_prefix_size]
+
+    if isinstance(data, bytes):
+        if len(data) > 0:
+            for prefix, offset, infix, res in sniff_magic_of_byte[data[0]]:
+                if data.startswith(prefix) and (
+                    len(infix) == 0 or data[offset : offset + len(infix)] == infix
+                ):
+                    return res
+
+        if data[34:36] == b"LP":
+            return _eot_res
+
+        # TODO mp3 and mp4 headers
+
+    return _sniff_text_lru(data, truncated, charset)
+
+
 def test_sniff_mime_type() -> None:
-    def check(want_mime: str, data: bytes | str) -> None:
-        _kinds, mime, _charset, _extensions = sniff_mime_type(data, None)
+    def check(want_mime: str, data: bytes | str, charset: str | None = None) -> None:
+        _kinds, mime, _charset, _extensions = sniff_mime_type(data, charset)
         if mime != want_mime:
             raise CatastrophicFailure(
                 "while evaluating `sniff_mime_type` on `%s`: expected `%s`, got `%s`",
@@ -514,6 +597,10 @@ def test_sniff_mime_type() -> None:
 
     check("text/plain", "example")
 
+    # larger than `sniff_prefix_size` and without a BOM
+    utf16 = ("<!DOCTYPE html><html>" + " " * sniff_prefix_size).encode("utf-16")[2:]
+    check("text/html", utf16, "utf-16")
+
 
 class SniffContentType(_enum.Enum):
     NONE = 0
@@ -536,7 +623,7 @@ def discern_content_type(
     if ct is None:
         kinds, mime, charset, extensions = None, "application/octet-stream", None, []
     else:
-        kinds, mime, charset, extensions = normalize_content_type(ct)
+        kinds, mime, charset, extensions = _normalize_content_type_lru(ct)
 
     if kinds is None:
         kinds, mime, charset, extensions = sniff_mime_type(data, charset)
@@ -557,7 +644,7 @@ def discern_content_type(
             # sniffed version wins
             mime = mime_
             # but union possible extensions
-            extensions += [e for e in extensions_ if e not in extensions]
+            extensions = extensions + [e for e in extensions_ if e not in extensions]
         # sniffed charset always wins
         # TODO: make them a list too?
         charset = charset_ or charset
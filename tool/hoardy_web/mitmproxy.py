@@ -22,6 +22,7 @@ import os as _os
 import struct as _struct
 import typing as _t
 
+import mitmproxy.exceptions
 import mitmproxy.io
 import mitmproxy.http
 import mitmproxy.websocket
@@ -29,6 +30,20 @@ import mitmproxy.websocket
 from .wrr import *
 
 
+class MitmproxyParsingFailure(ParsingFailure):
+    pass
+
+
+# exceptions `mitmproxy`'s reader raises when given malformed data
+mitmproxy_errors = (
+    mitmproxy.exceptions.FlowReadException,
+    KeyError,
+    TypeError,
+    ValueError,
+    AttributeError,
+)
+
+
 def _hd(x: _t.Any) -> Headers:
     res = []
     for k, v in x.fields:
@@ -109,7 +124,7 @@ def mitmproxy_load_flow(flow: mitmproxy.http.HTTPFlow) -> Reqres | None:
     if flow.websocket is not None:
         ws = flow.websocket
 
-        wsstream = []
+        wsframes = []
         for msg in ws.messages:
             if isinstance(msg.content, bytes):
                 content = msg.content
@@ -119,7 +134,7 @@ def mitmproxy_load_flow(flow: mitmproxy.http.HTTPFlow) -> Reqres | None:
                 content = msg.content.encode("utf-8")
             else:
                 assert False
-            wsstream.append(
+            wsframes.append(
                 WebSocketFrame(Timestamp(msg.timestamp), msg.from_client, int(msg.type), content)
             )
 
@@ -129,7 +144,7 @@ def mitmproxy_load_flow(flow: mitmproxy.http.HTTPFlow) -> Reqres | None:
             assert ws.close_reason is not None
 
             # reconstruct the CLOSE frame
-            wsstream.append(
+            wsframes.append(
                 WebSocketFrame(
                     Timestamp(ws.timestamp_end),
                     ws.closed_by_client,
@@ -138,6 +153,8 @@ def mitmproxy_load_flow(flow: mitmproxy.http.HTTPFlow) -> Reqres | None:
                 )
             )
 
+        wsstream = WebSocketFrames.from_list(wsframes)
+
     return Reqres(
         1, "hoardy-mitmproxy/1", rq.http_version, request, response, finished_at, {}, wsstream
     )
@@ -146,11 +163,17 @@ def mitmproxy_load_flow(flow: mitmproxy.http.HTTPFlow) -> Reqres | None:
 def rrexprs_mitmproxy_load_fileobj(
     fobj: _io.BufferedReader, source: DeferredSourceType
 ) -> _t.Iterator[ReqresExpr[StreamElementSource[DeferredSourceType]]]:
-    stream = mitmproxy.io.FlowReader(fobj).stream()
+    stream = iter(mitmproxy.io.FlowReader(fobj).stream())
     n = 0
-    for flow in stream:
+    while True:
+        try:
+            flow = next(stream, None)
+        except mitmproxy_errors as exc:
+            raise MitmproxyParsingFailure("failed to parse `mitmproxy` flow") from exc
+        if flow is None:
+            break
         if not isinstance(flow, mitmproxy.http.HTTPFlow):
-            raise ValueError("unknown type", type(flow))
+            raise MitmproxyParsingFailure("unknown flow type `%s`", type(flow).__name__)
 
         reqres = mitmproxy_load_flow(flow)
         if reqres is None:
@@ -159,6 +182,42 @@ def rrexprs_mitmproxy_load_fileobj(
         n += 1
 
 
+def mitmproxy_split_fileobj(fobj: _io.BufferedReader) -> _t.Iterator[bytes]:
+    """Split a `mitmproxy` stream dump into raw `tnetstring`s of separate
+    flows, without parsing them. Use `mitmproxy_loads_flow` to parse the
+    results."""
+    while True:
+        prefix = b""
+        while True:
+            c = fobj.read(1)
+            if c == b":":
+                break
+            if c == b"" and prefix == b"":
+                return
+            if not c.isdigit() or len(prefix) >= 12:
+                raise MitmproxyParsingFailure("`tnetstring` parsing failure: invalid length prefix")
+            prefix += c
+
+        size = int(prefix) + 1
+        data = fobj.read(size)
+        if len(data) != size:
+            raise MitmproxyParsingFailure("`tnetstring` parsing failure: unexpected EOF")
+        yield prefix + b":" + data
+
+
+def mitmproxy_loads_flow(data: bytes) -> Reqres | None:
+    try:
+        flows = list(mitmproxy.io.FlowReader(_io.BytesIO(data)).stream())
+    except mitmproxy_errors as exc:
+        raise MitmproxyParsingFailure("failed to parse `mitmproxy` flow") from exc
+    if len(flows) != 1:
+        raise MitmproxyParsingFailure("expected a single `mitmproxy` flow, got %d", len(flows))
+    flow = flows[0]
+    if not isinstance(flow, mitmproxy.http.HTTPFlow):
+        raise MitmproxyParsingFailure("unknown flow type `%s`", type(flow).__name__)
+    return mitmproxy_load_flow(flow)
+
+
 def rrexprs_mitmproxy_loadf(
     path: str | bytes,
 ) -> _t.Iterator[ReqresExpr[StreamElementSource[FileSource]]]:
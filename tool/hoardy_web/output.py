@@ -17,8 +17,10 @@
 
 """Pretty-printing of `Reqres` structures and computed `--expr` values."""
 
+import array as _array
 import io as _io
 import json as _json
+import sys as _sys
 import typing as _t
 
 import cbor2 as _cbor2
@@ -34,6 +36,8 @@ from .wrr import *
 def plainify(obj: _t.Any) -> _t.Any:
     if isinstance(obj, Timestamp):
         return float(obj)
+    if isinstance(obj, WebSocketFrames):
+        return list(obj)
     if hasattr(obj, "__dataclass_fields__"):
         res = {}
         for k in obj.__dataclass_fields__:
@@ -51,6 +55,65 @@ def abridge_anystr(value: _t.AnyStr, length: int, ln: bool) -> tuple[bool, _t.An
     return False, value
 
 
+def _quote_anystr(value: str | bytes, squote: bool) -> str:
+    res = repr(value)
+    if isinstance(value, bytes):
+        quote, res = res[1], res[2:-1]
+    else:
+        quote, res = res[0], res[1:-1]
+    if squote and quote == '"':
+        # `repr` of a part of `value` chose a different quote
+        res = res.replace("'", "\\'")
+    return res
+
+
+def quote_anystr(
+    value: str | bytes, encoding: str, length: int | None, ln: bool
+) -> tuple[bool, bytes]:
+    """Quote `value` using its `repr`, with the quotes stripped, and then encode
+    the result with `encoding` and abridge it to `length`, if set.
+
+    The result is the same as what `abridge_anystr` would do on the full quoted
+    value, except this only quotes the parts of `value` that will be kept.
+    """
+    if isinstance(value, bytes):
+        squote = not (b"'" in value and b'"' not in value)
+    else:
+        squote = not ("'" in value and '"' not in value)
+
+    if length is None:
+        return False, _quote_anystr(value, squote).encode(encoding)
+    if len(value) <= length:
+        return abridge_anystr(_quote_anystr(value, squote).encode(encoding), length, ln)
+
+    # each element of `value` quotes into at least one byte, so the result
+    # will be abridged
+    hlength = length // 2
+    head = _quote_anystr(value[:hlength], squote).encode(encoding)[:hlength]
+    tail = _quote_anystr(value[-hlength:], squote).encode(encoding)[-hlength:]
+    return True, head + (b"\n...\n" if ln else b" ... ") + tail
+
+
+def test_quote_anystr() -> None:
+    values: list[str | bytes] = [
+        b"",
+        b"abc",
+        b"'" * 2000,
+        b"\x00'" * 1000,
+        b"'\"" * 1000,
+        b"a" * 1000 + b"'" + b"\n" * 1000,
+        "\u0444'" * 1000,
+        '\u0444"' + "\x00" * 1000,
+    ]
+    for value in values:
+        for length in [None, 16, 1024]:
+            expected = repr(value)[2 if isinstance(value, bytes) else 1 : -1].encode("utf-8")
+            expected_abridged = False
+            if length is not None:
+                expected_abridged, expected = abridge_anystr(expected, length, True)
+            assert quote_anystr(value, "utf-8", length, True) == (expected_abridged, expected)
+
+
 def wrr_pprint(
     fobj: TIOWrappedWriter,
     reqres: Reqres,
@@ -149,18 +212,14 @@ def wrr_pprint(
                 data = cbordump
                 unfinished = False
 
+        abridged = abridge
         if "text" not in kinds:
-            if isinstance(data, bytes):
-                data = repr(data)[2:-1].encode(fobj.encoding)
-            else:
-                data = repr(data)[1:-1].encode(fobj.encoding)
+            abridged, data = quote_anystr(data, fobj.encoding, 1024 if abridge else None, True)
             status = ", quoted"
         else:
             status = ", raw"
-
-        abridged = abridge
-        if abridge:
-            abridged, data = abridge_anystr(data, 1024, True)  # type: ignore
+            if abridge:
+                abridged, data = abridge_anystr(data, 1024, True)  # type: ignore
         if abridged:
             status += ", abridged"
 
@@ -206,6 +265,9 @@ StreamEncoderElem = _t.TypeVar("StreamEncoderElem")
 
 
 class StreamEncoder:
+    # can `encode` and `emit_encoded` be used instead of `emit`
+    encodes_records = True
+
     def __init__(self, fobj: TIOWrappedWriter, abridged: bool) -> None:
         self.fobj = fobj
         self.abridged = abridged
@@ -214,8 +276,19 @@ class StreamEncoder:
     def start(self) -> None:
         self.not_first = False
 
+    def encode(self, names: list[str], values: list[_t.Any]) -> bytes:
+        """Encode a single record for `emit_encoded`.
+
+        The result does not depend on previously emitted records, so this
+        can be run in a separate process.
+        """
+        return b""
+
+    def emit_encoded(self, data: bytes) -> None:
+        self.fobj.write_bytes(data)
+
     def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
-        pass
+        self.emit_encoded(self.encode(names, values))
 
     def finish(self) -> None:
         self.fobj.flush()
@@ -235,6 +308,13 @@ class CBORStreamEncoder(StreamEncoder):
 
     @staticmethod
     def encode_cbor(enc: _cbor2.CBOREncoder, obj: _t.Any) -> None:
+        if isinstance(obj, WebSocketFrames):
+            # decode and encode frames one at a time
+            enc.write(b"\x9f")  # start indefinite-length array
+            for frame in obj:
+                enc.encode(frame)
+            enc.write(b"\xff")  # break symbol
+            return
         enc.encode(plainify(obj))
 
     @staticmethod
@@ -251,10 +331,10 @@ class CBORStreamEncoder(StreamEncoder):
         super().start()
         self.fobj.write_bytes(b"\x9f")  # start indefinite-length array
 
-    def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
+    def encode(self, names: list[str], values: list[_t.Any]) -> bytes:
         try:
             self.encoder.encode(values)
-            self.fobj.write_bytes(self.encoder.fp.getvalue())  # type: ignore
+            return self.encoder.fp.getvalue()  # type: ignore
         finally:
             self.encoder.fp = _io.BytesIO()
 
@@ -280,6 +360,10 @@ class PyStreamEncoder(StreamEncoder):
             default=self.encode_py,
         )
 
+        self.encoder.write_str_ln(",")
+        self.separator = self.encoder.fobj.getvalue()
+        self.encoder.fobj = _io.BytesIO()
+
     @staticmethod
     def encode_py(enc: PyReprEncoder, obj: _t.Any) -> None:
         if isinstance(obj, Timestamp):
@@ -302,18 +386,23 @@ class PyStreamEncoder(StreamEncoder):
         super().start()
         self.fobj.write_str_ln("[")
 
-    def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
+    def encode(self, names: list[str], values: list[_t.Any]) -> bytes:
         try:
-            if self.not_first:
-                self.encoder.write_str(",")
-                self.encoder.flush_line(True)
-            else:
-                self.not_first = True
             self.encoder.encode(values)
-            self.fobj.write_bytes(self.encoder.fobj.getvalue())
+            res: bytes = self.encoder.fobj.getvalue()
+            # reset line state, `emit_encoded` will end this line
+            self.encoder.flush_line(True)
+            return res
         finally:
             self.encoder.fobj = _io.BytesIO()
 
+    def emit_encoded(self, data: bytes) -> None:
+        if self.not_first:
+            self.fobj.write_bytes(self.separator)
+        else:
+            self.not_first = True
+        self.fobj.write_bytes(data)
+
     def finish(self) -> None:
         self.fobj.write_str_ln("\n]")
         super().finish()
@@ -348,15 +437,18 @@ class JSONStreamEncoder(StreamEncoder):
             return {k: JSONStreamEncoder.abridge_json(v) for k, v in obj.items()}
         raise Failure("can't abridge a value of type `%s`", type(obj).__name__)
 
-    def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
+    def encode(self, names: list[str], values: list[_t.Any]) -> bytes:
         if self.abridged:
             values = self.abridge_json(values)
         data = _json.dumps(values, ensure_ascii=False, indent=2, default=self.encode_json)
+        return data.encode(self.fobj.encoding)
+
+    def emit_encoded(self, data: bytes) -> None:
         if self.not_first:
             self.fobj.write_str_ln(",")
         else:
             self.not_first = True
-        self.fobj.write_str(data)
+        self.fobj.write_bytes(data)
 
     def finish(self) -> None:
         self.fobj.write_str_ln("\n]")
@@ -400,7 +492,7 @@ class RawStreamEncoder(StreamEncoder):
             else:
                 enc.write_str(f" # {len(obj)} characters total")
 
-    def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
+    def encode(self, names: list[str], values: list[_t.Any]) -> bytes:
         try:
             for i, value in enumerate(values):
                 name = names[i]
@@ -409,6 +501,249 @@ class RawStreamEncoder(StreamEncoder):
                 except Failure as exc:
                     raise exc.elaborate("while encoding attribute `%s'", name)
                 self.encoder.write_bytes(self.terminator)
-            self.fobj.write_bytes(self.encoder.fobj.getvalue())
+            res: bytes = self.encoder.fobj.getvalue()
+            return res
         finally:
             self.encoder.fobj = _io.BytesIO()
+
+
+class ColumnarStreamEncoder(StreamEncoder):
+    """A `StreamEncoder` that collects emitted values into columns and writes
+    them out in chunks of `batch_size` rows."""
+
+    encodes_records = False
+
+    def __init__(self, fobj: TIOWrappedWriter, abridged: bool, batch_size: int) -> None:
+        super().__init__(fobj, abridged)
+        self.batch_size = max(1, batch_size)
+        self.names: list[str] = []
+        self.columns: list[list[_t.Any]] = []
+        self.rows = 0
+
+    def emit(self, path: str, names: list[str], values: list[_t.Any]) -> None:
+        if self.rows == 0:
+            self.names = names
+            self.columns = [[] for _ in values]
+
+        abridged = self.abridged
+        for column, value in zip(self.columns, values):
+            if abridged and isinstance(value, (str, bytes)):
+                _, value = abridge_anystr(value, 256, False)  # type: ignore
+            column.append(value)
+
+        self.rows += 1
+        if self.rows >= self.batch_size:
+            self.flush_batch()
+
+    def flush_batch(self) -> None:
+        if self.rows == 0:
+            return
+        try:
+            self.write_batch(self.names, self.columns, self.rows)
+        finally:
+            self.columns = []
+            self.rows = 0
+
+    def write_batch(self, names: list[str], columns: list[list[_t.Any]], rows: int) -> None:
+        raise NotImplementedError()
+
+    def finish(self) -> None:
+        self.flush_batch()
+        super().finish()
+
+
+def column_type(column: list[_t.Any]) -> str:
+    """Get the most specific type of all values in a column: `timestamp`,
+    `int`, `float`, `bool`, `str`, `bytes`, `null`, or `any`."""
+    res = "null"
+    for value in column:
+        if value is None:
+            typ = "null"
+        elif isinstance(value, Timestamp):
+            typ = "timestamp"
+        elif isinstance(value, bool):
+            typ = "bool"
+        elif isinstance(value, int):
+            typ = "int"
+        elif isinstance(value, float):
+            typ = "float"
+        elif isinstance(value, str):
+            typ = "str"
+        elif isinstance(value, bytes):
+            typ = "bytes"
+        else:
+            return "any"
+
+        if res == "null":
+            res = typ
+        elif typ not in ("null", res):
+            return "any"
+    return res
+
+
+class CBORColumnsStreamEncoder(ColumnarStreamEncoder):
+    """Produces an indefinite-length `CBOR` array of chunks, each of which is a
+    map of `rows` and `columns`. Each column is a map of `name`, `type`, and
+    `values`.
+
+    Columns of `timestamp`s and `float`s are encoded as little-endian
+    `float64` typed arrays, columns of `int`s as little-endian `sint64` typed
+    arrays (RFC8746), unless they have `None`s in them. All other columns are
+    plain `CBOR` arrays.
+    """
+
+    def start(self) -> None:
+        super().start()
+        self.fobj.write_bytes(b"\x9f")  # start indefinite-length array
+
+    @staticmethod
+    def typed_array(tag: int, typecode: str, column: list[_t.Any]) -> _cbor2.CBORTag:
+        arr = _array.array(typecode, column)
+        if _sys.byteorder != "little":
+            arr.byteswap()
+        return _cbor2.CBORTag(tag, arr.tobytes())
+
+    def encode_column(self, name: str, column: list[_t.Any]) -> dict[str, _t.Any]:
+        typ = column_type(column)
+        values: _t.Any = column
+        if None in column:
+            # typed arrays can't represent those
+            pass
+        elif typ in ("timestamp", "float"):
+            values = self.typed_array(86, "d", [float(v) for v in column])
+        elif typ == "int":
+            try:
+                values = self.typed_array(79, "q", column)
+            except OverflowError:
+                pass
+        return {"name": name, "type": typ, "values": values}
+
+    def write_batch(self, names: list[str], columns: list[list[_t.Any]], rows: int) -> None:
+        chunk = {
+            "rows": rows,
+            "columns": [self.encode_column(name, column) for name, column in zip(names, columns)],
+        }
+        self.fobj.write_bytes(_cbor2.dumps(chunk, default=CBORStreamEncoder.encode_cbor))
+
+    def finish(self) -> None:
+        self.flush_batch()
+        self.fobj.write_bytes(b"\xff")  # break symbol
+        super().finish()
+
+
+def test_CBORColumnsStreamEncoder() -> None:
+    buf = _io.BytesIO()
+    enc = CBORColumnsStreamEncoder(TIOWrappedWriter(buf), False, 3)
+    enc.start()
+    names = ["int", "maybe_int", "maybe_float", "none"]
+    rows: list[list[_t.Any]] = [
+        [1, 2, 0.5, None],
+        [3, None, None, None],
+        [5, 6, 1.5, None],
+        [7, 8, 2.5, None],
+    ]
+    for values in rows:
+        enc.emit("", names, values)
+    enc.finish()
+
+    chunks = _cbor2.loads(buf.getvalue())
+    assert [chunk["rows"] for chunk in chunks] == [3, 1]
+    first, second = [
+        {col["name"]: (col["type"], col["values"]) for col in chunk["columns"]} for chunk in chunks
+    ]
+    assert first["int"][0] == "int" and isinstance(first["int"][1], _cbor2.CBORTag)
+    assert first["maybe_int"] == ("int", [2, None, 6])
+    assert first["maybe_float"] == ("float", [0.5, None, 1.5])
+    assert first["none"] == ("null", [None, None, None])
+    assert second["maybe_int"][0] == "int" and isinstance(second["maybe_int"][1], _cbor2.CBORTag)
+
+
+class _ArrowSink:
+    def __init__(self, fobj: TIOWrappedWriter) -> None:
+        self.fobj = fobj
+        self.closed = False
+
+    def write(self, data: _t.Any) -> int:
+        self.fobj.write_bytes(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        self.fobj.flush()
+
+    def writable(self) -> bool:
+        return True
+
+
+class ArrowStreamEncoder(ColumnarStreamEncoder):
+    """Produces an `Apache Arrow` IPC stream, one record batch per chunk.
+
+    Column types get decided by the first chunk: `timestamp`s become
+    `timestamp[ns, UTC]`, values of mixed types get encoded into `JSON`
+    strings.
+    """
+
+    def __init__(self, fobj: TIOWrappedWriter, abridged: bool, batch_size: int) -> None:
+        super().__init__(fobj, abridged, batch_size)
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError as exc:
+            raise Failure(
+                "`--format=arrow` requires `pyarrow` Python module, use `--format=cbor-columns` instead"
+            ) from exc
+        self.pa = pyarrow
+        self.schema: _t.Any = None
+        self.types: list[str] = []
+        self.writer: _t.Any = None
+
+    def arrow_type(self, typ: str) -> _t.Any:
+        pa = self.pa
+        if typ == "timestamp":
+            return pa.timestamp("ns", tz="UTC")
+        if typ == "int":
+            return pa.int64()
+        if typ == "float":
+            return pa.float64()
+        if typ == "bool":
+            return pa.bool_()
+        if typ == "bytes":
+            return pa.binary()
+        return pa.string()
+
+    @staticmethod
+    def arrow_values(typ: str, column: list[_t.Any]) -> list[_t.Any]:
+        if typ == "timestamp":
+            return [None if v is None else int(v * 1000000000) for v in column]
+        if typ == "any":
+            return [
+                None if v is None else _json.dumps(v, default=JSONStreamEncoder.encode_json)
+                for v in column
+            ]
+        return column
+
+    def write_batch(self, names: list[str], columns: list[list[_t.Any]], rows: int) -> None:
+        pa = self.pa
+        if self.writer is None:
+            self.types = [column_type(column) for column in columns]
+            self.schema = pa.schema(
+                [pa.field(name, self.arrow_type(typ)) for name, typ in zip(names, self.types)]
+            )
+            self.writer = pa.ipc.new_stream(pa.PythonFile(_ArrowSink(self.fobj), mode="w"), self.schema)  # fmt: skip
+
+        arrays = []
+        for field, typ, column in zip(self.schema, self.types, columns):
+            try:
+                arrays.append(pa.array(self.arrow_values(typ, column), type=field.type))
+            except (pa.ArrowException, TypeError, ValueError) as exc:
+                raise Failure(
+                    "values of `%s` do not fit into `%s`, the type of its first chunk",
+                    field.name,
+                    field.type,
+                ) from exc
+        self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+
+    def finish(self) -> None:
+        self.flush_batch()
+        if self.writer is not None:
+            self.writer.close()
+        super().finish()
@@ -19,6 +19,7 @@
 
 import abc as _abc
 import dataclasses as _dc
+import hashlib as _hashlib
 import io as _io
 import os as _os
 import typing as _t
@@ -44,6 +45,15 @@ class DeferredSource(metaclass=_abc.ABCMeta):
         with self.get_fileobj() as f:
             return f.read()
 
+    def get_digest(self) -> bytes:
+        """Get a digest of the contents of this source.
+
+        Digests of two sources of the same type are equal if and only if their
+        `get_bytes` are equal, but `get_digest` can be cheaper to compute and
+        to cache.
+        """
+        return _hashlib.sha256(self.get_bytes()).digest()
+
     def same_as(self, other: _t.Any) -> bool:  # pylint: disable=unused-argument
         return False
 
@@ -67,7 +77,9 @@ class UnknownSource(DeferredSource):
 
 class _BytesIOReader(_io.BytesIO):
     def peek(self, size: int = 0) -> bytes:
-        return self.getvalue()[self.tell() : size]
+        pos = self.tell()
+        with self.getbuffer() as buf:
+            return bytes(buf[pos : pos + max(1, size)])
 
 
 BytesIOReader = _t.cast(_t.Callable[[bytes], _io.BufferedReader], _BytesIOReader)
@@ -172,3 +184,22 @@ class StreamElementSource(DeferredSource, _t.Generic[DeferredSourceType]):
         ):
             return False
         return True
+
+
+@_dc.dataclass
+class SeekableStreamElementSource(StreamElementSource[DeferredSourceType]):
+    """A `StreamElementSource` that also remembers where in `stream_source` its
+    element is, so that it could be re-loaded with `loadf` without re-parsing
+    the stream from the start."""
+
+    offsets: tuple[int, ...]
+    loadf: _t.Callable[[_io.BufferedReader, tuple[int, ...]], _t.Any] = _dc.field(
+        compare=False, repr=False
+    )
+
+    def approx_size(self) -> int:
+        return 40 + 8 * len(self.offsets) + self.stream_source.approx_size()
+
+    def load(self) -> _t.Any:
+        with self.stream_source.get_fileobj() as f:
+            return self.loadf(f, self.offsets)
@@ -0,0 +1,292 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A write-ahead spool for archiving servers.
+
+A spool is a sequential file of entries, each of which is a `spool_header`
+followed by some metadata and some data.  New entries are streamed with a
+bounded buffer into private temporary files first and then get appended to
+the spool, after which they are processed in a background thread.  Entries
+that fail to be processed get retried after some later entry gets processed
+successfully.  Entries that fail `spool_max_attempts` times get moved to a
+separate spool file with `spool_failed_suffix` appended to its path.  When all
+of the appended entries are successfully processed or moved, the spool gets
+truncated.  On startup, all entries left in a spool are processed again, so
+processing must be idempotent.
+"""
+
+import concurrent.futures as _cf
+import fcntl as _fcntl
+import io as _io
+import logging as _logging
+import os as _os
+import struct as _struct
+import tempfile as _tempfile
+import threading as _threading
+import typing as _t
+
+from gettext import gettext
+
+from kisstdlib.failure import *
+
+from .tracking import *
+
+spool_file_name = "hoardy-web.spool"
+spool_magic = b"HWS2"
+# magic, metadata size, data size
+spool_header = _struct.Struct("!4sIQ")
+# headers of all known versions, by magic; "HWS1" had 32-bit data sizes
+spool_headers = {b"HWS1": _struct.Struct("!4sII"), spool_magic: spool_header}
+spool_chunk_size = 1024 * 1024
+# how many times an entry can fail to be processed before being moved out of the spool
+spool_max_attempts = 3
+spool_failed_suffix = ".failed"
+
+
+class FileRegion(_io.RawIOBase):
+    """A read-only view of a region of an open file descriptor. Uses `pread`,
+    so any number of these can be used at the same time."""
+
+    def __init__(self, fd: int, offset: int, size: int) -> None:
+        super().__init__()
+        self.fd = fd
+        self.pos = offset
+        self.end = offset + size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf: _t.Any) -> int:
+        size = min(len(buf), self.end - self.pos)
+        if size <= 0:
+            return 0
+        data = _os.pread(self.fd, size, self.pos)
+        res = len(data)
+        buf[:res] = data
+        self.pos += res
+        return res
+
+
+def copy_to_fd(fd: int, read: _t.Callable[[int], bytes], size: int) -> None:
+    """Copy exactly `size` bytes produced by `read` to `fd`, `spool_chunk_size`
+    bytes at a time."""
+    todo = size
+    while todo > 0:
+        data = read(min(todo, spool_chunk_size))
+        if len(data) == 0:
+            raise Failure("incomplete data")
+        view = memoryview(data)
+        while len(view) > 0:
+            view = view[_os.write(fd, view) :]
+        todo -= len(data)
+
+
+SpoolReaderFunc = _t.Callable[[], _io.BufferedReader]
+SpoolProcessFunc = _t.Callable[[bytes, SpoolReaderFunc, int, _t.Any], None]
+# metadata, data reader, data size, `validate` result, number of failed attempts
+SpoolFailedEntry = tuple[bytes, SpoolReaderFunc, int, _t.Any, int]
+
+
+def file_region_reader(fd: int, offset: int, size: int) -> SpoolReaderFunc:
+    """Make a function producing buffered readers of `size` bytes of `fd` at `offset`."""
+    return lambda: _io.BufferedReader(FileRegion(fd, offset, size), spool_chunk_size)
+
+
+class Spool:
+    """A write-ahead spool file at `path`, entries of which are processed with `process`.
+
+    `process` gets called with the metadata of an entry, a function producing
+    readers of its data, the size of its data, and the value the `validate`
+    function given to `append` returned for it, which is `None` for the entries
+    processed by `replay`.
+    """
+
+    def __init__(self, path: str, process: SpoolProcessFunc) -> None:
+        self.path = path
+        self.process = process
+        self.lock = _threading.Lock()
+        self.pending = 0
+        # entries which failed to be processed, to be retried later; this is
+        # only ever used by the thread processing the entries
+        self.failed: list[SpoolFailedEntry] = []
+
+        self.fd = _os.open(path, _os.O_RDWR | _os.O_CREAT | _os.O_APPEND | _os.O_CLOEXEC, 0o600)
+        try:
+            _fcntl.flock(self.fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+        except OSError as exc:
+            _os.close(self.fd)
+            raise CatastrophicFailure("spool `%s` is being used by another process", path) from exc
+        self.size = _os.fstat(self.fd).st_size
+        self.executor = _cf.ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+
+    def replay(self) -> int:
+        """Synchronously process all entries left in the spool by a previous run,
+        then truncate it. Returns the number of processed entries."""
+        num = 0
+        pos = 0
+        while pos + 4 <= self.size:
+            header = spool_headers.get(_os.pread(self.fd, 4, pos), None)
+            if header is None or pos + header.size > self.size:
+                break
+            hsize = header.size
+            _magic, msize, dsize = header.unpack(_os.pread(self.fd, hsize, pos))
+            offset = pos + hsize + msize
+            if offset + dsize > self.size:
+                break
+            meta = _os.pread(self.fd, msize, pos + hsize)
+            rfunc = file_region_reader(self.fd, offset, dsize)
+            if not self._process(meta, rfunc, dsize, None):
+                self._fail((meta, rfunc, dsize, None, 0))
+            pos = offset + dsize
+            num += 1
+
+        with self.lock:
+            if pos < self.size:
+                _logging.warning(
+                    gettext("spool `%s`: dropping an incomplete entry of %d bytes"),
+                    self.path,
+                    self.size - pos,
+                )
+                _os.ftruncate(self.fd, pos)
+                self.size = pos
+            self._truncate_maybe()
+        return num
+
+    def append(
+        self,
+        meta: bytes,
+        read: _t.Callable[[int], bytes],
+        size: int,
+        validate: _t.Callable[[SpoolReaderFunc], _t.Any],
+    ) -> None:
+        """Append an entry with `size` bytes of data produced by `read` to the spool,
+        check it with `validate`, and schedule it for processing.
+
+        The data is received into a temporary file first, so that slow clients
+        would not block other appends.  If anything raises an exception, the
+        spool is left as it was.
+        """
+        with _tempfile.TemporaryFile(dir=_os.path.dirname(self.path) or ".") as tmp:
+            tmp_fd = tmp.fileno()
+            with prof.stage("spool_receive"):
+                copy_to_fd(tmp_fd, read, size)
+            obj = validate(file_region_reader(tmp_fd, 0, size))
+
+            with self.lock:
+                start = self.size
+                offset = start + spool_header.size + len(meta)
+                try:
+                    with prof.stage("spool_append"):
+                        _os.write(self.fd, spool_header.pack(spool_magic, len(meta), size) + meta)
+                        copy_to_fd(self.fd, FileRegion(tmp_fd, 0, size).read, size)
+                except BaseException:
+                    # do not leave partial entries behind
+                    _os.ftruncate(self.fd, start)
+                    raise
+                self.size = offset + size
+                self.pending += 1
+        rfunc = file_region_reader(self.fd, offset, size)
+        self.executor.submit(self._run, meta, rfunc, size, obj)
+
+    def _process(self, meta: bytes, rfunc: SpoolReaderFunc, size: int, obj: _t.Any) -> bool:
+        try:
+            self.process(meta, rfunc, size, obj)
+        except Exception as exc:
+            # keep everything in the spool, to be retried later
+            msg = exc.get_message(gettext) if isinstance(exc, Failure) else str(exc)
+            _logging.error(
+                gettext("spool `%s`: failed to process an entry, keeping it: %s"),
+                self.path,
+                msg,
+            )
+            return False
+        return True
+
+    def _fail(self, entry: SpoolFailedEntry) -> None:
+        """Count a failed attempt to process an entry, and then either keep it to be
+        retried later, or, if it failed too many times, move it out of the spool."""
+        meta, rfunc, size, obj, attempts = entry
+        attempts += 1
+        if attempts < spool_max_attempts:
+            self.failed.append((meta, rfunc, size, obj, attempts))
+            return
+
+        failed_path = self.path + spool_failed_suffix
+        try:
+            fd = _os.open(
+                failed_path, _os.O_WRONLY | _os.O_CREAT | _os.O_APPEND | _os.O_CLOEXEC, 0o600
+            )
+            try:
+                start = _os.fstat(fd).st_size
+                try:
+                    _os.write(fd, spool_header.pack(spool_magic, len(meta), size) + meta)
+                    with rfunc() as fsrc:
+                        copy_to_fd(fd, fsrc.read, size)
+                except BaseException:
+                    # do not leave partial entries behind
+                    _os.ftruncate(fd, start)
+                    raise
+            finally:
+                _os.close(fd)
+        except (OSError, Failure) as exc:
+            msg = exc.get_message(gettext) if isinstance(exc, Failure) else str(exc)
+            _logging.error(
+                gettext("spool `%s`: failed to move an entry to `%s`, keeping it: %s"),
+                self.path,
+                failed_path,
+                msg,
+            )
+            self.failed.append((meta, rfunc, size, obj, attempts))
+            return
+
+        _logging.error(
+            gettext(
+                "spool `%s`: an entry failed to be processed %d times, moved it to `%s`; to retry, append that file to the spool while nothing uses it"
+            ),
+            self.path,
+            attempts,
+            failed_path,
+        )
+
+    def _truncate_maybe(self) -> None:
+        if self.pending == 0 and len(self.failed) == 0 and self.size > 0:
+            _os.ftruncate(self.fd, 0)
+            self.size = 0
+
+    def _run(self, meta: bytes, rfunc: SpoolReaderFunc, size: int, obj: _t.Any) -> None:
+        ok = self._process(meta, rfunc, size, obj)
+        with self.lock:
+            self.pending -= 1
+            retry = ok and self.pending == 0 and len(self.failed) > 0
+
+        if not ok:
+            self._fail((meta, rfunc, size, obj, 0))
+        elif retry:
+            # whatever made them fail might have been fixed by now
+            failed = self.failed
+            self.failed = []
+            for entry in failed:
+                if not self._process(*entry[:4]):
+                    self._fail(entry)
+
+        with self.lock:
+            self._truncate_maybe()
+
+    def close(self) -> None:
+        """Wait for all appended entries to be processed and close the spool."""
+        self.executor.shutdown(wait=True)
+        _os.close(self.fd)
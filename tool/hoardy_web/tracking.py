@@ -15,12 +15,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-"""Tracking memory consumption and counting seen strings."""
+"""Tracking memory consumption, time spent in hot-path stages, and counting seen
+strings."""
 
 import collections as _c
+import contextlib as _contextlib
 import dataclasses as _dc
+import functools as _ft
+import json as _json
+import threading as _threading
+import time as _time
 import typing as _t
 
+from kisstdlib.io.wrapper import TIOWrappedWriter
+
 
 @_dc.dataclass
 class Memory:
@@ -30,6 +38,202 @@ class Memory:
 mem = Memory()
 
 
+@_dc.dataclass
+class StageStats:
+    count: int = 0
+    total_ns: int = 0
+    self_ns: int = 0
+
+
+ProfiledValue = _t.TypeVar("ProfiledValue")
+
+
+class Profile:
+    """Cheap wall time and call counters for named processing stages.
+
+    Disabled by default, in which case all methods here do nothing but check
+    `self.enabled`.  When enabled, nested stages get accounted properly: a
+    stage's `self_ns` does not include the time spent in stages started while
+    it was running, while its `total_ns` does.  Nesting is tracked per-thread.
+    """
+
+    enabled: bool
+    started_at: int
+    stages: dict[str, StageStats]
+    counters: dict[str, int]
+    counter_sources: list[_t.Callable[[], dict[str, int]]]
+    _local: _threading.local
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started_at = 0
+        self.stages = {}
+        self.counters = {}
+        self.counter_sources = []
+        self._local = _threading.local()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.started_at = _time.monotonic_ns()
+
+    def _children_ns(self) -> list[int]:
+        try:
+            res: list[int] = self._local.children_ns
+        except AttributeError:
+            res = self._local.children_ns = []
+        return res
+
+    def start(self) -> int:
+        """Start a stage, returns an opaque value to be given to `stop`."""
+        if not self.enabled:
+            return 0
+        self._children_ns().append(0)
+        return _time.monotonic_ns()
+
+    def stop(self, name: str, start: int) -> None:
+        """Finish a stage started with `start`."""
+        if not self.enabled:
+            return
+        elapsed = _time.monotonic_ns() - start
+        stack = self._children_ns()
+        children_ns = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+
+        try:
+            stats = self.stages[name]
+        except KeyError:
+            stats = self.stages[name] = StageStats()
+        stats.count += 1
+        stats.total_ns += elapsed
+        stats.self_ns += elapsed - children_ns
+
+    def stage(self, name: str) -> _t.ContextManager[None]:
+        """Account the time spent in the `with` block to a given stage.  This
+        is what everything should use instead of `start` and `stop`."""
+        if not self.enabled:
+            return _no_stage
+        return _Stage(self, name)
+
+    def add_counters(self, func: _t.Callable[[], dict[str, int]]) -> None:
+        """Register a function that will be called by `report` to get more
+        counters, for things that count themselves anyway."""
+        self.counter_sources.append(func)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increment a named counter."""
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def wrap_iter(
+        self, name: str, iterator: _t.Iterable[ProfiledValue]
+    ) -> _t.Iterator[ProfiledValue]:
+        """Wrap an iterator, accounting the time spent generating each element
+        to a given stage."""
+        if not self.enabled:
+            return iter(iterator)
+        return self._wrap_iter(name, iter(iterator))
+
+    def _wrap_iter(self, name: str, it: _t.Iterator[ProfiledValue]) -> _t.Iterator[ProfiledValue]:
+        while True:
+            with self.stage(name):
+                try:
+                    value = next(it)
+                except StopIteration:
+                    return
+            yield value
+
+    def report(self, fobj: TIOWrappedWriter, fmt: str = "table") -> None:
+        wall_ns = _time.monotonic_ns() - self.started_at
+        stages = sorted(self.stages.items(), key=lambda x: x[1].self_ns, reverse=True)
+        all_counters = dict(self.counters)
+        for func in self.counter_sources:
+            all_counters.update(func())
+        counters = sorted(all_counters.items())
+
+        if fmt == "json":
+            fobj.write_str_ln(
+                _json.dumps(
+                    {
+                        "wall_ns": wall_ns,
+                        "stages": {name: _dc.asdict(stats) for name, stats in stages},
+                        "counters": dict(counters),
+                    }
+                )
+            )
+            return
+
+        fobj.write_str_ln(
+            f"{'stage':<24} {'calls':>10} {'total, s':>12} {'self, s':>12} {'self, %':>8}"
+        )
+        for name, stats in stages:
+            fobj.write_str_ln(
+                f"{name:<24} {stats.count:>10} {stats.total_ns / 1e9:>12.6f} {stats.self_ns / 1e9:>12.6f} {100 * stats.self_ns / max(1, wall_ns):>7.2f}%"
+            )
+        fobj.write_str_ln(f"{'wall':<24} {'':>10} {wall_ns / 1e9:>12.6f}")
+        for name, value in counters:
+            fobj.write_str_ln(f"{name:<24} {value:>10}")
+
+
+class _Stage:
+    __slots__ = ["prof", "name", "start"]
+
+    def __init__(self, prof_: Profile, name: str) -> None:
+        self.prof = prof_
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = self.prof.start()
+
+    def __exit__(self, *_args: _t.Any) -> None:
+        self.prof.stop(self.name, self.start)
+
+
+_no_stage = _contextlib.nullcontext()
+
+prof = Profile()
+
+ProfiledFunc = _t.TypeVar("ProfiledFunc", bound=_t.Callable[..., _t.Any])
+
+
+def profiled(name: str) -> _t.Callable[[ProfiledFunc], ProfiledFunc]:
+    """Account all calls of the decorated function to a given `prof` stage."""
+
+    def decorator(func: ProfiledFunc) -> ProfiledFunc:
+        @_ft.wraps(func)
+        def wrapper(*args: _t.Any, **kwargs: _t.Any) -> _t.Any:
+            if not prof.enabled:
+                return func(*args, **kwargs)
+            with prof.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+class ProfiledReader:
+    """A file object wrapper accounting the time spent in `read` and `peek`
+    calls to a given `prof` stage."""
+
+    def __init__(self, name: str, fobj: _t.Any) -> None:
+        self.name = name
+        self.fobj = fobj
+
+    def read(self, size: int = -1) -> bytes:
+        with prof.stage(self.name):
+            return self.fobj.read(size)  # type: ignore
+
+    def peek(self, size: int = 0) -> bytes:
+        with prof.stage(self.name):
+            return self.fobj.peek(size)  # type: ignore
+
+    def __getattr__(self, name: str) -> _t.Any:
+        return getattr(self.fobj, name)
+
+
 @_dc.dataclass
 class SeenCounter(_t.Generic[_t.AnyStr]):
     _state: _c.OrderedDict[_t.AnyStr, int] = _dc.field(default_factory=_c.OrderedDict)
@@ -0,0 +1,759 @@
+# Copyright (c) 2026 Jan Malakhovski <oxij@oxij.org>
+#
+# This file is a part of `hoardy-web` project.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Loading of `WARC` files into `Reqres` structures and dumping of the latter into
+the former."""
+
+import base64 as _base64
+import collections as _c
+import dataclasses as _dc
+import gzip as _gzip
+import hashlib as _hashlib
+import io as _io
+import os as _os
+import typing as _t
+import uuid as _uuid
+import zlib as _zlib
+
+from .wrr import *
+
+
+class WARCParsingFailure(ParsingFailure):
+    pass
+
+
+# size of reads `WARCReader` does
+warc_read_size = 64 * 1024
+
+# a raw offset in the file at which to start reading, and the number of
+# decompressed bytes to skip after it
+WARCPosition = tuple[int, int]
+
+
+@_dc.dataclass
+class WARCRecord:
+    position: WARCPosition
+    # raw header block, including the version line and the terminating empty line
+    head: bytes
+    # header fields, with names in lower case
+    fields: dict[str, list[str]]
+    block: bytes
+
+    def get(self, name: str, default: str = "") -> str:
+        try:
+            return self.fields[name][0]
+        except KeyError:
+            return default
+
+    def dumps(self) -> bytes:
+        return self.head + self.block + b"\r\n\r\n"
+
+
+class WARCReader:
+    """Read `WARC` records one by one from a plain, a `gzip`ped, or a
+    `gzip`ped member by member (a usual `.warc.gz`) stream, decompressing it
+    incrementally. Only the record currently being read is kept in memory.
+
+    Each record remembers its `WARCPosition`, which can be given to a new
+    `WARCReader` to continue reading from that record without re-reading
+    the stream from the start.
+    """
+
+    def __init__(self, fobj: _io.BufferedReader, position: WARCPosition = (0, 0)) -> None:
+        base, skip = position
+        fobj.seek(base)
+        self.fobj = fobj
+        self.gzipped = fobj.peek(2)[:2] == b"\x1f\x8b"
+
+        # decompressed data, its offset in the decompressed stream, and the
+        # read position in it
+        self.buf = bytearray()
+        self.buf_offset = 0
+        self.pos = 0
+
+        # `gzip` state: the current decompressor, compressed data not yet fed
+        # to it, the raw offset of the latter, and for each `gzip` member
+        # overlapping `buf`, its offset in the decompressed stream and its raw
+        # offset
+        self.dec: _t.Any | None = None
+        self.raw = b""
+        self.raw_offset = base
+        self.members: _c.deque[tuple[int, int]] = _c.deque()
+
+        while skip > 0:
+            data = self.read(min(skip, warc_read_size))
+            if len(data) == 0:
+                raise WARCParsingFailure("unexpected EOF")
+            skip -= len(data)
+
+    def tell(self) -> WARCPosition:
+        offset = self.buf_offset + self.pos
+        if not self.gzipped:
+            return (self.raw_offset + offset, 0)
+        if len(self.buf) - self.pos == 0:
+            # make sure the last member of `self.members` is the one `offset` is in
+            self._fill()
+        for start, raw_offset in reversed(self.members):
+            if start <= offset:
+                return (raw_offset, offset - start)
+        assert False
+
+    def _fill(self) -> bool:
+        if not self.gzipped:
+            data = self.fobj.read(warc_read_size)
+            if len(data) == 0:
+                return False
+            self.buf += data
+            return True
+
+        while True:
+            raw = self.raw
+            if len(raw) == 0:
+                raw = self.fobj.read(warc_read_size)
+                if len(raw) == 0:
+                    if self.dec is None:
+                        return False
+                    # flush whatever is still buffered
+                    raw = b""
+            if self.dec is None:
+                self.dec = _zlib.decompressobj(31)
+                self.members.append((self.buf_offset + len(self.buf), self.raw_offset))
+
+            dec = self.dec
+            try:
+                data = dec.decompress(raw, warc_read_size)
+            except _zlib.error as exc:
+                raise WARCParsingFailure("`gzip` parsing failure") from exc
+
+            if dec.eof:
+                rest = dec.unused_data
+                self.dec = None
+            else:
+                rest = dec.unconsumed_tail
+            self.raw_offset += len(raw) - len(rest)
+            self.raw = rest
+
+            if len(data) > 0:
+                self.buf += data
+                return True
+            if len(raw) == 0:
+                raise WARCParsingFailure("`gzip` parsing failure: unexpected EOF")
+
+    def _compact(self) -> None:
+        pos = self.pos
+        if pos == 0:
+            return
+        del self.buf[:pos]
+        self.buf_offset += pos
+        self.pos = 0
+        members = self.members
+        while len(members) > 1 and members[1][0] <= self.buf_offset:
+            members.popleft()
+
+    def read_line(self) -> bytes | None:
+        """Read a line, including its line terminator. Return `None` on EOF."""
+        buf = self.buf
+        start = self.pos
+        scanned = start
+        while True:
+            eol = buf.find(b"\n", scanned)
+            if eol != -1:
+                self.pos = eol + 1
+                return bytes(buf[start : eol + 1])
+            scanned = len(buf)
+            if not self._fill():
+                if start == len(buf):
+                    return None
+                self.pos = len(buf)
+                return bytes(buf[start:])
+
+    def read(self, size: int) -> bytes:
+        """Read up to `size` bytes, less only on EOF."""
+        buf = self.buf
+        while len(buf) - self.pos < size:
+            if not self._fill():
+                break
+        start = self.pos
+        self.pos = end = min(start + size, len(buf))
+        return bytes(buf[start:end])
+
+    def read_record(self) -> WARCRecord | None:
+        """Read the next record. Return `None` on EOF."""
+        self._compact()
+
+        while True:
+            position = self.tell()
+            line = self.read_line()
+            if line is None:
+                return None
+            if line.strip() != b"":
+                break
+
+        if not line.startswith(b"WARC/"):
+            raise WARCParsingFailure("expected a `WARC` record, got `%s`", line[:64])
+
+        head = [line]
+        fields: dict[str, list[str]] = {}
+        name = None
+        while True:
+            line = self.read_line()
+            if line is None:
+                raise WARCParsingFailure("unexpected EOF while reading `WARC` record header")
+            head.append(line)
+            if line.strip() == b"":
+                break
+            value = line.decode("utf-8", "replace").strip()
+            if line[:1] in (b" ", b"\t") and name is not None:
+                # a continuation line
+                values = fields[name]
+                values[-1] = values[-1] + " " + value
+                continue
+            try:
+                name, value = value.split(":", 1)
+            except ValueError as exc:
+                raise WARCParsingFailure(
+                    "failed to parse `WARC` record header `%s`", value
+                ) from exc
+            name = name.strip().lower()
+            fields.setdefault(name, []).append(value.strip())
+
+        try:
+            length = int(fields["content-length"][0])
+        except (KeyError, ValueError) as exc:
+            raise WARCParsingFailure("`WARC` record has no valid `Content-Length`") from exc
+
+        block = self.read(length)
+        if len(block) != length:
+            raise WARCParsingFailure("unexpected EOF while reading `WARC` record block")
+
+        # the two line breaks after the block
+        for _ in range(2):
+            if self.read_line() not in (b"\r\n", b"\n", None):
+                raise WARCParsingFailure("expected an empty line after `WARC` record block")
+
+        return WARCRecord(position, b"".join(head), fields, block)
+
+    def records(self) -> _t.Iterator[WARCRecord]:
+        while True:
+            record = self.read_record()
+            if record is None:
+                return
+            yield record
+
+
+# how many unpaired records `warc_pairs` keeps waiting for their pairs
+warc_pending_records = 64
+
+
+def warc_pairs(records: _t.Iterable[WARCRecord]) -> _t.Iterator[list[WARCRecord]]:
+    """Group `request` and `response` `WARC` records of `HTTP` exchanges into
+    lists of one or two records, skipping all other records.
+
+    Records get paired by `WARC-Concurrent-To`, or, when neither record has
+    it, by `WARC-Target-URI`. Records that stay unpaired while
+    `warc_pending_records` other records are waiting are considered to have
+    no pairs.
+    """
+    pending: dict[_t.Any, WARCRecord] = {}
+    for record in records:
+        rtype = record.get("warc-type")
+        if rtype not in ("request", "response"):
+            continue
+        if not record.get("content-type").startswith("application/http"):
+            continue
+
+        rid = record.get("warc-record-id")
+        links = record.fields.get("warc-concurrent-to", [])
+        uri = record.get("warc-target-uri")
+        partner = None
+        for key, other in pending.items():
+            if other.get("warc-type") == rtype:
+                continue
+            other_links = other.fields.get("warc-concurrent-to", [])
+            if len(links) > 0 or len(other_links) > 0:
+                if key in links or rid in other_links:
+                    partner = key
+                    break
+            elif other.get("warc-target-uri") == uri:
+                partner = key
+                break
+
+        if partner is not None:
+            yield [pending.pop(partner), record]
+            continue
+
+        pending[rid if rid != "" else id(record)] = record
+        if len(pending) > warc_pending_records:
+            yield [pending.pop(next(iter(pending)))]
+
+    for record in pending.values():
+        yield [record]
+
+
+def _parse_http(block: bytes) -> tuple[list[str], Headers, bytes, bool]:
+    """Parse a raw `HTTP` message into its start line, headers, and body. The
+    latter is returned as is."""
+    eoh = block.find(b"\r\n\r\n")
+    if eoh != -1:
+        head, body, complete = block[:eoh], block[eoh + 4 :], True
+    else:
+        eoh = block.find(b"\n\n")
+        if eoh != -1:
+            head, body, complete = block[:eoh], block[eoh + 2 :], True
+        else:
+            head, body, complete = block, b"", False
+
+    lines = head.split(b"\n")
+    start = lines[0].decode("ascii", "replace").strip().split(" ", 2)
+    headers: Headers = []
+    for line in lines[1:]:
+        line = line.rstrip(b"\r")
+        if line[:1] in (b" ", b"\t") and len(headers) > 0:
+            # a continuation line
+            name, value = headers[-1]
+            headers[-1] = (name, value + b" " + line.strip())
+            continue
+        try:
+            k, v = line.split(b":", 1)
+        except ValueError as exc:
+            raise WARCParsingFailure("failed to parse `HTTP` header `%s`", line) from exc
+        headers.append((k.strip().decode("ascii", "replace"), v.strip()))
+    return start, headers, body, complete
+
+
+def _header_tokens(headers: Headers, name: str) -> list[str]:
+    return [
+        e.strip().lower()
+        for v in get_raw_header_values(headers, name)
+        for e in v.decode("latin-1").split(",")
+        if e.strip() != ""
+    ]
+
+
+def _dechunk(data: bytes) -> tuple[bytes, bool]:
+    res: list[bytes] = []
+    pos = 0
+    while True:
+        eol = data.find(b"\n", pos)
+        if eol == -1:
+            return b"".join(res), False
+        try:
+            size = int(data[pos:eol].split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            return b"".join(res), False
+        pos = eol + 1
+        if size == 0:
+            return b"".join(res), True
+        chunk = data[pos : pos + size]
+        res.append(chunk)
+        if len(chunk) != size:
+            return b"".join(res), False
+        pos += size
+        if data.startswith(b"\r\n", pos):
+            pos += 2
+        elif data.startswith(b"\n", pos):
+            pos += 1
+
+
+def _decode(data: bytes, encoding: str) -> bytes:
+    if encoding in ("gzip", "x-gzip"):
+        dec = _zlib.decompressobj(31)
+    elif encoding == "deflate":
+        # `deflate` is supposed to be `zlib`-wrapped, but frequently it's raw
+        dec = _zlib.decompressobj(15 if data[:1] == b"\x78" else -15)
+    else:
+        raise ValueError("unsupported encoding", encoding)
+    return dec.decompress(data) + dec.flush()
+
+
+def _http_body(headers: Headers, body: bytes, complete: bool) -> tuple[Headers, bytes, bool]:
+    """Undo `Transfer-Encoding` and `Content-Encoding` of a raw `HTTP` body,
+    similarly to what `mitmproxy`'s `decode` does."""
+    if "chunked" in _header_tokens(headers, "transfer-encoding"):
+        body, dechunked = _dechunk(body)
+        complete = complete and dechunked
+    else:
+        cl = get_raw_header_values(headers, "content-length")
+        if len(cl) > 0 and cl[0].strip().isdigit() and int(cl[0]) != len(body):
+            complete = False
+
+    encodings = [e for e in _header_tokens(headers, "content-encoding") if e != "identity"]
+    if len(encodings) > 0 and all(e in ("gzip", "x-gzip", "deflate") for e in encodings):
+        try:
+            for e in reversed(encodings):
+                body = _decode(body, e)
+        except _zlib.error:
+            # keep it as is
+            pass
+        else:
+            headers = [(k, v) for k, v in headers if k.lower() != "content-encoding"]
+
+    return headers, body, complete
+
+
+def warc_records_reqres(records: list[WARCRecord]) -> Reqres:
+    """Make a `Reqres` from a list of records produced by `warc_pairs`."""
+    request_record = response_record = None
+    for record in records:
+        if record.get("warc-type") == "request":
+            request_record = record
+        else:
+            response_record = record
+
+    first = records[0]
+    url = first.get("warc-target-uri").strip("<>")
+    if url == "":
+        raise WARCParsingFailure("`WARC` record has no `WARC-Target-URI`")
+    purl = parse_url(url)
+
+    protocol = "HTTP/1.0"
+    response = None
+    finished_at = parse_iso_Timestamp(first.get("warc-date"))
+
+    if response_record is not None:
+        started_at = finished_at = parse_iso_Timestamp(response_record.get("warc-date"))
+        start, headers, body, complete = _parse_http(response_record.block)
+        if len(start) < 2 or not start[0].startswith("HTTP/") or not start[1].isdigit():
+            raise WARCParsingFailure("failed to parse `HTTP` status line `%s`", " ".join(start))
+        protocol = start[0]
+        headers, body, complete = _http_body(headers, body, complete)
+        if response_record.get("warc-truncated") != "":
+            complete = False
+        response = Response(
+            started_at,
+            int(start[1]),
+            start[2] if len(start) > 2 else "",
+            headers,
+            complete,
+            body,
+        )
+
+    if request_record is not None:
+        started_at = parse_iso_Timestamp(request_record.get("warc-date"))
+        start, headers, body, complete = _parse_http(request_record.block)
+        if len(start) < 2:
+            raise WARCParsingFailure("failed to parse `HTTP` request line `%s`", " ".join(start))
+        if len(start) > 2 and start[2].startswith("HTTP/"):
+            protocol = start[2]
+        headers, body, complete = _http_body(headers, body, complete)
+        if request_record.get("warc-truncated") != "":
+            complete = False
+        request = Request(started_at, start[0].upper(), purl, headers, complete, body)
+    else:
+        # we don't know anything about it
+        assert response is not None
+        request = Request(response.started_at, "GET", purl, [], False, b"")
+
+    return Reqres(1, "hoardy-warc/1", protocol, request, response, finished_at, {}, None)
+
+
+def warc_load_offsets(fobj: _io.BufferedReader, offsets: tuple[int, ...]) -> Reqres:
+    """Load a `Reqres` from records at given `WARCPosition`s, flattened."""
+    records = []
+    for i in range(0, len(offsets), 2):
+        record = WARCReader(fobj, (offsets[i], offsets[i + 1])).read_record()
+        if record is None:
+            raise WARCParsingFailure("unexpected EOF")
+        records.append(record)
+    return warc_records_reqres(records)
+
+
+def rrexprs_warc_load_fileobj(
+    fobj: _io.BufferedReader, source: DeferredSourceType
+) -> _t.Iterator[ReqresExpr[SeekableStreamElementSource[DeferredSourceType]]]:
+    n = 0
+    for records in warc_pairs(WARCReader(fobj).records()):
+        reqres = warc_records_reqres(records)
+        offsets = tuple(x for r in records for x in r.position)
+        yield ReqresExpr(SeekableStreamElementSource(source, n, offsets, warc_load_offsets), reqres)
+        n += 1
+
+
+def warc_split_fileobj(fobj: _io.BufferedReader) -> _t.Iterator[bytes]:
+    """Split a `WARC` file into raw (and decompressed) records of separate
+    `HTTP` exchanges, without parsing their `HTTP` data. Use `warc_loads` to
+    parse the results."""
+    for records in warc_pairs(WARCReader(fobj).records()):
+        yield b"".join(r.dumps() for r in records)
+
+
+def warc_loads(data: bytes) -> Reqres:
+    return warc_records_reqres(list(WARCReader(BytesIOReader(data)).records()))
+
+
+def rrexprs_warc_loadf(
+    path: str | bytes,
+) -> _t.Iterator[ReqresExpr[SeekableStreamElementSource[FileSource]]]:
+    with open(path, "rb") as f:
+        in_stat = _os.fstat(f.fileno())
+        yield from rrexprs_warc_load_fileobj(f, make_FileSource(path, in_stat))
+
+
+warc_version = b"WARC/1.1"
+
+# `HTTP` headers `warc_reqres_records` drops, since `WRR` bodies are stored decoded
+warc_skip_http_headers = frozenset(["content-encoding", "transfer-encoding", "content-length"])
+
+
+def warc_date(ts: Timestamp) -> str:
+    return ts.format("%Y-%m-%dT%H:%M:%S", precision=3, utc=True) + "Z"
+
+
+def warc_record_id() -> str:
+    return f"<urn:uuid:{_uuid.uuid4()}>"
+
+
+def warc_payload_digest(data: bytes) -> str:
+    return "sha1:" + _base64.b32encode(_hashlib.sha1(data).digest()).decode("ascii")
+
+
+def warc_record(fields: list[tuple[str, str]], block: bytes) -> bytes:
+    """Make a raw `WARC` record."""
+    head = [warc_version, b"\r\n"]
+    for k, v in fields:
+        head.append(f"{k}: {v}\r\n".encode("utf-8"))
+    head.append(b"Content-Length: %d\r\n\r\n" % (len(block),))
+    return b"".join(head) + block + b"\r\n\r\n"
+
+
+def _http_block(
+    start: str, headers: Headers, body: bytes | str, host: str | None = None
+) -> tuple[bytes, bytes]:
+    """Make a raw `HTTP` message, return it and its body. For requests, `host`
+    should be set, it will be used as a `Host` header when `headers` have none."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    # responses always get a `Content-Length`, requests get it only when needed
+    has_length = host is None or len(body) > 0
+    res = [start.encode("utf-8"), b"\r\n"]
+    for k, v in headers:
+        kl = k.lower()
+        if kl.startswith(":"):
+            # `HTTP/2` pseudo-headers
+            continue
+        if kl in warc_skip_http_headers:
+            has_length = has_length or kl == "content-length"
+            continue
+        if kl == "host":
+            host = None
+        res += [k.encode("utf-8"), b": ", v, b"\r\n"]
+    if host is not None:
+        res += [b"Host: ", host.encode("utf-8"), b"\r\n"]
+    if has_length:
+        res.append(b"Content-Length: %d\r\n" % (len(body),))
+    res.append(b"\r\n")
+    return b"".join(res) + body, body
+
+
+def warc_reqres_records(reqres: Reqres) -> tuple[list[bytes], str | None]:
+    """Make raw `response` (when there is one) and `request` `WARC` records for a given
+    `Reqres`, in that order, and return them together with the payload digest of the
+    former.
+
+    Since `WRR` files store decoded bodies, `Content-Encoding`, `Transfer-Encoding`,
+    and `Content-Length` `HTTP` headers get replaced with a `Content-Length` of the
+    decoded body. `websocket` frames are not exported.
+    """
+    request = reqres.request
+    url = request.url
+    protocol = reqres.protocol if reqres.protocol.startswith("HTTP/") else "HTTP/1.1"
+    target = url.net_url
+
+    records = []
+    digest = None
+    request_id = warc_record_id()
+    response = reqres.response
+    if response is not None:
+        response_id = warc_record_id()
+        start = f"{protocol} {response.code} {response.reason}".rstrip(" ")
+        block, body = _http_block(start, response.headers, response.body)
+        digest = warc_payload_digest(body)
+        fields = [
+            ("WARC-Type", "response"),
+            ("WARC-Record-ID", response_id),
+            ("WARC-Date", warc_date(response.started_at)),
+            ("WARC-Target-URI", target),
+            ("WARC-Concurrent-To", request_id),
+            ("WARC-Payload-Digest", digest),
+            ("Content-Type", "application/http; msgtype=response"),
+        ]
+        if not response.complete:
+            fields.append(("WARC-Truncated", "unspecified"))
+        records.append(warc_record(fields, block))
+
+    path = url.path or "/"
+    start = f"{request.method} {path}{url.oqm}{url.query} {protocol}"
+    block, _ = _http_block(start, request.headers, request.body, url.net_netloc)
+    fields = [
+        ("WARC-Type", "request"),
+        ("WARC-Record-ID", request_id),
+        ("WARC-Date", warc_date(request.started_at)),
+        ("WARC-Target-URI", target),
+    ]
+    if response is not None:
+        fields.append(("WARC-Concurrent-To", response_id))
+    fields.append(("Content-Type", "application/http; msgtype=request"))
+    if not request.complete:
+        fields.append(("WARC-Truncated", "unspecified"))
+    records.append(warc_record(fields, block))
+
+    return records, digest
+
+
+def warc_gzip_record(record: bytes) -> bytes:
+    """Compress a raw `WARC` record into a separate `gzip` member, which is what
+    `.warc.gz` files consist of."""
+    return _gzip.compress(record, compresslevel=9, mtime=0)
+
+
+class WARCWriter:
+    """Write `gzip` members produced by `warc_gzip_record` into a sequence of `.warc.gz`
+    files named `<prefix>-<NNNNN>.warc.gz` under `destination`, starting a new file
+    when the current one would grow larger than `max_size` bytes. Each file starts with
+    a `warcinfo` record."""
+
+    def __init__(self, destination: str, prefix: str, max_size: int) -> None:
+        self.destination = destination
+        self.prefix = prefix
+        self.max_size = max_size
+        self.num = 0
+        self.fobj: _io.BufferedWriter | None = None
+        self.name = ""
+        self.size = 0
+
+    def _open(self) -> None:
+        self.close()
+        name = f"{self.prefix}-{self.num:05d}.warc.gz"
+        path = _os.path.join(self.destination, name)
+        try:
+            self.fobj = fobj = open(path, "xb")
+        except FileExistsError as exc:
+            raise Failure("destination already exists: `%s`", path) from exc
+        self.num += 1
+        self.name = name
+
+        info = b"software: hoardy-web\r\nformat: WARC File Format 1.1\r\n"
+        fields = [
+            ("WARC-Type", "warcinfo"),
+            ("WARC-Record-ID", warc_record_id()),
+            ("WARC-Date", warc_date(Timestamp.now())),
+            ("WARC-Filename", name),
+            ("Content-Type", "application/warc-fields"),
+        ]
+        data = warc_gzip_record(warc_record(fields, info))
+        fobj.write(data)
+        self.size = len(data)
+
+    def write(self, members: list[bytes]) -> tuple[str, int]:
+        """Write given `gzip` members into the current file, or into a new one, if
+        needed, and return the name of that file and the offset of the first of the
+        members in it."""
+        size = sum(map(len, members))
+        if self.fobj is None or self.size + size > self.max_size:
+            self._open()
+        assert self.fobj is not None
+        offset = self.size
+        for data in members:
+            self.fobj.write(data)
+        self.size += size
+        return self.name, offset
+
+    def close(self) -> None:
+        fobj = self.fobj
+        if fobj is not None:
+            self.fobj = None
+            fobj.close()
+
+
+def test_warc_load() -> None:
+    def record(rtype: str, rid: str, block: bytes, extra: str = "") -> bytes:
+        return (
+            (
+                f"WARC/1.0\r\nWARC-Type: {rtype}\r\nWARC-Record-ID: <urn:uuid:{rid}>\r\n"
+                f"WARC-Target-URI: https://example.org/{rid[1:]}\r\nWARC-Date: 2024-01-02T03:04:05Z\r\n"
+                f"Content-Type: application/http\r\n{extra}Content-Length: {len(block)}\r\n\r\n"
+            ).encode("utf-8")
+            + block
+            + b"\r\n\r\n"
+        )
+
+    body = b"<html>hello</html>"
+    records = [
+        b"WARC/1.0\r\nWARC-Type: warcinfo\r\nContent-Length: 0\r\n\r\n\r\n\r\n",
+        record("request", "q1", b"GET /1 HTTP/1.1\r\nHost: example.org\r\n\r\n", "WARC-Concurrent-To: <urn:uuid:s1>\r\n"),
+        # paired by `WARC-Target-URI`, in reverse order
+        record("response", "s2", b"HTTP/1.1 404 Not Found\r\nContent-Length: 3\r\n\r\nnot"),
+        record("response", "s1", b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nContent-Encoding: gzip\r\n\r\n"
+               + b"".join(b"%x\r\n%s\r\n" % (len(c), c) for c in [_zlib.compress(body, wbits=31)]) + b"0\r\n\r\n"),
+        record("request", "q2", b"POST /2 HTTP/1.1\r\n\r\ndata"),
+        record("response", "s3", b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\ntrunc", "WARC-Truncated: length\r\n"),
+    ]  # fmt: skip
+
+    for data in [
+        b"".join(records),
+        _zlib.compress(b"".join(records), wbits=31),
+        b"".join(_zlib.compress(r, wbits=31) for r in records),
+    ]:
+        rrexprs = list(rrexprs_warc_load_fileobj(BytesIOReader(data), BytesSource(data)))
+        assert len(rrexprs) == 3
+
+        first, second, third = [rrexpr.reqres for rrexpr in rrexprs]
+        assert first.request.url.raw_url == "https://example.org/1"
+        assert first.response is not None and first.response.code == 200
+        assert first.response.complete and first.response.body == body
+        assert get_header_value(first.response.headers, "content-encoding", None) is None
+        assert second.request.method == "POST" and second.request.body == b"data"
+        assert second.response is not None and second.response.code == 404
+        assert third.response is not None and not third.response.complete
+        assert not third.request.complete
+
+        for rrexpr in rrexprs:
+            reqres = rrexpr.reqres
+            rrexpr.unload()
+            assert rrexpr.reqres == reqres
+
+        assert [wrr_dumps(warc_loads(x)) for x in warc_split_fileobj(BytesIOReader(data))] == [
+            wrr_dumps(first),
+            wrr_dumps(second),
+            wrr_dumps(third),
+        ]
+
+
+def test_warc_reqres_records() -> None:
+    reqres = trivial_Reqres(
+        parse_url("https://example.org/page?q=1"),
+        headers=[("Content-Encoding", b"gzip"), ("Transfer-Encoding", b"chunked")],
+        data=b"<html>hello</html>",
+    )
+    reqres.request.headers = [(":authority", b"example.org"), ("Accept", b"*/*")]
+
+    records, digest = warc_reqres_records(reqres)
+    assert len(records) == 2 and digest == warc_payload_digest(b"<html>hello</html>")
+    assert b"\r\nHost: example.org\r\n" in records[1]
+
+    loaded = warc_loads(b"".join(records))
+    assert loaded.response is not None and reqres.response is not None
+    assert loaded.request.url == reqres.request.url
+    assert loaded.request.started_at == reqres.request.started_at
+    assert loaded.response.started_at == reqres.response.started_at
+    assert loaded.response.body == reqres.response.body and loaded.response.complete
+    assert get_header_value(loaded.response.headers, "content-encoding", None) is None
+    assert get_header_value(loaded.response.headers, "content-length", None) == "18"
+
+    data = b"".join(warc_gzip_record(record) for record in records)
+    rrexprs = list(rrexprs_warc_load_fileobj(BytesIOReader(data), BytesSource(data)))
+    assert len(rrexprs) == 1 and wrr_dumps(rrexprs[0].reqres) == wrr_dumps(loaded)
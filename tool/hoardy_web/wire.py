@@ -19,9 +19,11 @@
 
 import base64 as _base64
 import dataclasses as _dc
+import functools as _ft
 import logging as _logging
 import os as _os
 import re as _re
+import sys as _sys
 import typing as _t
 import urllib.parse as _up
 
@@ -31,6 +33,8 @@ from kisstdlib.failure import *
 from kisstdlib.parsing import *
 from kisstdlib.string_ext import quoter, safe_char
 
+from .tracking import *
+
 
 def scheck(v: _t.Any, what: str, value: _t.Any, expected: _t.Any) -> None:
     if value != expected:
@@ -188,7 +192,7 @@ def qsl_to_path(qsl: _t.Sequence[tuple[str, str | None]]) -> str:
     return "&".join(l)
 
 
-@_dc.dataclass
+@_dc.dataclass(frozen=True, slots=True)
 class ParsedURL:
     raw_url: str
     scheme: str
@@ -225,14 +229,16 @@ class ParsedURL:
         hn = self.hostname
         if self.brackets:
             hn = "[" + hn + "]"
-        return "".join([self.net_auth, hn, self.opm, self.port])
+        # these repeat as much as hostnames do, see `parse_url_uncached`
+        return _sys.intern("".join([self.net_auth, hn, self.opm, self.port]))
 
     @property
     def net_netloc(self) -> str:
         hn = self.net_hostname
         if self.brackets:
             hn = "[" + hn + "]"
-        return "".join([self.net_auth, hn, self.opm, self.port])
+        # these repeat as much as hostnames do, see `parse_url_uncached`
+        return _sys.intern("".join([self.net_auth, hn, self.opm, self.port]))
 
     @property
     def path_parts(self) -> list[str]:
@@ -358,12 +364,36 @@ class ParsedURL:
     def pretty_nurl(self) -> str:
         return f"{self.pretty_net_nurl}{self.ofm}{self.fragment}"
 
+    @property
+    def surt(self) -> str:
+        if not self.raw_hostname:
+            return self.net_url.lower()
+        hparts = self.net_hostname.lower().split(".")
+        if all(map(str.isdigit, hparts)):
+            # IPv4 addresses are kept as-is
+            host = ".".join(hparts)
+        else:
+            if len(hparts) > 2 and hparts[0] == "www":
+                hparts = hparts[1:]
+            hparts.reverse()
+            host = ",".join(hparts)
+        if self.port != "" and (self.scheme, self.port) not in surt_default_ports:
+            host += ":" + self.port
+        path = self.path
+        query = self.query
+        if query != "":
+            path += "?" + "&".join(sorted(query.split("&")))
+        return f"{host}){path or '/'}".lower()
+
+
+surt_default_ports = frozenset([("http", "80"), ("https", "443"), ("ws", "80"), ("wss", "443")])
+
 
 class URLParsingError(ValueError):
     pass
 
 
-def parse_url(url: str) -> ParsedURL:
+def parse_url_uncached(url: str) -> ParsedURL:
     try:
         scheme, netloc, path, query, fragment = _up.urlsplit(url)
     except Exception as exc:
@@ -421,17 +451,18 @@ def parse_url(url: str) -> ParsedURL:
 
     oqm = "?" if query != "" or (query == "" and url.endswith("?")) else ""
     ofm = "#" if fragment != "" or (fragment == "" and url.endswith("#")) else ""
+    # the same few hostnames get repeated a lot, so intern them
     return ParsedURL(
         url,
-        scheme,
+        _sys.intern(scheme),
         user,
         password,
         brackets,
-        raw_hostname,
-        net_hostname,
-        hostname,
+        _sys.intern(raw_hostname),
+        _sys.intern(net_hostname),
+        _sys.intern(hostname),
         opm,
-        port,
+        _sys.intern(port),
         path,
         oqm,
         query,
@@ -440,6 +471,29 @@ def parse_url(url: str) -> ParsedURL:
     )
 
 
+parse_url_cache_size = 16384
+_parse_url_lru = _ft.lru_cache(maxsize=parse_url_cache_size)(parse_url_uncached)
+
+
+@profiled("parse_url")
+def parse_url(url: str) -> ParsedURL:
+    """Like `parse_url_uncached`, but memoized with a process-wide bounded LRU
+    cache. `ParsedURL` is immutable, so the results can be shared freely."""
+    return _parse_url_lru(url)
+
+
+def _parse_url_counters() -> dict[str, int]:
+    info = _parse_url_lru.cache_info()
+    return {
+        "parse_url_cache_hits": info.hits,
+        "parse_url_cache_misses": info.misses,
+        "parse_url_cache_size": info.currsize,
+    }
+
+
+prof.add_counters(_parse_url_counters)
+
+
 def test_parse_url() -> None:
     def check(x: ParsedURL, name: str, value: _t.Any) -> None:
         if getattr(x, name) != value:
@@ -600,6 +654,35 @@ def test_parse_url() -> None:
         check(x, "pretty_nurl", nurl)
 
 
+def test_surt() -> None:
+    for url, surt in [
+        ("https://www.Example.org/Index.html?b=2&a=1#hash", "org,example)/index.html?a=1&b=2"),
+        ("https://example.org", "org,example)/"),
+        ("http://example.org:80/", "org,example)/"),
+        ("http://www.example.org:8080/A/b/", "org,example:8080)/a/b/"),
+        ("https://127.0.0.1/", "127.0.0.1)/"),
+    ]:
+        assert parse_url(url).surt == surt, (url, parse_url(url).surt)
+
+
+def test_parse_url_memoized() -> None:
+    url = "https://example.org/memoized?q#fragment"
+    x = parse_url(url)
+    assert parse_url(url) is x
+    assert x == parse_url_uncached(url)
+
+    y = parse_url_uncached("https://user@example.org:8080/other")
+    z = parse_url_uncached("https://user@example.org:8080/another")
+    assert y.netloc is z.netloc and y.net_netloc is z.net_netloc
+
+    try:
+        x.fragment = "changed"  # type: ignore
+    except _dc.FrozenInstanceError:
+        pass
+    else:
+        assert False
+
+
 ### MIME valuess
 
 Parameters = list[tuple[str, str]]
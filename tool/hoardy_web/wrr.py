@@ -40,7 +40,9 @@ from kisstdlib.time import *
 from .tracking import *
 from .linst import *
 from .source import *
-from .web import *
+from .wire import *
+from .mime import *
+from .links import *
 
 
 class RRCommon(metaclass=_abc.ABCMeta):
@@ -53,21 +55,37 @@ class RRCommon(metaclass=_abc.ABCMeta):
     def get_content_type(self) -> tuple[str, bool]:
         raise NotImplementedError()
 
+    def get_dtc(self) -> dict[SniffContentType, DiscernContentType]:
+        """Get the cache of `discern_content_type` results of this."""
+        try:
+            return self._dtc
+        except AttributeError:
+            res: dict[SniffContentType, DiscernContentType] = {}
+            self._dtc = res
+            return res
+
     def discern_content_type(self, sniff: SniffContentType) -> DiscernContentType:
-        """Run `mime.discern_content_type` on this."""
+        """Run `mime.discern_content_type` on this, memoized."""
+        dtc = self.get_dtc()
         try:
-            return self._dtc[sniff]
+            return dtc[sniff]
         except KeyError:
             pass
-        except AttributeError:
-            self._dtc = {}
 
         ct, do_sniff = self.get_content_type()
+        esniff = sniff
         if do_sniff and sniff == SniffContentType.NONE:
-            sniff = SniffContentType.FORCE
-        res = discern_content_type(ct, sniff, self.body)
+            esniff = SniffContentType.FORCE
+            try:
+                res = dtc[esniff]
+            except KeyError:
+                pass
+            else:
+                dtc[sniff] = res
+                return res
 
-        self._dtc[sniff] = res
+        res = discern_content_type(ct, esniff, self.body)
+        dtc[sniff] = dtc[esniff] = res
         return res
 
 
@@ -127,6 +145,75 @@ class WebSocketFrame:
         return 40 + len(self.content)
 
 
+class WebSocketFrames(_t.Sequence[WebSocketFrame]):
+    """A lazy sequence of `WebSocketFrame`s, which keeps them in the same form they
+    have in `WRR` files and only decodes them one at a time on access.
+
+    I.e., loading a reqres with lots of frames does not produce lots of `WebSocketFrame`
+    objects, `len`, `num_bytes`, and `span_ms` do not produce any, and iterating over
+    it keeps at most one of them alive at a time.
+    """
+
+    def __init__(self, frames: list[_t.Any]) -> None:
+        self.frames = frames
+
+    @staticmethod
+    def from_list(frames: _t.Iterable[WebSocketFrame]) -> "WebSocketFrames":
+        return WebSocketFrames(
+            [[_f_timestamp(f.sent_at), f.from_client, f.opcode, f.content] for f in frames]
+        )
+
+    @staticmethod
+    def decode(frame: _t.Any) -> WebSocketFrame:
+        try:
+            sent_at, from_client, opcode, content = frame
+        except (TypeError, ValueError) as exc:
+            raise WRRParsingFailure("Reqres parsing failure: wrong WebSocket frame") from exc
+        return WebSocketFrame(
+            _t_timestamp("ws.sent_at", sent_at),
+            _t_bool("ws.from_client", from_client),
+            _t_int("ws.opcode", opcode),
+            _t_bytes("ws.content", content),
+        )
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, idx: _t.Any) -> _t.Any:
+        if isinstance(idx, slice):
+            return WebSocketFrames(self.frames[idx])
+        return self.decode(self.frames[idx])
+
+    def __iter__(self) -> _t.Iterator[WebSocketFrame]:
+        decode = self.decode
+        for frame in self.frames:
+            yield decode(frame)
+
+    def __eq__(self, other: _t.Any) -> bool:
+        if isinstance(other, WebSocketFrames):
+            return self.frames == other.frames
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"<WebSocketFrames of {len(self.frames)} frames>"
+
+    def num_bytes(self) -> int:
+        """Total size of `content`s of all frames."""
+        return sum(len(f[3]) for f in self.frames)
+
+    def span_ms(self) -> int:
+        """`sent_at` of the last frame minus `sent_at` of the first one, in milliseconds."""
+        frames = self.frames
+        if len(frames) == 0:
+            return 0
+        return _t_int("ws.sent_at", frames[-1][0]) - _t_int("ws.sent_at", frames[0][0])
+
+    def approx_size(self) -> int:
+        return 56 + sum(40 + len(f[3]) for f in self.frames)
+
+
 Reqres_fields = {
     "version": "WEBREQRES format version; int",
     "agent": "`+`-separated list of applications that produced this reqres; str",
@@ -144,7 +231,7 @@ Reqres_fields = {
     "response.complete": "is response body complete?; bool",
     "response.body": "response body; Firefox gives raw bytes, Chromium gives UTF-8 encoded strings; bytes | str",
     "finished_at": "request completion time in seconds since 1970-01-01 00:00; Timestamp",
-    "websocket": "a list of WebSocket frames",
+    "websocket": "a sequence of WebSocket frames, decoded lazily, one at a time",
 }
 
 
@@ -157,7 +244,7 @@ class Reqres:
     response: _t.Optional[Response]
     finished_at: Timestamp
     extra: dict[str, _t.Any]
-    websocket: _t.Optional[list[WebSocketFrame]]
+    websocket: _t.Optional[WebSocketFrames]
     _approx_size: int = 0
 
     def _resize(self) -> int:
@@ -165,11 +252,7 @@ class Reqres:
             128
             + self.request.approx_size()
             + (self.response.approx_size() if self.response is not None else 0)
-            + (
-                sum(map(lambda x: x.approx_size(), self.websocket))
-                if self.websocket is not None
-                else 0
-            )
+            + (self.websocket.approx_size() if self.websocket is not None else 0)
         )
         return res
 
@@ -256,6 +339,20 @@ def _f_timestamp(x: Timestamp) -> int:
     return int(x * 1000)
 
 
+def parse_iso_Timestamp(value: str) -> Timestamp:
+    """Parse an `ISO 8601` timestamp with a time zone, like those used by `WARC`
+    and `HAR` files."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        (res, _), rest = parse_Timestamp(value)
+    except ValueError as exc:
+        raise ParsingFailure("failed to parse `%s` as a timestamp", value) from exc
+    if rest != "":
+        raise ParsingFailure("failed to parse `%s` as a timestamp", value)
+    return res
+
+
 def _t_headers(n: str, x: _t.Any) -> Headers:
     if Headers.__instancecheck__(x):
         return _t.cast(Headers, x)
@@ -305,17 +402,21 @@ def wrr_load_cbor_struct(data: _t.Any) -> Reqres:
             websocket = None
         else:
             del extra["websocket"]
-            websocket = []
-            for frame in wsframes:
-                sent_at, from_client, opcode, content = frame
-                websocket.append(
-                    WebSocketFrame(
-                        _t_timestamp("ws.sent_at", sent_at),
-                        _t_bool("ws.from_client", from_client),
-                        _t_int("ws.opcode", opcode),
-                        _t_bytes("ws.content", content),
-                    )
+            if not isinstance(wsframes, list):
+                raise WRRTypeFailure(
+                    "while parsing Reqres field `%s`: wrong type: expected `%s`, got `%s`",
+                    "websocket",
+                    "list",
+                    type(wsframes).__name__,
                 )
+            # only check the shape of each frame here, so that `num_bytes` and
+            # `approx_size` can be computed; the rest gets decoded lazily, see
+            # `WebSocketFrames`
+            for frame in wsframes:
+                if not isinstance(frame, list) or len(frame) != 4:
+                    raise WRRParsingFailure("Reqres parsing failure: wrong WebSocket frame")
+                _t_bytes("ws.content", frame[3])
+            websocket = WebSocketFrames(wsframes)
 
         return Reqres(
             1,
@@ -331,17 +432,25 @@ def wrr_load_cbor_struct(data: _t.Any) -> Reqres:
     raise WRRParsingFailure("Reqres parsing failure: unknown format `%s`", data[0])
 
 
+def profiled_ungzip_fileobj_maybe(fobj: _io.BufferedReader) -> _io.BufferedReader:
+    res = ungzip_fileobj_maybe(fobj)
+    if prof.enabled and res is not fobj:
+        return _t.cast(_io.BufferedReader, ProfiledReader("gunzip", res))
+    return res
+
+
 def wrr_load_cbor_fileobj(fobj: _io.BufferedReader) -> Reqres:
-    try:
-        struct = _cbor2.load(fobj)
-    except _cbor2.CBORDecodeValueError as exc:
-        raise WRRParsingFailure("CBOR parsing failure") from exc
+    with prof.stage("cbor_decode"):
+        try:
+            struct = _cbor2.load(fobj)
+        except _cbor2.CBORDecodeError as exc:
+            raise WRRParsingFailure("CBOR parsing failure") from exc
 
     return wrr_load_cbor_struct(struct)
 
 
 def wrr_load(fobj: _io.BufferedReader) -> Reqres:
-    fobj = ungzip_fileobj_maybe(fobj)
+    fobj = profiled_ungzip_fileobj_maybe(fobj)
     if fobj.peek(1) == b"":
         raise WRRParsingFailure("expected CBOR data, got EOF")
     reqres = wrr_load_cbor_fileobj(fobj)
@@ -353,13 +462,94 @@ def wrr_load(fobj: _io.BufferedReader) -> Reqres:
 
 
 def wrr_bundle_load(fobj: _io.BufferedReader) -> _t.Iterator[Reqres]:
-    fobj = ungzip_fileobj_maybe(fobj)
+    fobj = profiled_ungzip_fileobj_maybe(fobj)
     while True:
         if fobj.peek(1) == b"":
             break
         yield wrr_load_cbor_fileobj(fobj)
 
 
+def cbor_read_item(fobj: _io.BufferedReader) -> bytes:
+    """Read raw bytes of a single complete CBOR data item from `fobj` without
+    decoding it."""
+    res: list[bytes] = []
+
+    def read(size: int) -> bytes:
+        data = fobj.read(size)
+        if len(data) != size:
+            raise WRRParsingFailure("CBOR parsing failure")
+        res.append(data)
+        return data
+
+    # for each array, map, or tag we are in, the number of data items it
+    # still has, with `-1` meaning "up to the break code"
+    todo = [1]
+    while len(todo) > 0:
+        left = todo[-1]
+        if left == 0:
+            todo.pop()
+            continue
+
+        ib = read(1)[0]
+        if left > 0:
+            todo[-1] = left - 1
+        elif ib == 0xFF:
+            todo.pop()
+            continue
+
+        major = ib >> 5
+        info = ib & 0x1F
+        if info < 24:
+            arg = info
+        elif info < 28:
+            arg = int.from_bytes(read(1 << (info - 24)), "big")
+        elif info == 31 and 2 <= major <= 5:
+            # an indefinite-length string, array, or map
+            todo.append(-1)
+            continue
+        else:
+            raise WRRParsingFailure("CBOR parsing failure")
+
+        if major in (2, 3):
+            read(arg)
+        elif major == 4:
+            todo.append(arg)
+        elif major == 5:
+            todo.append(2 * arg)
+        elif major == 6:
+            todo.append(1)
+
+    return b"".join(res)
+
+
+def wrr_bundle_split(fobj: _io.BufferedReader) -> _t.Iterator[bytes]:
+    """Like `wrr_bundle_load`, but produce raw CBOR data of each reqres
+    instead, without parsing it. Use `wrr_loads_cbor` to parse the
+    results."""
+    fobj = profiled_ungzip_fileobj_maybe(fobj)
+    while True:
+        if fobj.peek(1) == b"":
+            break
+        yield cbor_read_item(fobj)
+
+
+def wrr_bundle_load_nth(fobj: _io.BufferedReader, offsets: tuple[int, ...]) -> Reqres:
+    """Load the `offsets[0]`-th reqres of a `WRR` bundle, skipping the preceding
+    ones without parsing them."""
+    fobj = profiled_ungzip_fileobj_maybe(fobj)
+    for _ in range(offsets[0]):
+        if fobj.peek(1) == b"":
+            break
+        cbor_read_item(fobj)
+    if fobj.peek(1) == b"":
+        raise WRRParsingFailure("no reqres number %d", offsets[0])
+    return wrr_load_cbor_fileobj(fobj)
+
+
+def wrr_loads_cbor(data: bytes) -> Reqres:
+    return wrr_load_cbor_fileobj(BytesIOReader(data))
+
+
 def wrr_loadf(path: _t.AnyStr) -> Reqres:
     with open(path, "rb") as f:
         return wrr_load(f)
@@ -394,12 +584,7 @@ def wrr_dumps(reqres: Reqres, compress: bool = True) -> bytes:
     extra = reqres.extra
     if reqres.websocket is not None:
         extra = extra.copy()
-        wsframes = []
-        for frame in reqres.websocket:
-            wsframes.append(
-                [_f_timestamp(frame.sent_at), frame.from_client, frame.opcode, frame.content]
-            )
-        extra["websocket"] = wsframes
+        extra["websocket"] = reqres.websocket.frames
 
     structure = [
         "WEBREQRES/1",
@@ -491,6 +676,8 @@ ReqresExpr_url_attrs = {
     #
     "fragment": "fragment (hash) part of the url; str",
     "ofm": "optional fragment mark: `#` character if `fragment` is non-empty, an empty string otherwise; str",
+    #
+    "surt": 'Sort-friendly URI Reordering Transform of `net_url`, as used as keys by `CDX` and `CDXJ` indices; i.e. lowercased `net_hostname` without `"www."`, with the order of its parts reversed and joined with commas, followed by a non-default `port`, `)`, `path`, and `query` with sorted parameters; e.g. `"https://www.example.org/Index.html?b=2&a=1"` -> `"org,example)/index.html?a=1&b=2"`; str',
 }
 ReqresExpr_derived_attrs.update(ReqresExpr_url_attrs)
 ReqresExpr_derived_attrs.update(
@@ -502,6 +689,10 @@ ReqresExpr_derived_attrs.update(
         #
         "filepath_parts": '`npath_parts` transformed into components usable as an exportable file name; i.e. `npath_parts` with an optional additional `"index"` appended, depending on `raw_url` and `response_mime`; extension will be stored separately in `filepath_ext`; e.g. for `HTML` documents `"https://www.example.org/"` -> `["index"]`, `"https://www.example.org/test.html"` -> `["test"]`, `"https://www.example.org/test"` -> `["test", "index"]`, `"https://www.example.org/test.json"` -> `["test.json", "index"]`, but if it has a `JSON` `MIME` type then `"https://www.example.org/test.json"` -> `["test"]` (and `filepath_ext` will be set to `".json"`); this is similar to what `wget -mpk` does, but a bit smarter; list[str]',
         "filepath_ext": 'extension of the last component of `filepath_parts` for recognized `MIME` types, `".data"` otherwise; str',
+        #
+        "ws_frames": "number of `websocket` frames, computed without decoding them; `None` if this reqres has no `websocket`; int | None",
+        "ws_bytes": "total size of contents of all `websocket` frames, computed without decoding them; `None` if this reqres has no `websocket`; int | None",
+        "ws_span_ms": "`sent_at` of the last `websocket` frame minus `sent_at` of the first one, computed without decoding them; `None` if this reqres has no `websocket`; milliseconds; int | None",
     }
 )
 
@@ -523,6 +714,9 @@ def _parse_rt(opt: str) -> RemapType:
 
 def linst_scrub() -> LinstAtom:
     def func(part: str, optstr: str) -> _t.Callable[..., LinstFunc]:
+        # `web` pulls in `html5lib` and `tinycss2`, so we only import it when a `scrub` is used
+        from .web import make_scrubbers, scrub_html, scrub_css
+
         rere = check_request_response("scrub", part)
 
         scrub_opts = ScrubbingOptions()
@@ -733,12 +927,39 @@ class ReqresExpr(DeferredSource, LinstEvaluator, _t.Generic[DeferredSourceType])
     remap_url: URLRemapperType | None = _dc.field(default=None)
 
     _original: _t.Any | None = _dc.field(default=None)
+    _digest: bytes | None = _dc.field(default=None)
+    _encoded: bytes | None = _dc.field(default=None)
+    # `RRCommon.get_dtc` of `request` and `response` of `_reqres`, kept over `unload`s
+    _dtcs: tuple[dict[SniffContentType, DiscernContentType], ...] | None = _dc.field(default=None)
     _approx_size: int = _dc.field(default=0)
 
     def __post_init__(self) -> None:
         LinstEvaluator.__init__(self, ReqresExpr_lookup)
+        if self._reqres is not None:
+            self._keep_dtcs(self._reqres)
         mem.consumption += self._resize()
 
+    def _keep_dtcs(self, reqres: Reqres) -> None:
+        """Make `discern_content_type` results of `reqres` survive `unload`s, so that
+        re-loading it would not re-parse its `Content-Type`s and re-sniff its
+        bodies.
+
+        These are not persisted anywhere, since everything that uses them
+        also needs the loaded `reqres`, so they are cheap to recompute
+        relative to loading it.
+        """
+        dtcs = self._dtcs
+        response = reqres.response
+        if dtcs is None:
+            self._dtcs = (
+                reqres.request.get_dtc(),
+                response.get_dtc() if response is not None else {},
+            )
+            return
+        reqres.request._dtc = dtcs[0]  # pylint: disable=protected-access
+        if response is not None:
+            response._dtc = dtcs[1]  # pylint: disable=protected-access
+
     def __del__(self) -> None:
         mem.consumption -= self._approx_size
 
@@ -752,6 +973,9 @@ class ReqresExpr(DeferredSource, LinstEvaluator, _t.Generic[DeferredSourceType])
                 else 0
             )
             + sum(map(lambda k: len(k) + 16, self.values.keys()))
+            + (48 if self._digest is not None else 0)
+            + (sum(map(lambda x: 128 * len(x), self._dtcs)) if self._dtcs is not None else 0)
+            + (len(self._encoded) + 16 if self._encoded is not None else 0)
         )
         return res
 
@@ -765,18 +989,26 @@ class ReqresExpr(DeferredSource, LinstEvaluator, _t.Generic[DeferredSourceType])
             return reqres
 
         source = self.source
-        if isinstance(self.source, FileSource):
+        if self._encoded is not None:
+            reqres = wrr_load(BytesIOReader(self._encoded))
+        elif isinstance(source, FileSource):
             with source.get_fileobj() as f:
                 reqres = wrr_load(f)
+        elif isinstance(source, SeekableStreamElementSource):
+            reqres = source.load()
         else:
             raise NotImplementedError()
 
+        self._keep_dtcs(reqres)
         self._reqres = reqres
         mem.consumption -= self._approx_size - self._resize()
         return reqres
 
     def unload(self, completely: bool = True) -> None:
-        if isinstance(self.source, FileSource):
+        if (
+            isinstance(self.source, (FileSource, SeekableStreamElementSource))
+            or self._encoded is not None
+        ):
             # this `reqres` is cheap to re-load
             self._reqres = None
         if completely:
@@ -787,8 +1019,42 @@ class ReqresExpr(DeferredSource, LinstEvaluator, _t.Generic[DeferredSourceType])
         return self.source.show_source()
 
     def get_fileobj(self) -> _io.BufferedReader:
+        if self._encoded is not None:
+            return BytesIOReader(self._encoded)
         return BytesIOReader(wrr_dumps(self.reqres))
 
+    def encode(self) -> bytes:
+        """Compute `get_bytes` and `get_digest` at the same time, cache both,
+        and return the former.
+
+        After this, `unload` will drop `reqres`, since it becomes cheap to
+        re-load.
+        """
+        encoded = self._encoded
+        if encoded is None:
+            data = wrr_dumps(self.reqres, False)
+            if self._digest is None:
+                with prof.stage("digest"):
+                    self._digest = _hashlib.sha256(data).digest()
+            encoded = self._encoded = gzip_maybe(data)
+            del data
+            mem.consumption -= self._approx_size - self._resize()
+        return encoded
+
+    def get_digest(self) -> bytes:
+        # `wrr_dumps` compresses deterministically, so a digest of uncompressed
+        # data can be used in place of a digest of `get_bytes`, thus skipping
+        # compression. Also, this digest survives `unload`, so comparing
+        # against a previously seen `ReqresExpr` will not re-load it again.
+        digest = self._digest
+        if digest is None:
+            data = wrr_dumps(self.reqres, False)
+            with prof.stage("digest"):
+                digest = self._digest = _hashlib.sha256(data).digest()
+            del data
+            mem.consumption -= self._approx_size - self._resize()
+        return digest
+
     def same_as(self, other: DeferredSource) -> bool:
         if isinstance(other, ReqresExpr):
             return self.source.same_as(other.source)
@@ -871,6 +1137,16 @@ class ReqresExpr(DeferredSource, LinstEvaluator, _t.Generic[DeferredSourceType])
             parts, ext = reqres.request.url.filepath_parts_ext("index", extensions)
             self.values["filepath_parts"] = parts
             self.values["filepath_ext"] = ext
+        elif name in ("ws_frames", "ws_bytes", "ws_span_ms"):
+            websocket = reqres.websocket
+            if websocket is not None:
+                self.values["ws_frames"] = len(websocket)
+                self.values["ws_bytes"] = websocket.num_bytes()
+                self.values["ws_span_ms"] = websocket.span_ms()
+            else:
+                self.values["ws_frames"] = None
+                self.values["ws_bytes"] = None
+                self.values["ws_span_ms"] = None
         elif name in ReqresExpr_url_attrs:
             self.values[name] = getattr(reqres.request.url, name)
         elif name == "" or name in Reqres_fields:
@@ -911,7 +1187,7 @@ def rrexprs_wrr_bundle_load(
 def rrexprs_wrr_some_load(
     fobj: _io.BufferedReader, source: DeferredSourceType
 ) -> _t.Iterator[ReqresExpr[DeferredSourceType | StreamElementSource[DeferredSourceType]]]:
-    fobj = ungzip_fileobj_maybe(fobj)
+    fobj = profiled_ungzip_fileobj_maybe(fobj)
     if fobj.peek(1) == b"":
         raise WRRParsingFailure("expected CBOR data, got EOF")
 
@@ -1033,6 +1309,62 @@ def mk_fallback_ReqresExpr(
     return ReqresExpr(UnknownSource(), x)
 
 
+def test_wrr_bundle_split() -> None:
+    reqreses = [
+        trivial_Reqres(parse_url(f"https://example.org/{i}"), data=b"x" * 100 * i) for i in range(4)
+    ]
+    datas = [wrr_dumps(reqres, False) for reqres in reqreses]
+    bundle = b"".join(datas)
+    for compress in [False, True]:
+        fobj = BytesIOReader(gzip_maybe(bundle) if compress else bundle)
+        assert list(wrr_bundle_split(fobj)) == datas
+    assert [wrr_dumps(wrr_loads_cbor(data), False) for data in datas] == datas
+
+    # indefinite-length items
+    data = b"\x9f\x01\x5f\x41a\xff\xbf\x61k\xf6\xff\xff"
+    assert cbor_read_item(BytesIOReader(data + b"\x00")) == data
+
+    try:
+        cbor_read_item(BytesIOReader(datas[0][:-1]))
+    except WRRParsingFailure:
+        pass
+    else:
+        assert False
+
+
+def test_WebSocketFrames() -> None:
+    frames = [
+        WebSocketFrame(Timestamp(1000), True, 1, b"hello"),
+        WebSocketFrame(Timestamp(Decimal("1001.5")), False, 2, b"\x00" * 10),
+    ]
+    reqres = trivial_Reqres(parse_url("wss://example.org/socket"))
+    reqres.websocket = WebSocketFrames.from_list(frames)
+    data = wrr_dumps(reqres, False)
+
+    reqres = wrr_loads_cbor(data)
+    websocket = reqres.websocket
+    assert isinstance(websocket, WebSocketFrames)
+    assert wrr_dumps(reqres, False) == data
+    assert websocket == frames and list(websocket) == frames and websocket[1] == frames[1]
+
+    rrexpr = ReqresExpr(UnknownSource(), reqres)
+    assert rrexpr["ws_frames"] == 2
+    assert rrexpr["ws_bytes"] == 15
+    assert rrexpr["ws_span_ms"] == 1500
+
+    rrexpr = ReqresExpr(UnknownSource(), trivial_Reqres(parse_url("https://example.org/")))
+    assert rrexpr.eval_expr("ws_frames") is None
+
+    for frame in [[1000, True, 1], [1000, True, 1, "hello"], "frame"]:
+        reqres.websocket = WebSocketFrames([frame])
+        try:
+            wrr_loads_cbor(wrr_dumps(reqres, False))
+        except WRRParsingFailure:
+            pass
+        else:
+            assert False
+
+
 def test_ReqresExpr_url_parts() -> None:
     def check(x: ReqresExpr[_t.Any], name: str, value: _t.Any) -> None:
         if x[name] != value: